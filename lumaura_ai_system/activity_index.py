@@ -0,0 +1,300 @@
+"""
+Activity Index
+
+This module provides an incremental inverted index over portal activity descriptions.
+Activity descriptions repeat heavily, so terms are indexed per distinct description and
+each (portal, description) pair keeps a compact, time-ordered array of the timestamps at
+which it occurred. A query intersects the term postings of a few thousand descriptions at
+most, checks phrases against their token lists, and binary-searches the timestamp arrays
+for the time range, so its cost does not grow with the number of activities.
+
+Retention is bounded by a number of activities and optionally an age. A heap of postings
+keyed by their oldest timestamp finds the oldest activities without scanning the index, so
+pruning costs O(log postings) per posting it trims. Descriptions, and their terms, that no
+posting refers to any more are dropped.
+"""
+
+import bisect
+import heapq
+import itertools
+import logging
+import re
+import threading
+from array import array
+
+from lumaura_ai_system.activity_store import _iso
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+QUERY_PATTERN = re.compile(r'"([^"]*)"|(\S+)')
+
+DEFAULT_SEARCH_LIMIT = 50
+DEFAULT_MAX_ACTIVITIES = 1000000
+
+# Let the index grow this fraction past its limits before pruning, so each pruning trims
+# postings in batches
+PRUNE_SLACK = 0.01
+
+
+def tokenize(text):
+    """Split text into lowercase alphanumeric terms."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def parse_query(query):
+    """
+    Parse a query into terms and phrases.
+
+    Unquoted words are terms; text in double quotes is a phrase. Every term and phrase
+    must match.
+
+    Returns:
+        tuple: (list of terms, list of phrases as token tuples)
+    """
+    terms, phrases = [], []
+    for phrase, word in QUERY_PATTERN.findall(query or ""):
+        if phrase:
+            tokens = tuple(tokenize(phrase))
+            if len(tokens) == 1:
+                terms.append(tokens[0])
+            elif tokens:
+                phrases.append(tokens)
+        else:
+            terms.extend(tokenize(word))
+    return terms, phrases
+
+
+def _contains_phrase(tokens, phrase):
+    """Check whether a token sequence contains a phrase."""
+    width = len(phrase)
+    first = phrase[0]
+    for start in range(len(tokens) - width + 1):
+        if tokens[start] == first and tokens[start:start + width] == phrase:
+            return True
+    return False
+
+
+class ActivityIndex:
+    """Inverted index of activity descriptions with per-portal timestamp postings."""
+
+    def __init__(self, max_activities=DEFAULT_MAX_ACTIVITIES, max_age=None):
+        """
+        Initialize an empty index.
+
+        Args:
+            max_activities (int, optional): Number of activities retained; the oldest are
+                pruned beyond it. None keeps every activity
+            max_age (float, optional): Seconds an activity is retained, measured back from
+                the newest indexed timestamp. None keeps activities of any age
+        """
+        self.max_activities = max_activities
+        self.max_age_ms = int(max_age * 1000) if max_age else None
+        self._lock = threading.Lock()
+        self._description_ids = {}
+        self._descriptions = []
+        self._tokens = []
+        self._free_ids = []
+        # Term -> set of description ids
+        self._terms = {}
+        # (portal name, description id) -> array of epoch-ms timestamps, oldest first
+        self._postings = {}
+        # Description id -> portal names it occurred in
+        self._portals_by_description = []
+        # Min-heap of (oldest timestamp, portal name, description id) per posting; entries
+        # whose timestamp no longer matches the posting's oldest one are stale and skipped
+        self._oldest = []
+        self._count = 0
+        self._pruned = 0
+        self._newest = 0
+        self._pruned_before = 0
+
+    def __len__(self):
+        return self._count
+
+    def add(self, portal_name, description, timestamp_ms):
+        """Index one activity."""
+        with self._lock:
+            if self.max_age_ms is not None and timestamp_ms < self._newest - self.max_age_ms:
+                return
+            description_id = self._description_ids.get(description)
+            if description_id is None:
+                tokens = tuple(tokenize(description))
+                if self._free_ids:
+                    description_id = self._free_ids.pop()
+                    self._descriptions[description_id] = description
+                    self._tokens[description_id] = tokens
+                    self._portals_by_description[description_id] = {}
+                else:
+                    description_id = len(self._descriptions)
+                    self._descriptions.append(description)
+                    self._tokens.append(tokens)
+                    self._portals_by_description.append({})
+                self._description_ids[description] = description_id
+                for term in set(tokens):
+                    self._terms.setdefault(term, set()).add(description_id)
+            key = (portal_name, description_id)
+            timestamps = self._postings.get(key)
+            if timestamps is None:
+                timestamps = self._postings[key] = array("q")
+                self._portals_by_description[description_id][portal_name] = None
+            if not timestamps or timestamp_ms < timestamps[0]:
+                heapq.heappush(self._oldest, (timestamp_ms, portal_name, description_id))
+            if timestamps and timestamp_ms < timestamps[-1]:
+                # Keep the posting sorted if an out-of-order timestamp arrives
+                timestamps.insert(bisect.bisect_right(timestamps, timestamp_ms), timestamp_ms)
+            else:
+                timestamps.append(timestamp_ms)
+            self._count += 1
+            self._newest = max(self._newest, timestamp_ms)
+            self._enforce_retention()
+
+    def _enforce_retention(self):
+        """Prune the oldest activities once the index is past its age or size limit. Caller holds the lock."""
+        if self.max_age_ms is not None:
+            cutoff = self._newest - self.max_age_ms
+            # Sweep once the cutoff has moved a fraction of the retention window
+            if cutoff - self._pruned_before >= self.max_age_ms * PRUNE_SLACK:
+                self._prune(before_ms=cutoff)
+        if self.max_activities is not None and self._count > self.max_activities * (1 + PRUNE_SLACK):
+            self._prune(count=self._count - self.max_activities)
+
+    def _prune(self, before_ms=None, count=None):
+        """
+        Remove the oldest activities: those before a time, or a number of them. Caller holds the lock.
+
+        Returns:
+            int: Number of activities removed
+        """
+        removed = 0
+        oldest = self._oldest
+        while oldest and (count is None or removed < count):
+            first, portal_name, description_id = oldest[0]
+            if before_ms is not None and first >= before_ms:
+                break
+            heapq.heappop(oldest)
+            key = (portal_name, description_id)
+            timestamps = self._postings.get(key)
+            if timestamps is None or timestamps[0] != first:
+                continue
+            if before_ms is not None:
+                stale = bisect.bisect_left(timestamps, before_ms)
+            else:
+                # Timestamps up to the next posting's oldest one are the oldest in the index
+                bound = bisect.bisect_right(timestamps, oldest[0][0]) if oldest else len(timestamps)
+                stale = max(1, min(count - removed, bound))
+            removed += stale
+            if stale < len(timestamps):
+                del timestamps[:stale]
+                heapq.heappush(oldest, (timestamps[0], portal_name, description_id))
+                continue
+            del self._postings[key]
+            portals = self._portals_by_description[description_id]
+            del portals[portal_name]
+            if not portals:
+                self._drop_description(description_id)
+        self._count -= removed
+        self._pruned += removed
+        if before_ms is not None:
+            self._pruned_before = max(self._pruned_before, before_ms)
+        if removed:
+            logger.debug(f"Pruned {removed} activities from the activity index")
+        return removed
+
+    def _drop_description(self, description_id):
+        """Remove a description no posting refers to, and its terms. Caller holds the lock."""
+        for term in set(self._tokens[description_id]):
+            ids = self._terms[term]
+            ids.discard(description_id)
+            if not ids:
+                del self._terms[term]
+        del self._description_ids[self._descriptions[description_id]]
+        self._descriptions[description_id] = None
+        self._tokens[description_id] = None
+        self._portals_by_description[description_id] = None
+        self._free_ids.append(description_id)
+
+    def _matching_descriptions(self, terms, phrases):
+        """Get the ids of descriptions containing every term and phrase. Caller holds the lock."""
+        required = set(terms)
+        for phrase in phrases:
+            required.update(phrase)
+        postings = []
+        for term in required:
+            ids = self._terms.get(term)
+            if not ids:
+                return []
+            postings.append(ids)
+        postings.sort(key=len)
+        matches = set(postings[0]).intersection(*postings[1:])
+        if phrases:
+            matches = {d for d in matches if all(_contains_phrase(self._tokens[d], p) for p in phrases)}
+        return matches
+
+    @staticmethod
+    def _newest_first(timestamps, low, high, portal_name, description_id):
+        """Yield (timestamp, portal, description id) for a posting range, newest first."""
+        for position in range(high - 1, low - 1, -1):
+            yield timestamps[position], portal_name, description_id
+
+    def search(self, query, portal_name=None, start_ms=None, end_ms=None, limit=DEFAULT_SEARCH_LIMIT):
+        """
+        Search activity descriptions.
+
+        Args:
+            query (str): Terms and "quoted phrases"; all must match
+            portal_name (str, optional): Only match activities of this portal
+            start_ms (int, optional): Inclusive lower bound in epoch ms
+            end_ms (int, optional): Exclusive upper bound in epoch ms
+            limit (int): Maximum number of activities to return
+
+        Returns:
+            dict: {"total": number of matching activities, "results": newest first as
+                {"portal", "description", "timestamp"}}
+        """
+        terms, phrases = parse_query(query)
+        if not terms and not phrases:
+            return {"total": 0, "results": []}
+
+        with self._lock:
+            ranges = []
+            total = 0
+            for description_id in self._matching_descriptions(terms, phrases):
+                portals = self._portals_by_description[description_id]
+                names = portals if portal_name is None else ([portal_name] if portal_name in portals else [])
+                for name in names:
+                    timestamps = self._postings[(name, description_id)]
+                    low = 0 if start_ms is None else bisect.bisect_left(timestamps, start_ms)
+                    high = len(timestamps) if end_ms is None else bisect.bisect_left(timestamps, end_ms)
+                    if high > low:
+                        total += high - low
+                        ranges.append((timestamps, low, high, name, description_id))
+
+            # Lazily merge the postings newest first, stopping after `limit` entries; descriptions
+            # are resolved before the lock is released, as pruning may recycle their ids
+            newest = [
+                (timestamp_ms, name, self._descriptions[description_id])
+                for timestamp_ms, name, description_id in itertools.islice(heapq.merge(
+                    *(self._newest_first(*entry) for entry in ranges), reverse=True
+                ), limit)
+            ]
+
+        return {
+            "total": total,
+            "results": [
+                {"portal": name, "description": description, "timestamp": _iso(timestamp_ms)}
+                for timestamp_ms, name, description in newest
+            ]
+        }
+
+    def stats(self):
+        """Get index statistics."""
+        return {
+            "activities": self._count,
+            "descriptions": len(self._description_ids),
+            "terms": len(self._terms),
+            "postings": len(self._postings),
+            "pruned": self._pruned,
+            "max_activities": self.max_activities,
+            "max_age": self.max_age_ms / 1000 if self.max_age_ms is not None else None
+        }
@@ -0,0 +1,369 @@
+"""
+Activity Store
+
+This module provides a bounded, compact activity store for portals.
+Activities are kept in a fixed-capacity ring buffer backed by parallel arrays of
+epoch-millisecond timestamps and interned description ids. Entries pushed out of
+the ring can optionally spill to a fixed-width binary file on disk, and both tiers
+answer time-range queries with a binary search. Interned descriptions are reference
+counted per ring entry, so a description is dropped from the shared table once no
+ring holds it any more.
+"""
+
+import bisect
+import os
+import json
+import logging
+import struct
+import threading
+import time
+from array import array
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CAPACITY = 1000
+
+# Spilled record: epoch-ms timestamp, description id
+SPILL_RECORD = struct.Struct("<qi")
+
+
+def to_epoch_ms(value):
+    """Convert an epoch-ms number, datetime or ISO-8601 string to epoch milliseconds."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return int(value.timestamp() * 1000)
+    if isinstance(value, (int, float)):
+        return int(value)
+    try:
+        return int(value)
+    except ValueError:
+        return int(datetime.fromisoformat(value).timestamp() * 1000)
+
+
+def _iso(timestamp_ms):
+    """Convert epoch milliseconds to an ISO-8601 string in local time."""
+    return datetime.fromtimestamp(timestamp_ms / 1000).isoformat()
+
+
+class DescriptionTable:
+    """Interning table mapping activity descriptions to small integer ids."""
+
+    def __init__(self, path=None):
+        """
+        Initialize the table.
+
+        Without a path, ids are reference counted and a description is released, and
+        its id reused, once its last reference is dropped. A persisted table never
+        releases ids, since spill files on disk refer to them.
+
+        Args:
+            path (str, optional): JSON-lines file that persists new descriptions so that
+                ids written to spill files stay valid across restarts
+        """
+        self._ids = {}
+        self._strings = []
+        self._refs = []
+        self._free = []
+        self._lock = threading.Lock()
+        self._file = None
+        self.persistent = bool(path)
+        if path:
+            path = Path(path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if path.exists():
+                with open(path, "r") as f:
+                    for line in f:
+                        try:
+                            description = json.loads(line)
+                        except json.JSONDecodeError:
+                            break
+                        self._ids[description] = len(self._strings)
+                        self._strings.append(description)
+                        self._refs.append(0)
+            self._file = open(path, "a")
+
+    def intern(self, description, references=1):
+        """
+        Get the id of a description, assigning a new one if needed.
+
+        Args:
+            description (str): Activity description
+            references (int): Number of references taken on the id; each is given back
+                with release()
+
+        Returns:
+            int: Description id
+        """
+        if self.persistent:
+            description_id = self._ids.get(description)
+            if description_id is not None:
+                return description_id
+        with self._lock:
+            description_id = self._ids.get(description)
+            if description_id is None:
+                if self._free:
+                    description_id = self._free.pop()
+                    self._strings[description_id] = description
+                    self._refs[description_id] = 0
+                else:
+                    description_id = len(self._strings)
+                    self._strings.append(description)
+                    self._refs.append(0)
+                if self._file is not None:
+                    self._file.write(json.dumps(description) + "\n")
+                    self._file.flush()
+                self._ids[description] = description_id
+            if not self.persistent:
+                self._refs[description_id] += references
+        return description_id
+
+    def release(self, description_id, references=1):
+        """Drop references taken by intern(), freeing the description after the last one."""
+        if self.persistent:
+            return
+        with self._lock:
+            self._refs[description_id] -= references
+            if self._refs[description_id] <= 0:
+                del self._ids[self._strings[description_id]]
+                self._strings[description_id] = None
+                self._refs[description_id] = 0
+                self._free.append(description_id)
+
+    def lookup(self, description_id):
+        """Get the description for an id."""
+        return self._strings[description_id]
+
+    def __len__(self):
+        """Number of descriptions currently interned."""
+        return len(self._ids)
+
+
+# Shared by every portal so that repeated descriptions are stored once per process;
+# a description is dropped once it leaves every portal's ring
+DESCRIPTIONS = DescriptionTable()
+
+
+class ActivityStore:
+    """Fixed-capacity ring buffer of portal activities with optional disk spill."""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, descriptions=None, spill_path=None, clock=time.time):
+        """
+        Initialize the store.
+
+        Args:
+            capacity (int): Number of activities kept in memory
+            descriptions (DescriptionTable, optional): Interning table, shared by default
+            spill_path (str, optional): Binary file receiving activities evicted from memory
+            clock (callable): Returns the current time in epoch seconds, used for
+                activities recorded without a timestamp
+        """
+        self.capacity = capacity
+        self.clock = clock
+        self.descriptions = descriptions or DESCRIPTIONS
+        self._timestamps = array("q", bytes(8 * capacity))
+        self._description_ids = array("i", bytes(4 * capacity))
+        self._start = 0
+        self._size = 0
+        self._evicted = 0
+        self._last_timestamp = 0
+        self._spill = None
+        self._spill_count = 0
+        if spill_path:
+            spill_path = Path(spill_path)
+            spill_path.parent.mkdir(parents=True, exist_ok=True)
+            self._spill = open(spill_path, "a+b")
+            self._spill_count = os.path.getsize(spill_path) // SPILL_RECORD.size
+            if self._spill_count:
+                self._last_timestamp = self._read_spilled(self._spill_count - 1)[0]
+
+    def __len__(self):
+        """Number of activities held in memory."""
+        return self._size
+
+    @property
+    def total_count(self):
+        """Number of activities recorded, including evicted and spilled ones."""
+        return self._evicted + self._size + self._spill_count
+
+    def append(self, description, timestamp_ms=None):
+        """
+        Record an activity.
+
+        Timestamps are clamped to be non-decreasing so the buffer stays sorted.
+
+        Returns:
+            dict: The activity as {"description", "timestamp"}
+        """
+        if timestamp_ms is None:
+            timestamp_ms = int(self.clock() * 1000)
+        timestamp_ms = max(timestamp_ms, self._last_timestamp)
+        self._last_timestamp = timestamp_ms
+        description_id = self.descriptions.intern(description)
+
+        if self._size == self.capacity:
+            # Evict the oldest entry
+            if self._spill is not None:
+                self._spill.write(SPILL_RECORD.pack(self._timestamps[self._start],
+                                                    self._description_ids[self._start]))
+                self._spill.flush()
+                self._spill_count += 1
+            else:
+                self._evicted += 1
+                self.descriptions.release(self._description_ids[self._start])
+            slot = self._start
+            self._start = (self._start + 1) % self.capacity
+        else:
+            slot = (self._start + self._size) % self.capacity
+            self._size += 1
+
+        self._timestamps[slot] = timestamp_ms
+        self._description_ids[slot] = description_id
+        return {"description": description, "timestamp": _iso(timestamp_ms)}
+
+    def _slot(self, position):
+        """Map a logical position (0 = oldest in memory) to a buffer slot."""
+        return (self._start + position) % self.capacity
+
+    def _entry(self, position):
+        """Get the in-memory activity at a logical position."""
+        slot = self._slot(position)
+        return {
+            "description": self.descriptions.lookup(self._description_ids[slot]),
+            "timestamp": _iso(self._timestamps[slot])
+        }
+
+    def _bisect_memory(self, timestamp_ms):
+        """First logical position whose timestamp is >= timestamp_ms."""
+        lo, hi = 0, self._size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._timestamps[self._slot(mid)] < timestamp_ms:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _read_spilled(self, index):
+        """Read the spilled record at an index."""
+        self._spill.seek(index * SPILL_RECORD.size)
+        return SPILL_RECORD.unpack(self._spill.read(SPILL_RECORD.size))
+
+    def _bisect_spill(self, timestamp_ms):
+        """First spilled record index whose timestamp is >= timestamp_ms."""
+        lo, hi = 0, self._spill_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._read_spilled(mid)[0] < timestamp_ms:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def last(self):
+        """Get the most recent activity, or None."""
+        if self._size == 0:
+            return None
+        return self._entry(self._size - 1)
+
+    def between(self, start_ms=None, end_ms=None, limit=None):
+        """
+        Get activities with start_ms <= timestamp < end_ms in chronological order.
+
+        Args:
+            start_ms (int, optional): Inclusive lower bound in epoch milliseconds
+            end_ms (int, optional): Exclusive upper bound in epoch milliseconds
+            limit (int, optional): Only return the most recent matching activities
+
+        Returns:
+            list: Activities as {"description", "timestamp"}
+        """
+        first = 0 if start_ms is None else self._bisect_memory(start_ms)
+        last = self._size if end_ms is None else self._bisect_memory(end_ms)
+        if limit is not None:
+            first = max(first, last - limit)
+        results = [self._entry(position) for position in range(first, last)]
+
+        reaches_spill = first == 0 and (start_ms is None or self._size == 0
+                                        or self._timestamps[self._start] >= start_ms)
+        if self._spill is not None and self._spill_count and reaches_spill:
+            remaining = None if limit is None else limit - len(results)
+            if remaining is None or remaining > 0:
+                spill_first = 0 if start_ms is None else self._bisect_spill(start_ms)
+                spill_last = self._spill_count if end_ms is None else self._bisect_spill(end_ms)
+                if remaining is not None:
+                    spill_first = max(spill_first, spill_last - remaining)
+                spilled = []
+                for index in range(spill_first, spill_last):
+                    timestamp_ms, description_id = self._read_spilled(index)
+                    spilled.append({
+                        "description": self.descriptions.lookup(description_id),
+                        "timestamp": _iso(timestamp_ms)
+                    })
+                results = spilled + results
+
+        return results
+
+    def export(self):
+        """
+        Get the in-memory activities for a snapshot.
+
+        Returns:
+            tuple: (timestamps array, list of descriptions, number of activities evicted
+                from memory without spilling), oldest first
+        """
+        slots = [self._slot(position) for position in range(self._size)]
+        timestamps = array("q", [self._timestamps[slot] for slot in slots])
+        descriptions = [self.descriptions.lookup(self._description_ids[slot]) for slot in slots]
+        return timestamps, descriptions, self._evicted
+
+    def restore(self, timestamps, description_ids, descriptions, evicted=0):
+        """
+        Load exported activities into an empty store.
+
+        Args:
+            timestamps (array): Epoch-ms timestamps, oldest first
+            description_ids (array): Index into descriptions of each activity
+            descriptions (list): Distinct descriptions
+            evicted (int): Activities evicted before the oldest one
+
+        Returns:
+            int: Number of activities restored
+        """
+        if self._size or self._evicted:
+            return 0
+        # Entries older than the spill file's tail were spilled after the snapshot was taken
+        first = bisect.bisect_left(timestamps, self._last_timestamp)
+        count = len(timestamps) - first
+        keep = min(count, self.capacity)
+        start = first + count - keep
+        kept = description_ids[start:]
+        # One reference per ring entry
+        interned = {i: self.descriptions.intern(descriptions[i], references)
+                    for i, references in Counter(kept).items()}
+        self._timestamps[:keep] = timestamps[start:]
+        self._description_ids[:keep] = array("i", [interned[i] for i in kept])
+        self._start = 0
+        self._size = keep
+        self._evicted = evicted + (count - keep if self._spill is None else 0)
+        if keep:
+            self._last_timestamp = max(self._last_timestamp, self._timestamps[keep - 1])
+        return keep
+
+    def clear(self):
+        """Drop the activities held in memory and the evicted count, e.g. to restore newer ones."""
+        for position in range(self._size):
+            self.descriptions.release(self._description_ids[self._slot(position)])
+        self._start = 0
+        self._size = 0
+        self._evicted = 0
+        self._last_timestamp = self._read_spilled(self._spill_count - 1)[0] if self._spill_count else 0
+
+    def close(self):
+        """Close the spill file if one is open."""
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
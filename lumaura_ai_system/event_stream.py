@@ -0,0 +1,150 @@
+"""
+Event Stream
+
+This module provides the push channel of the Portal Evolution System.
+Events (activities, recommendations, stage changes) are serialised once into
+Server-Sent Events frames and fanned out to every subscriber. Each subscriber has
+a bounded queue that drops its oldest frames when the client falls behind, and a
+short history lets reconnecting clients resume from their last event id.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HISTORY_SIZE = 1000
+DEFAULT_QUEUE_SIZE = 256
+
+
+def _frame(event_id, event_type, data):
+    """Format an event as a Server-Sent Events frame."""
+    return f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+class Subscription:
+    """Bounded queue of event frames for one subscriber."""
+
+    def __init__(self, queue_size):
+        """Initialize an empty subscription."""
+        self._frames = deque(maxlen=queue_size)
+        self._condition = threading.Condition()
+        self.dropped = 0
+        self._unreported_drops = 0
+        self.closed = False
+
+    def push(self, frame):
+        """Queue a frame, dropping the oldest one if the queue is full."""
+        with self._condition:
+            if len(self._frames) == self._frames.maxlen:
+                self.dropped += 1
+                self._unreported_drops += 1
+            self._frames.append(frame)
+            self._condition.notify()
+
+    def get(self, timeout=None):
+        """
+        Wait for frames and drain them.
+
+        Returns:
+            tuple: (frames, number of frames dropped since the last call)
+        """
+        with self._condition:
+            if not self._frames and not self.closed:
+                self._condition.wait(timeout)
+            frames = list(self._frames)
+            self._frames.clear()
+            dropped, self._unreported_drops = self._unreported_drops, 0
+        return frames, dropped
+
+    def close(self):
+        """Wake up a waiting reader and mark the subscription closed."""
+        with self._condition:
+            self.closed = True
+            self._condition.notify()
+
+
+class EventBroker:
+    """Fan-out of portal events to Server-Sent Events subscribers."""
+
+    def __init__(self, history_size=DEFAULT_HISTORY_SIZE, queue_size=DEFAULT_QUEUE_SIZE):
+        """
+        Initialize the broker.
+
+        Args:
+            history_size (int): Recent events kept for resuming clients
+            queue_size (int): Maximum frames queued per subscriber
+        """
+        self.queue_size = queue_size
+        self._history = deque(maxlen=history_size)
+        self._subscribers = ()
+        self._lock = threading.Lock()
+        self._next_id = 1
+        self._published = 0
+        # Event ids are "<epoch>-<n>" so ids from before a restart are recognisable
+        self.epoch = int(time.time() * 1000)
+
+    def publish(self, event_type, data):
+        """
+        Publish an event to every subscriber.
+
+        Returns:
+            str: The event id
+        """
+        with self._lock:
+            number = self._next_id
+            self._next_id += 1
+            event_id = f"{self.epoch}-{number}"
+            frame = _frame(event_id, event_type, data)
+            self._history.append((number, frame))
+            self._published += 1
+            # Pushing under the lock keeps every subscriber's frames in id order
+            for subscription in self._subscribers:
+                subscription.push(frame)
+        return event_id
+
+    def subscribe(self, last_event_id=None):
+        """
+        Add a subscriber.
+
+        Args:
+            last_event_id (str, optional): Last event id the client received. Newer events
+                still in the history are replayed; an id from another epoch or older than the history gets a reset event.
+
+        Returns:
+            Subscription: Queue of frames for the new subscriber
+        """
+        subscription = Subscription(self.queue_size)
+        with self._lock:
+            if last_event_id:
+                epoch, _, number = last_event_id.partition("-")
+                resumable = epoch == str(self.epoch) and number.isdigit() and (
+                    not self._history or int(number) >= self._history[0][0] - 1
+                )
+                if resumable:
+                    for event_number, frame in self._history:
+                        if event_number > int(number):
+                            subscription.push(frame)
+                else:
+                    subscription.push(_frame(f"{self.epoch}-{self._next_id - 1}", "reset", {"reason": "unknown_event_id"}))
+            self._subscribers = self._subscribers + (subscription,)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Remove a subscriber."""
+        subscription.close()
+        with self._lock:
+            self._subscribers = tuple(s for s in self._subscribers if s is not subscription)
+
+    def stats(self):
+        """Get broker statistics."""
+        subscribers = self._subscribers
+        return {
+            "subscribers": len(subscribers),
+            "published": self._published,
+            "history": len(self._history),
+            "dropped": sum(s.dropped for s in subscribers)
+        }
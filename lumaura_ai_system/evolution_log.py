@@ -0,0 +1,303 @@
+"""
+Evolution Log
+
+This module provides a segmented, append-only write-ahead log for portal evolution state.
+Every score or stage change is appended as one small JSON line, so a write costs O(delta)
+instead of rewriting the state of every portal; a decay sweep over every portal is a single
+aggregate record. The log is periodically compacted into the binary evolution_data.snap
+snapshot (see state_snapshot) and replayed on top of that snapshot at startup. A legacy evolution_data.json snapshot is read if no binary one exists.
+"""
+
+import os
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+
+from lumaura_ai_system.portals.base import stage_for_score
+from lumaura_ai_system.state_snapshot import SnapshotError, StateSnapshot, write_snapshot
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".log"
+
+
+def _apply_decay(state, factor):
+    """Replay a decay record: multiply every portal's score and re-derive its stage."""
+    for portal_state in state.values():
+        score = portal_state["evolution_score"] * factor
+        portal_state["evolution_score"] = score
+        portal_state["evolution_stage"] = stage_for_score(score).value
+
+
+class EvolutionLog:
+    """Append-only log of portal score and stage deltas with snapshot compaction."""
+
+    def __init__(self, data_dir="data/portal_evolution", snapshot_name="evolution_data.snap",
+                 max_segment_entries=5000, compact_after_segments=4, fsync=False,
+                 legacy_snapshot_name="evolution_data.json", clock=time.time):
+        """
+        Initialize the evolution log.
+
+        Args:
+            data_dir (str): Directory holding the snapshot and the log segments
+            snapshot_name (str): File name of the compacted binary snapshot
+            max_segment_entries (int): Entries written to a segment before it is sealed
+            compact_after_segments (int): Sealed segments that trigger a compaction
+            fsync (bool): Force every append to stable storage
+            legacy_snapshot_name (str): JSON snapshot read when there is no binary snapshot
+            clock (callable): Returns the current time in epoch seconds, stamped on log entries
+        """
+        self.data_dir = Path(data_dir)
+        self.snapshot_file = self.data_dir / snapshot_name
+        self.legacy_snapshot_file = self.data_dir / legacy_snapshot_name
+        # Open binary snapshot; portal history records are decoded from it on demand
+        self.snapshot = None
+        self.log_dir = self.data_dir / "wal"
+        self.max_segment_entries = max_segment_entries
+        self.compact_after_segments = compact_after_segments
+        self.fsync = fsync
+        self.clock = clock
+        self._lock = threading.Lock()
+        # Serialises compactions, which share the snapshot's temporary file
+        self._compact_lock = threading.Lock()
+        self._sequence = 0
+        self._segment = None
+        self._segment_index = 0
+        self._segment_entries = 0
+        self._sealed_segments = []
+
+    def _segment_path(self, index):
+        """Get the path of the segment with the given index."""
+        return self.log_dir / f"{SEGMENT_PREFIX}{index:08d}{SEGMENT_SUFFIX}"
+
+    def _list_segments(self):
+        """List existing segment files ordered by index."""
+        if not self.log_dir.exists():
+            return []
+        segments = []
+        for path in self.log_dir.glob(f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}"):
+            try:
+                index = int(path.name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+            except ValueError:
+                continue
+            segments.append((index, path))
+        return sorted(segments)
+
+    def has_data(self):
+        """Check for a snapshot, legacy snapshot or log segment to load, without creating any."""
+        return (self.snapshot_file.exists() or self.legacy_snapshot_file.exists()
+                or bool(self._list_segments()))
+
+    def load(self):
+        """
+        Load the snapshot and replay all log segments written after it.
+
+        Returns:
+            dict: Portal name -> {"evolution_score", "evolution_stage"}
+        """
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+
+        state = {}
+        snapshot_sequence = 0
+        if self.snapshot_file.exists():
+            try:
+                self.snapshot = StateSnapshot(self.snapshot_file)
+                for portal_name, score in self.snapshot.scores().items():
+                    state[portal_name] = {
+                        "evolution_score": score,
+                        "evolution_stage": stage_for_score(score).value
+                    }
+                snapshot_sequence = self.snapshot.log_sequence
+            except (OSError, SnapshotError) as e:
+                logger.error(f"Error loading evolution snapshot: {e}")
+        elif self.legacy_snapshot_file.exists():
+            try:
+                with open(self.legacy_snapshot_file, "r") as f:
+                    data = json.load(f)
+                for portal_name, portal_data in data.get("portals", {}).items():
+                    state[portal_name] = {
+                        "evolution_score": portal_data.get("evolution_score", 0),
+                        "evolution_stage": portal_data.get("evolution_stage")
+                    }
+                snapshot_sequence = data.get("log_sequence", 0)
+            except Exception as e:
+                logger.error(f"Error loading evolution snapshot: {e}")
+
+        last_sequence = snapshot_sequence
+        replayed = 0
+        segments = self._list_segments()
+        for index, path in segments:
+            with open(path, "r") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn write can only be the tail of a segment
+                        logger.warning(f"Ignoring truncated entry at end of {path.name}")
+                        break
+                    if entry["seq"] <= snapshot_sequence:
+                        continue
+                    if "decay" in entry:
+                        _apply_decay(state, entry["decay"])
+                    else:
+                        state[entry["portal"]] = {
+                            "evolution_score": entry["score"],
+                            "evolution_stage": entry["stage"]
+                        }
+                    last_sequence = max(last_sequence, entry["seq"])
+                    replayed += 1
+
+        with self._lock:
+            self._sequence = last_sequence
+            self._sealed_segments = [path for _, path in segments]
+            self._segment_index = segments[-1][0] if segments else 0
+            self._open_next_segment()
+
+        logger.info(f"Replayed {replayed} evolution log entries from {len(segments)} segments")
+        return state
+
+    def _open_next_segment(self):
+        """Seal the current segment and start a new one. Caller holds the lock."""
+        if self._segment is not None:
+            self._segment.close()
+            self._sealed_segments.append(self._segment_path(self._segment_index))
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self._segment_index += 1
+        self._segment = open(self._segment_path(self._segment_index), "a")
+        self._segment_entries = 0
+
+    def _write_entry(self, portal_name, delta, score, stage):
+        """Write a single entry to the current segment. Caller holds the lock."""
+        if self._segment is None or self._segment_entries >= self.max_segment_entries:
+            self._open_next_segment()
+        self._sequence += 1
+        entry = {
+            "seq": self._sequence,
+            "portal": portal_name,
+            "delta": delta,
+            "score": score,
+            "stage": stage,
+            "ts": self.clock()
+        }
+        self._segment.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        self._segment_entries += 1
+
+    def _flush(self):
+        """Flush the current segment to the OS (and disk if fsync is set). Caller holds the lock."""
+        self._segment.flush()
+        if self.fsync:
+            os.fsync(self._segment.fileno())
+
+    def append(self, portal_name, delta, score, stage):
+        """Append one score/stage change for a portal."""
+        with self._lock:
+            self._write_entry(portal_name, delta, score, stage)
+            self._flush()
+
+    def append_many(self, entries, flush=True):
+        """
+        Append several (portal_name, delta, score, stage) changes.
+
+        Args:
+            entries (iterable): Changes to append, in order
+            flush (bool): Flush once after the entries; pass False to batch several
+                calls and call flush() at the end
+        """
+        with self._lock:
+            for portal_name, delta, score, stage in entries:
+                self._write_entry(portal_name, delta, score, stage)
+            if flush and self._segment is not None:
+                self._flush()
+
+    def append_decay(self, factor):
+        """Append one record multiplying the score of every portal by a decay factor."""
+        with self._lock:
+            if self._segment is None or self._segment_entries >= self.max_segment_entries:
+                self._open_next_segment()
+            self._sequence += 1
+            entry = {"seq": self._sequence, "decay": factor, "ts": self.clock()}
+            self._segment.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            self._segment_entries += 1
+            self._flush()
+    
+    def flush(self):
+        """Flush entries appended without flushing."""
+        with self._lock:
+            if self._segment is not None:
+                self._flush()
+
+    def needs_compaction(self):
+        """Check whether enough sealed segments have accumulated to compact."""
+        return len(self._sealed_segments) >= self.compact_after_segments
+
+    def compact(self, state_provider, sections=None):
+        """
+        Write a fresh snapshot and drop the segments it covers.
+
+        Args:
+            state_provider (callable): Returns portal name -> {"evolution_score", "evolution_stage"},
+                optionally with "record", the portal's encoded history (see state_snapshot).
+                Portals without a record keep the one from the previous snapshot. It is called
+                after the log is rotated, so the state it returns includes every entry covered
+                by the snapshot. Later score entries carry absolute scores and replay
+                idempotently on top; decay records do not, so the caller must not apply a
+                decay between the rotation and the state read.
+            sections (callable, optional): Returns section name -> JSON-serialisable value
+                to store alongside the portals
+        """
+        with self._compact_lock:
+            return self._compact(state_provider, sections)
+
+    def _compact(self, state_provider, sections):
+        """Write the snapshot. Caller holds the compaction lock."""
+        with self._lock:
+            if self._segment is None:
+                self.log_dir.mkdir(parents=True, exist_ok=True)
+            else:
+                self._open_next_segment()
+            sequence = self._sequence
+            covered = self._sealed_segments
+            self._sealed_segments = []
+
+        previous = self.snapshot
+
+        def portals():
+            for name, portal_state in state_provider().items():
+                record = portal_state.get("record")
+                if record is None and previous is not None:
+                    try:
+                        record = previous.record_bytes(name)
+                    except SnapshotError as e:
+                        logger.error(f"Dropping history of {name}: {e}")
+                yield name, portal_state["evolution_score"], record or b""
+
+        try:
+            size = write_snapshot(self.snapshot_file, sequence, portals(), sections() if sections else None)
+            self.snapshot = StateSnapshot(self.snapshot_file)
+        except Exception as e:
+            logger.error(f"Error writing evolution snapshot: {e}")
+            with self._lock:
+                self._sealed_segments = covered + self._sealed_segments
+            return False
+        if previous is not None:
+            previous.close()
+
+        for path in covered:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+        logger.info(f"Compacted evolution log into a {size}-byte snapshot of {len(self.snapshot)} portals")
+        return True
+
+    def close(self):
+        """Flush and close the current segment."""
+        with self._lock:
+            if self._segment is not None:
+                self._flush()
+                self._segment.close()
+                self._segment = None
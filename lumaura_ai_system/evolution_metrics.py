@@ -0,0 +1,299 @@
+"""
+Evolution Metrics
+
+This module provides an embedded time-series store for portal evolution metrics.
+Each event updates the current bucket of every resolution (1 minute, 1 hour, 1 day),
+so rollups are maintained at write time and queries never scan raw activities.
+Buckets older than a resolution's retention are dropped as new buckets open.
+The coarse rollups (1 hour, 1 day) can be exported for persistence and merged back
+after a restart; minute buckets only live in memory. A store shared by several processes
+is sent increments instead, so each process adds its own counts to the stored buckets.
+"""
+
+import bisect
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Resolution -> (bucket width in seconds, retention in seconds)
+RESOLUTIONS = {
+    "1m": (60, 24 * 3600),
+    "1h": (3600, 31 * 24 * 3600),
+    "1d": (86400, 366 * 24 * 3600),
+}
+
+# Resolutions persisted across restarts
+PERSISTED_RESOLUTIONS = ("1h", "1d")
+
+# Raw stage transitions kept per portal
+MAX_STAGE_TRANSITIONS = 1000
+
+# Bucket layout: [activities, score_open, score_close, score_min, score_max, stage_transitions]
+ACTIVITIES, OPEN, CLOSE, LOW, HIGH, TRANSITIONS = range(6)
+
+
+class _Series:
+    """Buckets of one resolution for one portal, ordered by start time."""
+
+    def __init__(self, width, retention):
+        self.width = width
+        self.retention = retention
+        self.starts = []
+        self.buckets = []
+        # Bucket start -> [activities, stage transitions] already in the persistent store
+        self.saved = {}
+
+    def bucket(self, timestamp, score):
+        """Get the bucket covering a timestamp, opening a new one if needed."""
+        start = int(timestamp // self.width) * self.width
+        if self.starts and self.starts[-1] == start:
+            return self.buckets[-1]
+        if self.starts and start < self.starts[-1]:
+            # Late event: fold into the bucket that covers it if still retained
+            index = bisect.bisect_right(self.starts, start) - 1
+            if index >= 0 and self.starts[index] == start:
+                return self.buckets[index]
+            return None
+        self.starts.append(start)
+        self.buckets.append([0, score, score, score, score, 0])
+        cutoff = start - self.retention
+        if self.starts[0] < cutoff:
+            drop = bisect.bisect_left(self.starts, cutoff)
+            for dropped in self.starts[:drop]:
+                self.saved.pop(dropped, None)
+            del self.starts[:drop]
+            del self.buckets[:drop]
+        return self.buckets[-1]
+
+    def merge(self, start, bucket):
+        """Merge a persisted bucket into the series, keeping it ordered by start time."""
+        saved = self.saved.setdefault(start, [0, 0])
+        saved[0] += bucket[ACTIVITIES]
+        saved[1] += bucket[TRANSITIONS]
+        index = bisect.bisect_left(self.starts, start)
+        if index < len(self.starts) and self.starts[index] == start:
+            current = self.buckets[index]
+            current[ACTIVITIES] += bucket[ACTIVITIES]
+            current[TRANSITIONS] += bucket[TRANSITIONS]
+            current[OPEN] = bucket[OPEN]
+            current[LOW] = min(current[LOW], bucket[LOW])
+            current[HIGH] = max(current[HIGH], bucket[HIGH])
+        else:
+            self.starts.insert(index, start)
+            self.buckets.insert(index, list(bucket))
+
+    def query(self, start=None, end=None):
+        """Get (start, bucket) pairs with start <= bucket start < end."""
+        first = 0 if start is None else bisect.bisect_left(self.starts, int(start // self.width) * self.width)
+        last = len(self.starts) if end is None else bisect.bisect_left(self.starts, end)
+        return list(zip(self.starts[first:last], [list(b) for b in self.buckets[first:last]]))
+
+
+class _PortalMetrics:
+    """All series of one portal plus its raw stage transitions."""
+
+    def __init__(self, resolutions):
+        self.lock = threading.Lock()
+        self.series = {name: _Series(width, retention) for name, (width, retention) in resolutions.items()}
+        self.transitions = deque(maxlen=MAX_STAGE_TRANSITIONS)
+
+
+class EvolutionMetrics:
+    """Per-portal activity counts, score trajectory and stage transitions with rollups."""
+
+    def __init__(self, resolutions=RESOLUTIONS, clock=time.time):
+        """
+        Initialize the metrics store.
+
+        Args:
+            resolutions (dict): Resolution name -> (bucket width seconds, retention seconds)
+            clock (callable): Returns the current time in epoch seconds
+        """
+        self.resolutions = resolutions
+        self.clock = clock
+        self._portals = {}
+        self._lock = threading.Lock()
+        # Serializes save_increments, so no increment is sent twice
+        self._save_lock = threading.Lock()
+
+    def _portal(self, portal_name):
+        """Get or create the metrics of a portal."""
+        metrics = self._portals.get(portal_name)
+        if metrics is None:
+            with self._lock:
+                metrics = self._portals.setdefault(portal_name, _PortalMetrics(self.resolutions))
+        return metrics
+
+    def _update(self, portal_name, score, activities, transitions, timestamp):
+        """Apply an event to the current bucket of every resolution."""
+        timestamp = self.clock() if timestamp is None else timestamp
+        metrics = self._portal(portal_name)
+        with metrics.lock:
+            for series in metrics.series.values():
+                bucket = series.bucket(timestamp, score)
+                if bucket is None:
+                    continue
+                bucket[ACTIVITIES] += activities
+                bucket[TRANSITIONS] += transitions
+                bucket[CLOSE] = score
+                if score < bucket[LOW]:
+                    bucket[LOW] = score
+                if score > bucket[HIGH]:
+                    bucket[HIGH] = score
+
+    def record_activity(self, portal_name, score, timestamp=None):
+        """Count an activity and sample the portal's score."""
+        self._update(portal_name, score, 1, 0, timestamp)
+
+    def record_score(self, portal_name, score, timestamp=None):
+        """Sample the portal's score without counting an activity."""
+        self._update(portal_name, score, 0, 0, timestamp)
+
+    def record_stage_transition(self, portal_name, old_stage, new_stage, score, timestamp=None):
+        """Record a stage transition."""
+        timestamp = self.clock() if timestamp is None else timestamp
+        self._update(portal_name, score, 0, 1, timestamp)
+        metrics = self._portal(portal_name)
+        with metrics.lock:
+            metrics.transitions.append((timestamp, old_stage, new_stage, score))
+
+    def query(self, portal_name, resolution="1h", start=None, end=None):
+        """
+        Get rolled-up buckets for a portal.
+
+        Args:
+            portal_name (str): Portal to query
+            resolution (str): One of the configured resolutions ("1m", "1h", "1d")
+            start (float, optional): Inclusive lower bound in epoch seconds
+            end (float, optional): Exclusive upper bound in epoch seconds
+
+        Returns:
+            list: Buckets as {"start", "activities", "score": {"open", "close", "min", "max"}, "stage_transitions"}
+        """
+        if resolution not in self.resolutions:
+            raise ValueError(f"Unknown resolution: {resolution}")
+        metrics = self._portals.get(portal_name)
+        if metrics is None:
+            return []
+        with metrics.lock:
+            buckets = metrics.series[resolution].query(start, end)
+        return [
+            {
+                "start": datetime.fromtimestamp(bucket_start).isoformat(),
+                "activities": bucket[ACTIVITIES],
+                "score": {"open": bucket[OPEN], "close": bucket[CLOSE], "min": bucket[LOW], "max": bucket[HIGH]},
+                "stage_transitions": bucket[TRANSITIONS]
+            }
+            for bucket_start, bucket in buckets
+        ]
+
+    def export(self, resolutions=PERSISTED_RESOLUTIONS, since=None):
+        """
+        Get rolled-up buckets for persisting.
+
+        Args:
+            resolutions (tuple): Resolutions to export
+            since (float, optional): Only export buckets covering this time (epoch seconds)
+                or later, i.e. the buckets updated since then
+
+        Returns:
+            dict: Resolution -> portal name -> list of
+                [start, activities, score open, score close, score min, score max, stage transitions]
+        """
+        exported = {resolution: {} for resolution in resolutions if resolution in self.resolutions}
+        for portal_name, metrics in list(self._portals.items()):
+            with metrics.lock:
+                for resolution, by_portal in exported.items():
+                    buckets = metrics.series[resolution].query(since)
+                    if buckets:
+                        by_portal[portal_name] = [[bucket_start, *bucket] for bucket_start, bucket in buckets]
+        return exported
+
+    def save_increments(self, save, resolutions=PERSISTED_RESOLUTIONS, since=None):
+        """
+        Pass the buckets updated since a time to a store shared with other processes.
+
+        Activity and stage transition counts are the increments since the previous save (or
+        since the bucket was restored), for the store to add to what other processes saved;
+        scores are as in export(). Increments only count as saved once save() returns.
+
+        Args:
+            save (callable): Takes the increments in the layout of export()
+            resolutions (tuple): Resolutions to save
+            since (float, optional): Only save buckets covering this time (epoch seconds) or later
+
+        Returns:
+            int: Number of buckets saved
+        """
+        with self._save_lock:
+            increments = {resolution: {} for resolution in resolutions if resolution in self.resolutions}
+            marks = []
+            for portal_name, metrics in list(self._portals.items()):
+                with metrics.lock:
+                    for resolution, by_portal in increments.items():
+                        series = metrics.series[resolution]
+                        rows = []
+                        for bucket_start, bucket in series.query(since):
+                            saved = series.saved.get(bucket_start, (0, 0))
+                            activities = bucket[ACTIVITIES] - saved[0]
+                            transitions = bucket[TRANSITIONS] - saved[1]
+                            rows.append([bucket_start, activities, *bucket[OPEN:TRANSITIONS], transitions])
+                            marks.append((metrics, series, bucket_start, activities, transitions))
+                        if rows:
+                            by_portal[portal_name] = rows
+            if not marks:
+                return 0
+            save(increments)
+            for metrics, series, bucket_start, activities, transitions in marks:
+                with metrics.lock:
+                    saved = series.saved.setdefault(bucket_start, [0, 0])
+                    saved[0] += activities
+                    saved[1] += transitions
+            return len(marks)
+
+    def restore(self, exported):
+        """
+        Merge buckets produced by export() back in, e.g. after a restart.
+
+        Buckets past their resolution's retention are skipped.
+
+        Returns:
+            int: Number of buckets restored
+        """
+        restored = 0
+        now = self.clock()
+        for resolution, by_portal in (exported or {}).items():
+            if resolution not in self.resolutions:
+                continue
+            cutoff = now - self.resolutions[resolution][1]
+            for portal_name, buckets in by_portal.items():
+                metrics = self._portal(portal_name)
+                with metrics.lock:
+                    series = metrics.series[resolution]
+                    for bucket_start, *bucket in buckets:
+                        if bucket_start >= cutoff:
+                            series.merge(bucket_start, bucket)
+                            restored += 1
+        return restored
+
+    def stage_transitions(self, portal_name, start=None, end=None):
+        """Get the recorded stage transitions of a portal between start and end (epoch seconds)."""
+        metrics = self._portals.get(portal_name)
+        if metrics is None:
+            return []
+        with metrics.lock:
+            transitions = list(metrics.transitions)
+        return [
+            {
+                "timestamp": datetime.fromtimestamp(timestamp).isoformat(),
+                "old_stage": old_stage,
+                "new_stage": new_stage,
+                "evolution_score": score
+            }
+            for timestamp, old_stage, new_stage, score in transitions
+            if (start is None or timestamp >= start) and (end is None or timestamp < end)
+        ]
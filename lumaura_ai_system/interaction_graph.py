@@ -0,0 +1,215 @@
+"""
+Interaction Graph
+
+This module provides the directed, weighted graph of interactions between portals.
+Edges are added incrementally as portals recommend to each other and act together, and
+are indexed as outgoing and incoming adjacency maps so neighbour lookups never scan the
+recommendation history. Query results are cached and the cache is dropped whenever an
+edge changes.
+"""
+
+import heapq
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Edge weight added per interaction kind
+INTERACTION_WEIGHTS = {
+    "recommendation": 1.0,
+    "implemented_recommendation": 2.0,
+    "activity": 0.5,
+}
+
+DEFAULT_DAMPING = 0.85
+MAX_INFLUENCE_ITERATIONS = 100
+INFLUENCE_TOLERANCE = 1e-9
+
+
+class InteractionGraph:
+    """Directed weighted portal graph with adjacency indexes and a query cache."""
+
+    def __init__(self):
+        """Initialize an empty graph."""
+        # Source -> target -> weight, and the reverse index
+        self._out = {}
+        self._in = {}
+        self._edge_counts = {}
+        self._interactions = 0
+        self._lock = threading.Lock()
+        self._cache = {}
+        self.version = 0
+
+    def record(self, source_portal, target_portal, kind="recommendation", weight=None):
+        """
+        Record an interaction from one portal to another.
+
+        Args:
+            source_portal (str): Portal the interaction comes from
+            target_portal (str): Portal the interaction is directed at
+            kind (str): Interaction kind, used for the default weight
+            weight (float, optional): Weight to add instead of the kind's default
+        """
+        if not source_portal or not target_portal or source_portal == target_portal:
+            return
+        weight = INTERACTION_WEIGHTS.get(kind, 1.0) if weight is None else weight
+        with self._lock:
+            targets = self._out.setdefault(source_portal, {})
+            targets[target_portal] = targets.get(target_portal, 0.0) + weight
+            self._in.setdefault(target_portal, {})[source_portal] = targets[target_portal]
+            self._out.setdefault(target_portal, {})
+            self._in.setdefault(source_portal, {})
+            key = (source_portal, target_portal)
+            self._edge_counts[key] = self._edge_counts.get(key, 0) + 1
+            self._interactions += 1
+            self.version += 1
+            self._cache = {}
+
+    def edges(self):
+        """Get every edge as [source, target, weight, interactions], e.g. for a snapshot."""
+        with self._lock:
+            return [[source, target, weight, self._edge_counts.get((source, target), 0)]
+                    for source, targets in self._out.items() for target, weight in targets.items()]
+
+    def load_edges(self, edges):
+        """Add edges exported by edges() to the graph."""
+        for source, target, weight, interactions in edges:
+            self.record(source, target, weight=weight)
+            if interactions > 1:
+                with self._lock:
+                    self._edge_counts[(source, target)] += interactions - 1
+                    self._interactions += interactions - 1
+
+    def _cached(self, key, compute):
+        """Return a cached query result, computing it if the graph changed since."""
+        cache = self._cache
+        if key in cache:
+            return cache[key]
+        with self._lock:
+            result = compute()
+            if self._cache is cache:
+                cache[key] = result
+        return result
+
+    def edge(self, source_portal, target_portal):
+        """Get an edge as {"source", "target", "weight", "interactions"}, or None."""
+        weight = self._out.get(source_portal, {}).get(target_portal)
+        if weight is None:
+            return None
+        return {
+            "source": source_portal,
+            "target": target_portal,
+            "weight": weight,
+            "interactions": self._edge_counts.get((source_portal, target_portal), 0)
+        }
+
+    def neighbours(self, portal_name, direction="both"):
+        """
+        Get the portals connected to a portal, strongest first.
+
+        Args:
+            portal_name (str): Portal to query
+            direction (str): "out" (portals it interacts with), "in" (portals interacting with it) or "both"
+
+        Returns:
+            list: {"portal", "weight"} dicts
+        """
+        if direction not in ("out", "in", "both"):
+            raise ValueError(f"Unknown direction: {direction}")
+
+        def compute():
+            weights = {}
+            if direction in ("out", "both"):
+                for name, weight in self._out.get(portal_name, {}).items():
+                    weights[name] = weights.get(name, 0.0) + weight
+            if direction in ("in", "both"):
+                for name, weight in self._in.get(portal_name, {}).items():
+                    weights[name] = weights.get(name, 0.0) + weight
+            return [{"portal": name, "weight": weight}
+                    for name, weight in sorted(weights.items(), key=lambda item: (-item[1], item[0]))]
+
+        return self._cached(("neighbours", portal_name, direction), compute)
+
+    def top_collaborators(self, portal_name, limit=5):
+        """Get the portals with the strongest combined interaction weight with a portal."""
+        return self.neighbours(portal_name, "both")[:limit]
+
+    def shortest_path(self, source_portal, target_portal):
+        """
+        Find the strongest chain of interactions from one portal to another.
+
+        Edges cost the inverse of their weight, so the path follows the strongest
+        relationships (Dijkstra's algorithm).
+
+        Returns:
+            dict: {"path": [portal names], "cost"}, or None if the target is unreachable
+        """
+        def compute():
+            if source_portal not in self._out or target_portal not in self._out:
+                return None
+            costs = {source_portal: 0.0}
+            previous = {}
+            heap = [(0.0, source_portal)]
+            while heap:
+                cost, name = heapq.heappop(heap)
+                if name == target_portal:
+                    path = [name]
+                    while name in previous:
+                        name = previous[name]
+                        path.append(name)
+                    return {"path": path[::-1], "cost": cost}
+                if cost > costs.get(name, float("inf")):
+                    continue
+                for neighbour, weight in self._out[name].items():
+                    candidate = cost + 1.0 / weight
+                    if candidate < costs.get(neighbour, float("inf")):
+                        costs[neighbour] = candidate
+                        previous[neighbour] = name
+                        heapq.heappush(heap, (candidate, neighbour))
+            return None
+
+        return self._cached(("path", source_portal, target_portal), compute)
+
+    def influence(self, damping=DEFAULT_DAMPING):
+        """
+        Rank portals by influence with weighted PageRank over the interaction edges.
+
+        A portal is influential when influential portals interact with it. Portals with no
+        outgoing edges spread their rank evenly.
+
+        Returns:
+            dict: Portal name -> influence score; scores sum to 1
+        """
+        def compute():
+            nodes = list(self._out)
+            if not nodes:
+                return {}
+            count = len(nodes)
+            totals = {name: sum(targets.values()) for name, targets in self._out.items()}
+            rank = {name: 1.0 / count for name in nodes}
+            for _ in range(MAX_INFLUENCE_ITERATIONS):
+                dangling = sum(rank[name] for name in nodes if not totals[name])
+                base = (1.0 - damping) / count + damping * dangling / count
+                updated = {}
+                for name in nodes:
+                    incoming = self._in.get(name, {})
+                    updated[name] = base + damping * sum(
+                        rank[source] * weight / totals[source] for source, weight in incoming.items()
+                    )
+                delta = sum(abs(updated[name] - rank[name]) for name in nodes)
+                rank = updated
+                if delta < INFLUENCE_TOLERANCE:
+                    break
+            return rank
+
+        return self._cached(("influence", damping), compute)
+
+    def stats(self):
+        """Get graph statistics."""
+        return {
+            "portals": len(self._out),
+            "edges": len(self._edge_counts),
+            "interactions": self._interactions,
+            "version": self.version,
+            "cached_queries": len(self._cache)
+        }
@@ -0,0 +1,103 @@
+"""
+Leader Election
+
+This module elects a single leader among the worker processes sharing a data directory.
+Leadership is an exclusive lock on a local file: the lock is released by the operating
+system when its holder exits, so a waiting process takes over after the leader dies.
+"""
+
+import logging
+import os
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+    logger.warning("fcntl not available. Every process will act as leader.")
+
+
+class LeaderElection:
+    """Exclusive file lock that makes one process the leader."""
+
+    def __init__(self, lock_path="data/portal_evolution/leader.lock", retry_interval=5.0, on_elected=None):
+        """
+        Initialize the election.
+
+        Args:
+            lock_path (str): File locked by the leader
+            retry_interval (float): Seconds between attempts while another process leads
+            on_elected (callable, optional): Called once in the process that becomes leader
+        """
+        self.lock_path = Path(lock_path)
+        self.retry_interval = retry_interval
+        self.on_elected = on_elected
+        self.is_leader = False
+        self._file = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def try_acquire(self):
+        """Try once to become the leader. Returns whether this process leads."""
+        if self.is_leader:
+            return True
+        if not FCNTL_AVAILABLE:
+            self._elected()
+            return True
+        self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+        lock_file = open(self.lock_path, "a+")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(f"{os.getpid()}\n")
+        lock_file.flush()
+        self._file = lock_file
+        self._elected()
+        return True
+
+    def _elected(self):
+        self.is_leader = True
+        logger.info(f"Process {os.getpid()} elected leader")
+        if self.on_elected is not None:
+            self.on_elected()
+
+    def start(self):
+        """Try to become leader now and keep retrying in the background until elected."""
+        if self.try_acquire() or self._thread is not None:
+            return
+        logger.info(f"Process {os.getpid()} waiting for leadership")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="leader-election")
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.retry_interval):
+            try:
+                if self.try_acquire():
+                    return
+            except Exception as e:
+                logger.error(f"Error during leader election: {e}")
+
+    def stop(self):
+        """Stop waiting for leadership and release it if held."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.retry_interval + 1)
+            self._thread = None
+        if self._file is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+        self.is_leader = False
+
+    def stats(self):
+        """Get the election state of this process."""
+        return {"pid": os.getpid(), "is_leader": self.is_leader, "lock_path": str(self.lock_path)}
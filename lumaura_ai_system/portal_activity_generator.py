@@ -5,11 +5,13 @@ This module generates simulated activities for portals in the LUMAURA AI System.
 This creates the appearance of an active, evolving ecosystem of portals.
 """
 
+import heapq
+import itertools
 import logging
 import random
 import threading
 import time
-from datetime import datetime
+from collections import deque
 
 logger = logging.getLogger(__name__)
 
@@ -48,86 +50,247 @@ CONTEXTS = [
     "for XUVE ecosystem", "for data analytics"
 ]
 
-def _generate_activity(portal_name):
+RECOMMENDATION_TYPES = [
+    "System Upgrade", "Collaboration Opportunity", "Optimization Strategy",
+    "Resource Allocation", "Integration Enhancement"
+]
+
+# Per-portal intervals in seconds between generated events
+DEFAULT_ACTIVITY_INTERVAL = (3, 15)
+DEFAULT_RECOMMENDATION_INTERVAL = (30, 120)
+
+# Only some recommendation ticks actually produce a recommendation
+RECOMMENDATION_PROBABILITY = 0.1
+
+# Window used for the generated-events/sec rate
+STATS_WINDOW_SECONDS = 60
+
+ACTIVITY = "activity"
+RECOMMENDATION = "recommendation"
+
+def _generate_activity(portal_name, rng=random):
     """Generate a random activity description for a portal."""
-    action = random.choice(ACTIONS)
-    target = random.choice(TARGETS)
-    context = random.choice(CONTEXTS)
+    action = rng.choice(ACTIONS)
+    target = rng.choice(TARGETS)
+    context = rng.choice(CONTEXTS)
     
     return f"{action} {target} {context}"
 
-def _activity_generation_loop(portal_system):
-    """Background loop that generates activities for random portals."""
-    while True:
-        try:
-            # Select a random portal
-            portal_names = list(portal_system.portals.keys())
-            if not portal_names:
-                time.sleep(10)
-                continue
-                
-            portal_name = random.choice(portal_names)
-            
-            # Generate and record activity
-            activity = _generate_activity(portal_name)
-            portal_system.record_portal_activity(portal_name, activity)
-            
-            # Sleep for a random interval (1-5 seconds)
-            time.sleep(random.uniform(1, 5))
-        except Exception as e:
-            logger.error(f"Error in activity generation: {e}")
-            time.sleep(10)
-
-def _recommendation_generation_loop(portal_system):
-    """Background loop that occasionally generates recommendations between portals."""
-    while True:
-        try:
-            # Only generate recommendations occasionally
-            if random.random() < 0.1:
-                portal_names = list(portal_system.portals.keys())
-                if len(portal_names) < 2:
-                    time.sleep(30)
+class ActivityScheduler:
+    """
+    Timer scheduler driving simulated activity and recommendations for every portal.
+    
+    Each portal has an activity stream and a recommendation stream. Their next due
+    times live in a single heap served by one worker thread, so the cost of an
+    idle portal is one heap entry rather than a thread.
+    """
+    
+    def __init__(self, portal_system, activity_interval=DEFAULT_ACTIVITY_INTERVAL,
+                 recommendation_interval=DEFAULT_RECOMMENDATION_INTERVAL, rng=None, clock=time.monotonic):
+        """
+        Initialize the scheduler.
+        
+        Args:
+            portal_system (PortalEvolutionSystem): System receiving generated events
+            activity_interval (tuple): Default (min, max) seconds between activities per portal
+            recommendation_interval (tuple): Default (min, max) seconds between recommendation ticks per portal
+            rng (random.Random, optional): Random source, the global one by default
+            clock (callable): Monotonic clock returning seconds
+        """
+        self.portal_system = portal_system
+        self.default_intervals = {ACTIVITY: activity_interval, RECOMMENDATION: recommendation_interval}
+        self.rng = rng or random
+        self.clock = clock
+        self._heap = []
+        self._intervals = {}
+        # Bumped on every rate change so that stale heap entries are skipped
+        self._generations = {}
+        self._sequence = itertools.count()
+        self._portal_names = ()
+        self._portal_index = {}
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread = None
+        self._started_at = clock()
+        # Counters are written by the worker thread and read by stats() on request threads
+        self._stats_lock = threading.Lock()
+        self._counts = {ACTIVITY: 0, RECOMMENDATION: 0, "errors": 0}
+        self._window = deque()
+    
+    def sync_portals(self):
+        """Schedule streams for portals that are not scheduled yet."""
+        names = tuple(self.portal_system.portals.keys())
+        with self._condition:
+            self._portal_names = names
+            self._portal_index = {name: i for i, name in enumerate(names)}
+            now = self.clock()
+            for name in names:
+                for kind in (ACTIVITY, RECOMMENDATION):
+                    if (name, kind) not in self._generations:
+                        self._generations[(name, kind)] = 0
+                        self._schedule(name, kind, now)
+            self._condition.notify()
+    
+    def set_rate(self, portal_name, activity_interval=None, recommendation_interval=None):
+        """
+        Configure the intervals of a portal's streams.
+        
+        Args:
+            portal_name (str): Portal to configure
+            activity_interval (tuple, optional): (min, max) seconds between activities, or False to stop them
+            recommendation_interval (tuple, optional): (min, max) seconds between recommendation ticks,
+                or False to stop them
+        """
+        with self._condition:
+            now = self.clock()
+            for kind, interval in ((ACTIVITY, activity_interval), (RECOMMENDATION, recommendation_interval)):
+                if interval is None:
                     continue
-                
-                # Select random source and target portals (different from each other)
-                source_portal = random.choice(portal_names)
-                target_portal = random.choice([p for p in portal_names if p != source_portal])
-                
-                # Generate recommendation type
-                rec_types = ["System Upgrade", "Collaboration Opportunity", "Optimization Strategy", 
-                            "Resource Allocation", "Integration Enhancement"]
-                rec_type = random.choice(rec_types)
-                
-                # Create the recommendation
-                portal_system.create_recommendation(
-                    source_portal=source_portal,
-                    target_portal=target_portal,
-                    recommendation_type=rec_type,
-                    details=f"Consider {rec_type} for portal {target_portal}"
-                )
+                self._intervals[(portal_name, kind)] = interval
+                self._generations[(portal_name, kind)] = self._generations.get((portal_name, kind), 0) + 1
+                self._schedule(portal_name, kind, now)
+            self._condition.notify()
+    
+    def _schedule(self, portal_name, kind, now):
+        """Push the next event of a stream onto the heap. Caller holds the condition."""
+        interval = self._intervals.get((portal_name, kind), self.default_intervals[kind])
+        if not interval:
+            return
+        due = now + self.rng.uniform(*interval)
+        generation = self._generations[(portal_name, kind)]
+        heapq.heappush(self._heap, (due, next(self._sequence), portal_name, kind, generation))
+    
+    def _pop_due(self, now):
+        """Pop the next due, still valid event. Caller holds the condition."""
+        while self._heap and self._heap[0][0] <= now:
+            due, _, portal_name, kind, generation = heapq.heappop(self._heap)
+            if generation == self._generations.get((portal_name, kind)):
+                self._schedule(portal_name, kind, max(due, now - 1))
+                return portal_name, kind
+        return None
+    
+    def _fire(self, portal_name, kind):
+        """Generate one event for a portal."""
+        if kind == ACTIVITY:
+            self.portal_system.record_portal_activity(portal_name, _generate_activity(portal_name, self.rng))
+        elif self.rng.random() < RECOMMENDATION_PROBABILITY:
+            names = self._portal_names
+            source_index = self._portal_index.get(portal_name)
+            if source_index is None or len(names) < 2:
+                return False
+            # Pick a different portal without copying the name list
+            target_index = self.rng.randrange(len(names) - 1)
+            if target_index >= source_index:
+                target_index += 1
+            target_portal = names[target_index]
+            rec_type = self.rng.choice(RECOMMENDATION_TYPES)
+            self.portal_system.create_recommendation(
+                source_portal=portal_name,
+                target_portal=target_portal,
+                recommendation_type=rec_type,
+                details=f"Consider {rec_type} for portal {target_portal}"
+            )
+        else:
+            return False
+        return True
+    
+    def _count(self, kind, now):
+        """Update generated-event counters."""
+        second = int(now)
+        with self._stats_lock:
+            self._counts[kind] += 1
+            if self._window and self._window[-1][0] == second:
+                self._window[-1][1] += 1
+            else:
+                self._window.append([second, 1])
+            while self._window and self._window[0][0] <= second - STATS_WINDOW_SECONDS:
+                self._window.popleft()
+    
+    def run_pending(self, now=None, max_events=None):
+        """
+        Fire every event due at or before now.
+        
+        Args:
+            now (float, optional): Clock value to run up to, the current clock by default
+            max_events (int, optional): Stop after this many events
             
-            # Sleep for a longer interval (recommendations are less frequent)
-            time.sleep(random.uniform(30, 120))
-        except Exception as e:
-            logger.error(f"Error in recommendation generation: {e}")
-            time.sleep(30)
-
-def start_activity_generation(portal_system):
-    """Start background threads for generating portal activities and recommendations."""
-    # Start activity generation thread
-    activity_thread = threading.Thread(
-        target=_activity_generation_loop,
-        args=(portal_system,),
-        daemon=True
-    )
-    activity_thread.start()
+        Returns:
+            int: Number of events fired
+        """
+        now = self.clock() if now is None else now
+        fired = 0
+        while max_events is None or fired < max_events:
+            with self._condition:
+                event = self._pop_due(now)
+            if event is None:
+                break
+            portal_name, kind = event
+            try:
+                if self._fire(portal_name, kind):
+                    self._count(kind, now)
+            except Exception as e:
+                with self._stats_lock:
+                    self._counts["errors"] += 1
+                logger.error(f"Error generating {kind} for portal {portal_name}: {e}")
+            fired += 1
+        return fired
+    
+    def _run(self):
+        """Worker loop sleeping until the next due event."""
+        while True:
+            with self._condition:
+                if not self._running:
+                    return
+                now = self.clock()
+                if not self._heap or self._heap[0][0] > now:
+                    timeout = self._heap[0][0] - now if self._heap else None
+                    self._condition.wait(timeout)
+                    continue
+            self.run_pending()
     
-    # Start recommendation generation thread
-    recommendation_thread = threading.Thread(
-        target=_recommendation_generation_loop,
-        args=(portal_system,),
-        daemon=True
-    )
-    recommendation_thread.start()
+    def start(self):
+        """Start the worker thread."""
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+        self.sync_portals()
+        self._thread = threading.Thread(target=self._run, name="portal-activity-scheduler", daemon=True)
+        self._thread.start()
     
+    def stop(self):
+        """Stop the worker thread."""
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+    
+    def stats(self):
+        """Get generated-event statistics."""
+        now = self.clock()
+        elapsed = max(now - self._started_at, 1e-9)
+        with self._stats_lock:
+            counts = dict(self._counts)
+            window_events = sum(count for second, count in self._window if second > now - STATS_WINDOW_SECONDS)
+        generated = counts[ACTIVITY] + counts[RECOMMENDATION]
+        with self._condition:
+            scheduled = len(self._heap)
+        return {
+            "portals": len(self._portal_names),
+            "scheduled_events": scheduled,
+            "activities": counts[ACTIVITY],
+            "recommendations": counts[RECOMMENDATION],
+            "errors": counts["errors"],
+            "events_per_second": generated / elapsed,
+            "recent_events_per_second": window_events / min(elapsed, STATS_WINDOW_SECONDS),
+            "uptime_seconds": elapsed
+        }
+
+def start_activity_generation(portal_system, **kwargs):
+    """Start the scheduler generating portal activities and recommendations."""
+    scheduler = ActivityScheduler(portal_system, **kwargs)
+    scheduler.start()
     logger.info("Portal activity and recommendation generation started")
+    return scheduler
@@ -5,205 +5,1218 @@ This module manages the evolution of AI portals within the LUMAURA x XUVE ecosys
 It tracks portal development, facilitates interactions, and manages the evolution process.
 """
 
+import bisect
 import os
 import logging
-import json
 import random
-from datetime import datetime
+import threading
+import time
+from array import array
+from datetime import datetime, timedelta
 from pathlib import Path
 
+from lumaura_ai_system.activity_index import ActivityIndex, DEFAULT_MAX_ACTIVITIES
+from lumaura_ai_system.activity_store import ActivityStore, DescriptionTable, DEFAULT_CAPACITY, to_epoch_ms
+from lumaura_ai_system.event_stream import EventBroker
+from lumaura_ai_system.evolution_log import EvolutionLog
+from lumaura_ai_system.evolution_metrics import EvolutionMetrics
+from lumaura_ai_system.interaction_graph import INTERACTION_WEIGHTS, InteractionGraph
+from lumaura_ai_system.leader_election import LeaderElection
+from lumaura_ai_system.portal_registry import PortalRegistry
+from lumaura_ai_system.portals.base import status_to_json
+from lumaura_ai_system.portal_state import PortalState
+from lumaura_ai_system.recommendation_archive import RecommendationArchive, Source, merge_by_created
+from lumaura_ai_system.recommendation_store import RecommendationStore, ID_PREFIX
+from lumaura_ai_system.score_table import ScoreTable
+from lumaura_ai_system.sql_store import SQLStore
+from lumaura_ai_system.state_snapshot import SnapshotError, encode_portal
+
 logger = logging.getLogger(__name__)
 
+# Pending recommendations expire after this many seconds
+DEFAULT_RECOMMENDATION_TTL = 7 * 24 * 3600
+# Implemented and expired recommendations kept in memory before older ones are archived
+DEFAULT_RETAINED_RECOMMENDATIONS = 1000
+RECOMMENDATION_COMPACTION_INTERVAL = 60
+FINISHED_STATUSES = ("implemented", "expired")
+DEFAULT_SCORE_DECAY_INTERVAL = 3600
+DEFAULT_SNAPSHOT_INTERVAL = 300
+DEFAULT_DATA_DIR = "data/portal_evolution"
+
 class PortalEvolutionSystem:
     """Main class for managing the Portal Evolution System."""
     
-    def __init__(self):
-        """Initialize the Portal Evolution System."""
-        self.portals = {}
-        self.interactions = []
-        self.recommendations = []
+    def __init__(self, database_url=None, shared_state=False, rng=None, clock=None, data_dir=DEFAULT_DATA_DIR):
+        """
+        Initialize the Portal Evolution System.
+        
+        Args:
+            database_url (str, optional): sqlite:// URL of a database to persist portal state,
+                activities and recommendations in. Without it, state is kept in the JSON
+                evolution log and history only in memory.
+            shared_state (bool): Several worker processes share the database. Score changes
+                are applied as deltas in the database, each worker refreshes its cached
+                state from it, and only the elected leader generates simulated activity.
+            rng (random.Random, optional): Random source for recommendation boosts, the
+                global one by default
+            clock (callable, optional): Returns the current time in epoch seconds; stamps
+                activities, recommendations, log entries and metrics. time.time by default
+            data_dir (str): Directory of the evolution log, its snapshot and the
+                recommendation archive
+        """
+        self.clock = clock or time.time
+        self.data_dir = Path(data_dir)
+        self.portals = PortalRegistry(on_load=self._on_portal_load)
+        self.interactions = InteractionGraph()
+        # Activity search keeps at most this many activities, and only activities younger
+        # than the maximum age in seconds; 0 lifts either limit
+        index_max = int(os.environ.get("PORTAL_ACTIVITY_INDEX_MAX", DEFAULT_MAX_ACTIVITIES))
+        index_max_age = float(os.environ.get("PORTAL_ACTIVITY_INDEX_MAX_AGE", 0))
+        self.activity_index = ActivityIndex(max_activities=index_max or None, max_age=index_max_age or None)
+        # With a database, activities stored before startup are indexed on the first search
+        self._index_backfill_id = None
+        self._index_backfill_lock = threading.Lock()
+        # Shared databases: newest activity id indexed for search, and seen by sync_shared_state
+        self._indexed_activity_id = 0
+        self._activity_sync_id = 0
+        self.recommendations = RecommendationStore(clock=self.clock)
         self.initialized = False
+        self.rng = rng or random
+        self.activity_scheduler = None
+        self.state = PortalState(serializer=status_to_json)
+        self.score_table = ScoreTable()
+        # Scores halve every score_half_life seconds; 0 disables decay
+        self.score_half_life = float(os.environ.get("PORTAL_SCORE_HALF_LIFE", 0))
+        self.score_decay_interval = float(os.environ.get("PORTAL_SCORE_DECAY_INTERVAL", DEFAULT_SCORE_DECAY_INTERVAL))
+        self._decay_thread = None
+        # Seconds between state snapshots written in the background; 0 only snapshots on
+        # log compaction and shutdown
+        self.snapshot_interval = float(os.environ.get("PORTAL_SNAPSHOT_INTERVAL", DEFAULT_SNAPSHOT_INTERVAL))
+        self._snapshot_writer = None
+        # Set when the evolution log has enough sealed segments to compact
+        self._compaction_requested = threading.Event()
+        # Decay records are not idempotent: a decay is applied and logged under this lock and
+        # a compaction reads state under it, so a decay is either in a snapshot or after it
+        self._decay_lock = threading.Lock()
+        self.evolution_log = EvolutionLog(data_dir=self.data_dir, clock=self.clock)
+        self.events = EventBroker()
+        self.metrics = EvolutionMetrics(clock=self.clock)
+        # Time the metric rollups were last written to the database
+        self._metrics_saved_at = None
+        self.activity_capacity = int(os.environ.get("PORTAL_ACTIVITY_CAPACITY", DEFAULT_CAPACITY))
+        self.activity_spill_dir = os.environ.get("PORTAL_ACTIVITY_SPILL_DIR")
+        self._activity_descriptions = None
+        self.database = None
+        if database_url:
+            try:
+                self.database = SQLStore.from_url(database_url, shared=shared_state, clock=self.clock)
+                self.evolution_log = self.database
+            except Exception as e:
+                logger.error(f"Error opening portal database, keeping state in memory: {e}")
+        self.shared_state = shared_state and self.database is not None
+        if shared_state and not self.shared_state:
+            logger.warning("Shared state requires a portal database; running as a single process")
+        if self.shared_state:
+            self.recommendations = RecommendationStore(id_prefix=f"{ID_PREFIX}{os.getpid()}-", clock=self.clock)
+        self.leader = None
+        self.state_sync_interval = 1.0
+        self._state_revision = 0
+        self._data_version = None
+        self._last_sync = 0
+        self._sync_lock = threading.Lock()
+        self.recommendation_ttl = float(os.environ.get("PORTAL_RECOMMENDATION_TTL", DEFAULT_RECOMMENDATION_TTL))
+        self.recommendations_retained = int(
+            os.environ.get("PORTAL_RECOMMENDATIONS_RETAINED", DEFAULT_RETAINED_RECOMMENDATIONS)
+        )
+        # With a database, evicted recommendations remain queryable there
+        self.recommendation_archive = (RecommendationArchive(self.data_dir / "recommendations")
+                                       if self.database is None else None)
+        self._recommendation_counters = {"expired": 0, "evicted": 0, "compactions": 0, "last_compaction": None}
+        self._background_stop = threading.Event()
+        self._compactor = None
         logger.info("Portal Evolution System created")
     
-    def initialize(self):
-        """Initialize all portals in the system."""
+    def initialize(self, start_generation=True):
+        """
+        Initialize all portals in the system.
+        
+        Args:
+            start_generation (bool): Start the simulated activity generator
+        """
         if self.initialized:
             logger.warning("Portal Evolution System already initialized")
             return
         
         try:
-            # Import portal modules
-            from lumaura_ai_system.portals import (
-                xuvebanker, xuvemark, xuveteam, xuvevault, xuveops, xuvecode,
-                xuvecast, xuvemirror, xuvehome, xuvewisdom, xuveteach, xuveritual,
-                xuveonboard, xuvewell, xuvefamily, xuvejobs, xuvefleet,
-                xuvesponsorship, xuvesound, xuvecreator, xuvepulse, xuvelegal
-            )
-            
-            # Create instances of each portal
-            portal_classes = [
-                (xuvebanker, "XuvebankerPortal"),
-                (xuvemark, "XuvemarkPortal"),
-                (xuveteam, "XuveteamPortal"),
-                (xuvevault, "XuvevaultPortal"),
-                (xuveops, "XuveopsPortal"),
-                (xuvecode, "XuvecodePortal"),
-                (xuvecast, "XuvecastPortal"),
-                (xuvemirror, "XuvemirrorPortal"),
-                (xuvehome, "XuvehomePortal"),
-                (xuvewisdom, "XuvewisdomPortal"),
-                (xuveteach, "XuveteachPortal"),
-                (xuveritual, "XuverirtualPortal"),
-                (xuveonboard, "XuveonboardPortal"),
-                (xuvewell, "XuvewellPortal"),
-                (xuvefamily, "XuvefamilyPortal"),
-                (xuvejobs, "XuvejobsPortal"),
-                (xuvefleet, "XuvefleetPortal"),
-                (xuvesponsorship, "XuvesponsorshipPortal"),
-                (xuvesound, "XuvesoundPortal"),
-                (xuvecreator, "XuvecreatorPortal"),
-                (xuvepulse, "XuvepulsePortal"),
-                (xuvelegal, "XuvelegalPortal"),
-            ]
-            
-            for module, class_name in portal_classes:
-                portal_class = getattr(module, class_name, None)
-                if portal_class:
-                    portal_instance = portal_class()
-                    self.portals[portal_instance.name] = portal_instance
-                else:
-                    logger.warning(f"Could not find class {class_name} in module {module.__name__}")
-            
             # Load evolution data if available
             self._load_evolution_data()
+            if self.database is not None:
+                self._load_recommendations()
+                self._rebuild_from_database()
+                self.database.start()
+            
+            self._start_recommendation_compactor()
+            if self.database is None:
+                self._start_snapshot_writer()
             
+            # Portals themselves are instantiated lazily on first access
             self.initialized = True
-            logger.info(f"Loaded evolution data for {len(self.portals)} portals")
+            logger.info(f"Portal Evolution System initialized with {len(self.portals)} portal definitions")
             
-            # Start portal activity generator
-            from lumaura_ai_system.portal_activity_generator import start_activity_generation
-            start_activity_generation(self)
+            if start_generation and self.shared_state:
+                # Only one worker process generates simulated activity
+                lock_path = Path(self.database.path).with_suffix(".leader.lock")
+                self.leader = LeaderElection(lock_path, on_elected=self._start_leader_tasks)
+                self.leader.start()
+            elif start_generation:
+                self._start_leader_tasks()
         except Exception as e:
             logger.error(f"Error initializing Portal Evolution System: {e}")
     
+    def _start_leader_tasks(self):
+        """Start the background work only one process may run: activity generation and score decay."""
+        from lumaura_ai_system.portal_activity_generator import start_activity_generation
+        self.activity_scheduler = start_activity_generation(self)
+        if self.score_half_life > 0:
+            self._start_score_decay()
+    
+    def _start_score_decay(self):
+        """Start the background thread applying score decay every score_decay_interval."""
+        factor = 0.5 ** (self.score_decay_interval / self.score_half_life)
+        def run():
+            while not self._background_stop.wait(self.score_decay_interval):
+                try:
+                    self.decay_scores(factor)
+                except Exception as e:
+                    logger.error(f"Error decaying portal scores: {e}")
+        
+        self._decay_thread = threading.Thread(target=run, daemon=True, name="score-decay")
+        self._decay_thread.start()
+        logger.info(f"Portal score decay started (half-life {self.score_half_life}s)")
+    
+    def _start_recommendation_compactor(self):
+        """Start the background thread expiring and archiving recommendations."""
+        def run():
+            while not self._background_stop.wait(RECOMMENDATION_COMPACTION_INTERVAL):
+                try:
+                    self.compact_recommendations()
+                except Exception as e:
+                    logger.error(f"Error compacting recommendations: {e}")
+                if self.database is not None:
+                    try:
+                        self._save_metrics()
+                    except Exception as e:
+                        logger.error(f"Error saving metric rollups: {e}")
+        
+        self._compactor = threading.Thread(target=run, daemon=True, name="recommendation-compactor")
+        self._compactor.start()
+    
+    def _start_snapshot_writer(self):
+        """
+        Start the background thread writing state snapshots.
+        
+        A snapshot is written every snapshot_interval (if set) and whenever a writer
+        requests a log compaction, so compactions never run on the request path.
+        """
+        def run():
+            while True:
+                self._compaction_requested.wait(self.snapshot_interval or None)
+                if self._background_stop.is_set():
+                    break
+                self._compaction_requested.clear()
+                try:
+                    self._save_evolution_data()
+                except Exception as e:
+                    logger.error(f"Error writing state snapshot: {e}")
+        
+        self._snapshot_writer = threading.Thread(target=run, daemon=True, name="snapshot-writer")
+        self._snapshot_writer.start()
+    
+    def _request_compaction(self):
+        """
+        Hand a due log compaction to the snapshot writer thread.
+        
+        Callers may hold a portal lock, so the snapshot is never written here. While the
+        writer is not running (before initialize, after shutdown, or with a database) the
+        request stays queued for it; shutdown writes a final snapshot regardless.
+        """
+        if self.evolution_log.needs_compaction():
+            self._compaction_requested.set()
+    
+    def shutdown(self):
+        """Stop background work, write a final state snapshot and close the evolution log."""
+        self._background_stop.set()
+        self._compaction_requested.set()
+        for thread in (self._snapshot_writer, self._compactor, self._decay_thread):
+            if thread is not None:
+                thread.join()
+        self._snapshot_writer = self._compactor = self._decay_thread = None
+        if self.leader is not None:
+            self.leader.stop()
+        if self.activity_scheduler is not None:
+            self.activity_scheduler.stop()
+            self.activity_scheduler = None
+        if self.initialized:
+            self._save_evolution_data()
+        self.evolution_log.close()
+        logger.info("Portal Evolution System shut down")
+    
+    def _on_portal_load(self, portal):
+        """Prepare a portal the first time the registry instantiates it."""
+        portal.created_at = datetime.fromtimestamp(self.clock()).isoformat()
+        portal.attach_score_table(self.score_table)
+        self._configure_activity_store(portal)
+        self._restore_portal(portal)
+        self.state.register(portal)
+    
+    def _restore_portal(self, portal):
+        """Apply persisted evolution state to a portal."""
+        # The persisted score is already in the score table; re-derive stage and capabilities from it
+        portal.update_evolution_score(0)
+        if self.database is not None:
+            self._restore_database_history(portal)
+        self._restore_history(portal)
+    
+    def _restore_database_history(self, portal, reload=False):
+        """
+        Restore a portal's activity ring, activity count and last activity from the database.
+        
+        With reload=True the ring is replaced even if it holds activities, e.g. after other
+        workers recorded some.
+        """
+        if reload:
+            portal.activities.clear()
+        elif portal.activities.total_count:
+            return
+        recent = self.database.recent_activities(portal.name, portal.activities.capacity)
+        if not recent:
+            return
+        descriptions = list(dict.fromkeys(description for _, description in recent))
+        positions = {description: position for position, description in enumerate(descriptions)}
+        total = self.database.activity_count(portal.name)
+        portal.activities.restore(
+            array("q", [timestamp_ms for timestamp_ms, _ in recent]),
+            [positions[description] for _, description in recent],
+            descriptions,
+            evicted=total - len(recent)
+        )
+        portal.last_activity = portal.activities.last()
+    
+    def _rebuild_from_database(self):
+        """
+        Rebuild the interaction graph and the metric rollups from aggregates in the database.
+        
+        The activity search index is backfilled on the first search instead; activities
+        recorded from now on are indexed as they arrive.
+        """
+        started = time.perf_counter()
+        self._index_backfill_id = self._activity_sync_id = self.database.last_activity_id()
+        edges = {}
+        for source, target, kind, count in self.database.interaction_counts():
+            if not source or not target or source == target:
+                continue
+            edge = edges.setdefault((source, target), [0.0, 0])
+            edge[0] += INTERACTION_WEIGHTS.get(kind, 1.0) * count
+            edge[1] += count
+        self.interactions.load_edges([source, target, weight, count] for (source, target), (weight, count) in edges.items())
+        buckets = self.metrics.restore(self.database.load_metrics())
+        logger.info(f"Rebuilt interaction graph ({len(edges)} edges) and {buckets} metric buckets "
+                    f"from the database in {(time.perf_counter() - started) * 1000:.1f} ms")
+    
+    def _update_activity_index(self):
+        """
+        Index stored activities the search index has not seen, at most as many as it retains.
+        
+        The activities stored before startup are indexed once, on the first search. Workers
+        sharing a database index every activity from it, theirs and other workers', so each
+        search first catches up with the activities stored since the previous one. Searches
+        arriving meanwhile wait.
+        """
+        if self._index_backfill_id is None and not self.shared_state:
+            return
+        with self._index_backfill_lock:
+            if self._index_backfill_id is not None:
+                self._index_stored_activities(0, self._index_backfill_id)
+                self._indexed_activity_id = self._index_backfill_id
+                self._index_backfill_id = None
+            if self.shared_state:
+                until_id = self.database.last_activity_id()
+                if until_id > self._indexed_activity_id:
+                    self._index_stored_activities(self._indexed_activity_id, until_id)
+                    self._indexed_activity_id = until_id
+    
+    def _index_stored_activities(self, after_id, until_id):
+        """Add the stored activities with after_id < id <= until_id to the search index."""
+        started = time.perf_counter()
+        since_ms = None
+        if self.activity_index.max_age_ms is not None:
+            since_ms = int(self.clock() * 1000) - self.activity_index.max_age_ms
+        indexed = 0
+        for portal_name, timestamp_ms, description in self.database.iter_activities(
+                since_ms, until_id, self.activity_index.max_activities, after_id):
+            self.activity_index.add(portal_name, description, timestamp_ms)
+            indexed += 1
+        logger.debug(f"Indexed {indexed} stored activities for search in "
+                     f"{(time.perf_counter() - started) * 1000:.1f} ms")
+    
+    def _restore_history(self, portal):
+        """Restore a portal's creation time, last activity and activity ring from the snapshot."""
+        snapshot = self.evolution_log.snapshot
+        if snapshot is None or portal.activities.total_count:
+            return
+        try:
+            history = snapshot.portal(portal.name)
+        except SnapshotError as e:
+            if snapshot is not self.evolution_log.snapshot:
+                # A compaction replaced and closed the snapshot meanwhile; read the new one
+                return self._restore_history(portal)
+            logger.error(f"Error restoring history of {portal.name}: {e}")
+            return
+        if history is None:
+            return
+        portal.created_at = history["created_at"] or portal.created_at
+        portal.last_activity = history["last_activity"]
+        restored = portal.activities.restore(
+            history["timestamps"], history["description_ids"], history["descriptions"], history["evicted"]
+        )
+        if restored:
+            descriptions = history["descriptions"]
+            for timestamp_ms, description_id in zip(history["timestamps"][-restored:],
+                                                    history["description_ids"][-restored:]):
+                self.activity_index.add(portal.name, descriptions[description_id], timestamp_ms)
+    
+    def _restore_sections(self, snapshot):
+        """Restore recommendations, interaction edges and metric rollups from the snapshot."""
+        try:
+            recommendations = snapshot.section("recommendations")
+            edges = snapshot.section("interactions", [])
+            metrics = snapshot.section("metrics")
+        except SnapshotError as e:
+            logger.error(f"Error restoring snapshot sections: {e}")
+            return
+        if recommendations:
+            for recommendation in recommendations["items"]:
+                self.recommendations.add(recommendation)
+            self.recommendations.advance_ids(recommendations["last_id"])
+        self.interactions.load_edges(edges)
+        self.metrics.restore(metrics)
+        logger.info(f"Restored {len(recommendations['items']) if recommendations else 0} recommendations "
+                    f"and {len(edges)} interaction edges from the snapshot")
+    
+    def _configure_activity_store(self, portal):
+        """Apply the configured capacity and disk spill to a portal's activity store."""
+        if self.activity_capacity == DEFAULT_CAPACITY and not self.activity_spill_dir:
+            portal.activities.clock = self.clock
+            return
+        spill_path = None
+        # A shared database holds the whole history, and rings are reloaded from it
+        if self.activity_spill_dir and not self.shared_state:
+            spill_dir = Path(self.activity_spill_dir)
+            if self._activity_descriptions is None:
+                self._activity_descriptions = DescriptionTable(spill_dir / "descriptions.jsonl")
+            spill_path = spill_dir / f"{portal.name}.bin"
+        portal.activities = ActivityStore(
+            capacity=self.activity_capacity,
+            descriptions=self._activity_descriptions,
+            spill_path=spill_path,
+            clock=self.clock
+        )
+    
     def _load_evolution_data(self):
-        """Load stored evolution data for portals."""
-        data_dir = Path("data/portal_evolution")
-        data_dir.mkdir(parents=True, exist_ok=True)
+        """Load the evolution snapshot and replay the evolution log on top of it."""
+        try:
+            state = self.evolution_log.load()
+            if self.database is not None and not state:
+                state = self._import_evolution_log()
+            if self.shared_state:
+                self._state_revision = self.database.portals_since(0)[0]
+                self._data_version = self.database.data_version()
+            # Portals that are not instantiated yet keep their score in the table too
+            self.score_table.load({name: data["evolution_score"] for name, data in state.items()})
+            if self.evolution_log.snapshot is not None:
+                self._restore_sections(self.evolution_log.snapshot)
+            
+            # Portals loaded before this point are restored here, later ones on load
+            for portal_name, portal in self.portals.loaded_items():
+                with self.state.lock(portal_name):
+                    self._restore_portal(portal)
+                    self.state.publish(portal)
+            
+            logger.info(f"Loaded evolution data for {len(state)} portals")
+        except Exception as e:
+            logger.error(f"Error loading evolution data: {e}")
+    
+    def _import_evolution_log(self):
+        """Copy the state kept by the JSON evolution log into an empty database."""
+        legacy = EvolutionLog(data_dir=self.data_dir)
+        if not legacy.has_data():
+            # Loading would create an empty log directory
+            return {}
+        state = legacy.load()
+        legacy.close()
+        if state:
+            self.database.compact(lambda: state)
+            logger.info(f"Imported evolution state of {len(state)} portals into the database")
+        return state
+    
+    def _load_recommendations(self):
+        """Load pending recommendations from the database; history stays in the database."""
+        pending = self.database.recommendations(status="pending")
+        for recommendation in pending:
+            self.recommendations.add(recommendation)
+        self.recommendations.advance_ids(self.database.max_recommendation_number())
+        logger.info(f"Loaded {len(pending)} pending recommendations from the database")
+    
+    def sync_shared_state(self, force=False):
+        """
+        Refresh cached portal state with changes committed by other worker processes.
         
-        evolution_file = data_dir / "evolution_data.json"
-        if evolution_file.exists():
-            try:
-                with open(evolution_file, "r") as f:
-                    data = json.load(f)
-                
-                for portal_name, portal_data in data.get("portals", {}).items():
-                    if portal_name in self.portals:
-                        self.portals[portal_name].evolution_score = portal_data.get("evolution_score", 0)
-                        # Update other attributes as needed
-                
-                logger.info(f"Loaded evolution data for {len(data.get('portals', {}))} portals")
-            except Exception as e:
-                logger.error(f"Error loading evolution data: {e}")
+        Portals whose score changed are re-scored, and portals with new activities reload
+        their activity ring, count and last activity from the database. Reads call this; it
+        queries the database at most once per state_sync_interval and only when another
+        process has committed since the last check.
+        
+        Returns:
+            int: Number of portals whose cached state changed
+        """
+        if not self.shared_state:
+            return 0
+        now = time.monotonic()
+        if not force and now - self._last_sync < self.state_sync_interval:
+            return 0
+        with self._sync_lock:
+            if not force and now - self._last_sync < self.state_sync_interval:
+                return 0
+            self._last_sync = now
+            data_version = self.database.data_version()
+            if not force and data_version == self._data_version:
+                return 0
+            self._data_version = data_version
+            self._state_revision, changed = self.database.portals_since(self._state_revision)
+            self._activity_sync_id, active = self.database.activity_portals_since(self._activity_sync_id)
+        
+        updated = 0
+        for portal_name in changed.keys() | active:
+            portal_data = changed.get(portal_name)
+            if not self.portals.is_loaded(portal_name):
+                # Its history is read from the database when it is loaded
+                if portal_data is not None:
+                    self.score_table.load({portal_name: portal_data["evolution_score"]})
+                continue
+            portal = self.portals[portal_name]
+            with self.state.lock(portal_name):
+                rescored = portal_data is not None and portal.evolution_score != portal_data["evolution_score"]
+                if not rescored and portal_name not in active:
+                    continue
+                old_stage = portal.evolution_stage
+                if rescored:
+                    portal.evolution_score = portal_data["evolution_score"]
+                    self._restore_portal(portal)
+                if portal_name in active:
+                    self._restore_database_history(portal, reload=True)
+                self.state.publish(portal)
+                updated += 1
+                if portal.evolution_stage != old_stage:
+                    self.events.publish("stage_change", {
+                        "portal": portal_name,
+                        "old_stage": old_stage.value,
+                        "new_stage": portal.evolution_stage.value,
+                        "evolution_score": portal.evolution_score
+                    })
+        return updated
+    
+    def _sync_recommendations(self, recommendation_ids):
+        """Bring locally unknown or pending recommendations up to date with the database."""
+        stale = []
+        for rec_id in recommendation_ids:
+            local = self.recommendations.get(rec_id)
+            if local is None or local["status"] == "pending":
+                stale.append(rec_id)
+        for rec_id, stored in self.database.get_recommendations(stale).items():
+            local = self.recommendations.get(rec_id)
+            if local is None:
+                self.recommendations.add(stored)
+            elif stored["status"] != "pending":
+                fields = {key: value for key, value in stored.items() if key != "status"}
+                self.recommendations.transition(rec_id, "pending", stored["status"], **fields)
     
     def _save_evolution_data(self):
-        """Save evolution data for all portals."""
-        data_dir = Path("data/portal_evolution")
-        data_dir.mkdir(parents=True, exist_ok=True)
-        
-        evolution_file = data_dir / "evolution_data.json"
-        
-        portal_data = {}
-        for name, portal in self.portals.items():
-            portal_data[name] = {
-                "evolution_score": portal.evolution_score,
-                "evolution_stage": portal.evolution_stage.value,
-                "last_updated": datetime.now().isoformat()
+        """Compact the evolution log into a snapshot of all portals."""
+        # With a database, history is already in its tables
+        with_history = self.database is None
+        
+        def portal_state():
+            # Portals that are not loaded in this process keep their score from the table;
+            # the log carries their history over from the previous snapshot
+            state = self.score_table.entries()
+            for name, portal in self.portals.loaded_items():
+                # Copy under the portal lock so a concurrent append cannot tear the history;
+                # encoding happens outside it
+                with self.state.lock(name):
+                    state[name] = {
+                        "evolution_score": portal.evolution_score,
+                        "evolution_stage": portal.evolution_stage.value
+                    }
+                    if with_history:
+                        history = (portal.created_at, portal.last_activity, *portal.activities.export())
+                if with_history:
+                    state[name]["record"] = encode_portal(*history)
+            return state
+        
+        def sections():
+            last_id, recommendations = self.recommendations.export()
+            return {
+                "recommendations": {"last_id": last_id, "items": recommendations},
+                "interactions": self.interactions.edges(),
+                "metrics": self.metrics.export()
             }
         
-        data = {
-            "portals": portal_data,
-            "last_saved": datetime.now().isoformat()
-        }
+        with self._decay_lock:
+            saved = self.evolution_log.compact(portal_state, sections if with_history else None)
+        if saved:
+            logger.info("Saved evolution data")
+        if self.database is not None:
+            self._save_metrics()
+    
+    def _save_metrics(self):
+        """Add the metric rollups updated since the last save to the database's buckets."""
+        saved_at = self.clock()
+        self.metrics.save_increments(self.database.save_metrics, since=self._metrics_saved_at)
+        self._metrics_saved_at = saved_at
+    
+    def _log_evolution_change(self, portal_name, old_score, old_stage, flush=True):
+        """
+        Append a portal's score change to the evolution log. Caller holds the portal lock.
         
+        With flush=False the entry is buffered; the caller flushes the log and checks for
+        compaction once its batch is done.
+        """
+        portal = self.portals[portal_name]
+        if portal.evolution_stage != old_stage:
+            self.metrics.record_stage_transition(
+                portal_name, old_stage.value, portal.evolution_stage.value, portal.evolution_score
+            )
+            self.events.publish("stage_change", {
+                "portal": portal_name,
+                "old_stage": old_stage.value,
+                "new_stage": portal.evolution_stage.value,
+                "evolution_score": portal.evolution_score
+            })
+        delta = portal.evolution_score - old_score
+        if delta == 0:
+            return
         try:
-            with open(evolution_file, "w") as f:
-                json.dump(data, f, indent=2)
-            logger.info(f"Saved evolution data for {len(portal_data)} portals")
+            self.evolution_log.append_many(
+                [(portal_name, delta, portal.evolution_score, portal.evolution_stage.value)], flush=flush
+            )
+            if flush:
+                self._request_compaction()
         except Exception as e:
-            logger.error(f"Error saving evolution data: {e}")
+            logger.error(f"Error writing evolution log: {e}")
     
-    def record_portal_activity(self, portal_name, activity_description):
-        """Record activity for a specific portal."""
-        if portal_name in self.portals:
-            activity = self.portals[portal_name].record_activity(activity_description)
-            # Save periodically
-            if random.random() < 0.1:
-                self._save_evolution_data()
+    def boost_scores(self, boosts):
+        """
+        Add score boosts to several portals in one vectorised operation.
+        
+        Args:
+            boosts (dict): Portal name -> points
+            
+        Returns:
+            dict: {"changed", "stage_changes"}
+        """
+        for portal_name in boosts:
+            if portal_name in self.portals:
+                self.portals[portal_name]
+        return self._apply_score_changes(self.score_table.boost(boosts))
+    
+    def decay_scores(self, factor):
+        """
+        Multiply the score of every portal by a decay factor in one vectorised sweep.
+        
+        The sweep covers every portal in the score table, loaded or not, and is logged as
+        one aggregate decay record. Every loaded portal whose score moved is republished,
+        so status versions and ETags reflect the decay; only portals that crossed a stage
+        boundary get their capabilities refreshed and a stage_change event.
+        
+        Args:
+            factor (float): Multiplier between 0 and 1
+            
+        Returns:
+            dict: {"changed", "stage_changes"}
+        """
+        started = time.perf_counter()
+        with self._decay_lock:
+            changes = self.score_table.decay(factor)
+            try:
+                self.evolution_log.append_decay(factor)
+                self._request_compaction()
+            except Exception as e:
+                logger.error(f"Error writing evolution log: {e}")
+        
+        stage_changes = 0
+        for portal_name, _, new_score, old_stage, new_stage in changes:
+            if self.portals.is_loaded(portal_name):
+                portal = self.portals[portal_name]
+                with self.state.lock(portal_name):
+                    if new_stage != old_stage:
+                        portal.update_evolution_score(0)
+                    self.state.publish(portal)
+                    new_score = portal.evolution_score
+            if new_stage == old_stage:
+                continue
+            stage_changes += 1
+            self.metrics.record_stage_transition(portal_name, old_stage.value, new_stage.value, new_score)
+            self.events.publish("stage_change", {
+                "portal": portal_name,
+                "old_stage": old_stage.value,
+                "new_stage": new_stage.value,
+                "evolution_score": new_score
+            })
+        logger.info(f"Decayed {len(changes)} portal scores by {factor:.4f}, {stage_changes} "
+                    f"stage changes in {(time.perf_counter() - started) * 1000:.2f} ms")
+        return {"changed": len(changes), "stage_changes": stage_changes}
+    
+    def _apply_score_changes(self, changes):
+        """
+        Publish and log score changes made directly in the score table.
+        
+        Only portals that crossed a stage boundary get their capabilities refreshed and a
+        stage_change event. The log records the table's own delta with the current score,
+        so concurrent updates to the same portal are neither lost nor counted twice.
+        """
+        entries = []
+        stage_changes = 0
+        for portal_name, old_score, new_score, old_stage, new_stage in changes:
+            portal = self.portals[portal_name]
+            with self.state.lock(portal_name):
+                previous_stage = portal.evolution_stage
+                if new_stage != old_stage:
+                    portal.update_evolution_score(0)
+                if portal.evolution_stage != previous_stage:
+                    stage_changes += 1
+                    self.metrics.record_stage_transition(
+                        portal_name, previous_stage.value, portal.evolution_stage.value, portal.evolution_score
+                    )
+                    self.events.publish("stage_change", {
+                        "portal": portal_name,
+                        "old_stage": previous_stage.value,
+                        "new_stage": portal.evolution_stage.value,
+                        "evolution_score": portal.evolution_score
+                    })
+                self.state.publish(portal)
+                entries.append((portal_name, new_score - old_score, portal.evolution_score,
+                                portal.evolution_stage.value))
+        
+        if entries:
+            try:
+                self.evolution_log.append_many(entries)
+                self._request_compaction()
+            except Exception as e:
+                logger.error(f"Error writing evolution log: {e}")
+        return {"changed": len(entries), "stage_changes": stage_changes}
+    
+    def _publish_activity(self, portal, activity, related_portal=None):
+        """Count an activity in the metrics, index it for search, store it and publish its event."""
+        self.metrics.record_activity(portal.name, portal.evolution_score)
+        timestamp_ms = to_epoch_ms(activity["timestamp"])
+        if not self.shared_state:
+            # Shared databases are indexed from the database, with every worker's activities
+            self.activity_index.add(portal.name, activity["description"], timestamp_ms)
+        if self.database is not None:
+            # The related portal lets a restart rebuild the activity edges of the interaction graph
+            if related_portal == portal.name or related_portal not in self.portals:
+                related_portal = None
+            self.database.add_activity(portal.name, timestamp_ms, activity["description"], related_portal)
+        self.events.publish("activity", {
+            "portal": portal.name,
+            "activity": activity,
+            "evolution_score": portal.evolution_score,
+            "evolution_stage": portal.evolution_stage.value
+        })
+    
+    def record_portal_activity(self, portal_name, activity_description, related_portal=None):
+        """
+        Record activity for a specific portal.
+        
+        Args:
+            portal_name (str): Portal performing the activity
+            activity_description (str): What the portal did
+            related_portal (str, optional): Another portal the activity involved; adds an
+                interaction graph edge
+        """
+        if not isinstance(activity_description, str) or not isinstance(related_portal, (str, type(None))):
+            logger.warning("Cannot record activity - activity and related portal must be strings")
+            return None
+        if isinstance(portal_name, str) and portal_name in self.portals:
+            portal = self.portals[portal_name]
+            with self.state.lock(portal_name):
+                old_score, old_stage = portal.evolution_score, portal.evolution_stage
+                activity = portal.record_activity(activity_description)
+                self._log_evolution_change(portal_name, old_score, old_stage)
+                self.state.publish(portal)
+                self._publish_activity(portal, activity, related_portal)
+            if related_portal in self.portals:
+                self.interactions.record(portal_name, related_portal, "activity")
             return activity
         else:
             logger.warning(f"Cannot record activity - portal not found: {portal_name}")
             return None
     
+    def record_portal_activities(self, records):
+        """
+        Record a batch of activities.
+        
+        Records are grouped per portal so each portal lock is taken once, and the
+        evolution log is flushed once for the whole batch.
+        
+        Args:
+            records (list): Items of the form {"portal_name": str, "activity": str}, optionally
+                with "related_portal": str
+            
+        Returns:
+            list: One result per record, in input order: {"index", "success", "activity" or "error"}
+        """
+        results = [None] * len(records)
+        by_portal = {}
+        for index, record in enumerate(records):
+            if not isinstance(record, dict) or not record.get("portal_name") or not record.get("activity"):
+                results[index] = {"index": index, "success": False, "error": "Missing portal_name or activity"}
+            elif (not isinstance(record["portal_name"], str) or not isinstance(record["activity"], str)
+                    or not isinstance(record.get("related_portal"), (str, type(None)))):
+                results[index] = {"index": index, "success": False,
+                                  "error": "portal_name, activity and related_portal must be strings"}
+            elif record["portal_name"] not in self.portals:
+                results[index] = {"index": index, "success": False, "error": "Portal not found"}
+            else:
+                by_portal.setdefault(record["portal_name"], []).append(index)
+        
+        for portal_name, indexes in by_portal.items():
+            portal = self.portals[portal_name]
+            with self.state.lock(portal_name):
+                for index in indexes:
+                    old_score, old_stage = portal.evolution_score, portal.evolution_stage
+                    activity = portal.record_activity(records[index]["activity"])
+                    self._log_evolution_change(portal_name, old_score, old_stage, flush=False)
+                    self._publish_activity(portal, activity, records[index].get("related_portal"))
+                    results[index] = {"index": index, "success": True, "activity": activity}
+                self.state.publish(portal)
+            for index in indexes:
+                related_portal = records[index].get("related_portal")
+                if related_portal in self.portals:
+                    self.interactions.record(portal_name, related_portal, "activity")
+        
+        if by_portal:
+            try:
+                self.evolution_log.flush()
+                self._request_compaction()
+            except Exception as e:
+                logger.error(f"Error flushing evolution log: {e}")
+        
+        logger.debug(f"Recorded batch of {len(records)} activities across {len(by_portal)} portals")
+        return results
+    
+    def get_portal_activities(self, portal_name, start=None, end=None, limit=None):
+        """
+        Get activities for a portal within a time range.
+        
+        Args:
+            portal_name (str): Portal to query
+            start: Inclusive lower bound (epoch ms, datetime or ISO-8601 string)
+            end: Exclusive upper bound (epoch ms, datetime or ISO-8601 string)
+            limit (int, optional): Only return the most recent matching activities
+            
+        Returns:
+            list: Activities in chronological order, or None if the portal is unknown
+        """
+        if portal_name not in self.portals:
+            logger.warning(f"Portal not found: {portal_name}")
+            return None
+        start_ms, end_ms = to_epoch_ms(start), to_epoch_ms(end)
+        if self.database is not None:
+            return self.database.activities(portal_name, start_ms, end_ms, limit)
+        portal = self.portals[portal_name]
+        with self.state.lock(portal_name):
+            return portal.activities.between(start_ms, end_ms, limit)
+    
+    def search_activities(self, query, portal_name=None, start=None, end=None, limit=50):
+        """
+        Search the descriptions of recent activities.
+        
+        Without a database only activities recorded since startup are searchable.
+        
+        Args:
+            query (str): Terms and "quoted phrases"; all must match
+            portal_name (str, optional): Only search this portal's activities
+            start: Inclusive lower bound (epoch ms, datetime or ISO-8601 string)
+            end: Exclusive upper bound (epoch ms, datetime or ISO-8601 string)
+            limit (int): Maximum number of activities to return
+            
+        Returns:
+            dict: {"total", "results"} with results newest first, or None if the portal is unknown
+        """
+        if portal_name is not None and portal_name not in self.portals:
+            logger.warning(f"Portal not found: {portal_name}")
+            return None
+        self._update_activity_index()
+        return self.activity_index.search(query, portal_name, to_epoch_ms(start), to_epoch_ms(end), limit)
+    
+    def get_portal_metrics(self, portal_name, resolution="1h", start=None, end=None):
+        """
+        Get rolled-up evolution metrics for a portal.
+        
+        Args:
+            portal_name (str): Portal to query
+            resolution (str): "1m", "1h" or "1d"
+            start: Inclusive lower bound (epoch ms, datetime or ISO-8601 string)
+            end: Exclusive upper bound (epoch ms, datetime or ISO-8601 string)
+            
+        Returns:
+            dict: {"resolution", "buckets", "stage_transitions"}, or None if the portal is unknown
+        """
+        if portal_name not in self.portals:
+            logger.warning(f"Portal not found: {portal_name}")
+            return None
+        start_ms, end_ms = to_epoch_ms(start), to_epoch_ms(end)
+        start_s = None if start_ms is None else start_ms / 1000
+        end_s = None if end_ms is None else end_ms / 1000
+        return {
+            "resolution": resolution,
+            "buckets": self.metrics.query(portal_name, resolution, start_s, end_s),
+            "stage_transitions": self.metrics.stage_transitions(portal_name, start_s, end_s)
+        }
+    
+    def get_generation_stats(self):
+        """Get statistics of the simulated activity scheduler, or None if it is not running."""
+        if self.activity_scheduler is None:
+            return None
+        return self.activity_scheduler.stats()
+    
     def get_portal_status(self, portal_name):
         """Get the current status of a specific portal."""
+        self.sync_shared_state()
         if portal_name in self.portals:
-            return self.portals[portal_name].get_status()
+            status = self.state.snapshot(portal_name)
+            if status is None:
+                # First access instantiates the portal and publishes its snapshot
+                self.portals[portal_name]
+                status = self.state.snapshot(portal_name)
+            return status
         else:
             logger.warning(f"Portal not found: {portal_name}")
             return None
     
     def get_all_portals_status(self):
         """Get the status of all portals."""
-        return {name: portal.to_dict() for name, portal in self.portals.items()}
+        self.sync_shared_state()
+        self.portals.load_all()
+        return self.state.snapshots()
+    
+    def get_status_etag(self):
+        """Get the entity tag of the current status of all portals."""
+        self.sync_shared_state()
+        self.portals.load_all()
+        return self.state.etag()
+    
+    def get_status_since(self, since=None, epoch=None, as_json=False):
+        """
+        Get the status of portals changed since a version.
+        
+        Args:
+            since (int, optional): Version the caller already has; all portals if omitted
+            epoch (int, optional): Epoch the version was issued in. A version from another
+                epoch (e.g. before a restart) falls back to the full status.
+            as_json (bool): Return "portals" as a pre-serialised JSON object string
+            
+        Returns:
+            dict: {"version", "epoch", "etag", "delta", "portals"}
+        """
+        self.sync_shared_state()
+        self.portals.load_all()
+        delta = since is not None and (epoch is None or epoch == self.state.epoch) and since <= self.state.version
+        if as_json:
+            version, portals = self.state.json_since(since if delta else 0)
+        else:
+            version, portals = self.state.snapshots_since(since if delta else 0)
+        return {
+            "version": version,
+            "epoch": self.state.epoch,
+            "etag": self.state.etag(version),
+            "delta": delta,
+            "portals": portals
+        }
+    
+    def get_portal_neighbours(self, portal_name, direction="both"):
+        """Get the portals a portal interacts with, strongest first, or None if it is unknown."""
+        if portal_name not in self.portals:
+            return None
+        return self.interactions.neighbours(portal_name, direction)
+    
+    def get_top_collaborators(self, portal_name, limit=5):
+        """Get a portal's strongest collaborators, or None if it is unknown."""
+        if portal_name not in self.portals:
+            return None
+        return self.interactions.top_collaborators(portal_name, limit)
+    
+    def get_interaction_path(self, source_portal, target_portal):
+        """Get the strongest chain of interactions between two portals, or None."""
+        return self.interactions.shortest_path(source_portal, target_portal)
+    
+    def get_portal_influence(self, limit=None):
+        """Get portals ranked by interaction influence, most influential first."""
+        ranked = sorted(self.interactions.influence().items(), key=lambda item: (-item[1], item[0]))
+        return [{"portal": name, "influence": score} for name, score in ranked[:limit]]
+    
+    def get_interaction_stats(self):
+        """Get interaction graph statistics."""
+        return self.interactions.stats()
+    
+    def get_cluster_stats(self):
+        """Get the shared-state and leadership status of this worker process."""
+        return {
+            "pid": os.getpid(),
+            "shared_state": self.shared_state,
+            "is_leader": self.leader.is_leader if self.leader is not None else self.activity_scheduler is not None,
+            "state_revision": self._state_revision,
+            "state_sync_interval": self.state_sync_interval
+        }
+    
+    def subscribe_events(self, last_event_id=None):
+        """Subscribe to portal events, resuming after last_event_id if given."""
+        return self.events.subscribe(last_event_id)
+    
+    def unsubscribe_events(self, subscription):
+        """Remove an event subscription."""
+        self.events.unsubscribe(subscription)
+    
+    def get_event_stats(self):
+        """Get event stream statistics."""
+        return self.events.stats()
+    
+    def get_registry_stats(self):
+        """Get portal registry statistics, including per-portal load times."""
+        return self.portals.stats()
     
     def create_recommendation(self, source_portal, target_portal, recommendation_type, details):
         """Create a recommendation from one portal to another."""
-        recommendation = {
-            "id": f"rec-{len(self.recommendations) + 1}",
-            "source_portal": source_portal,
-            "target_portal": target_portal,
-            "type": recommendation_type,
-            "details": details,
-            "created_at": datetime.now().isoformat(),
-            "status": "pending"
-        }
-        
-        self.recommendations.append(recommendation)
+        recommendation = self.recommendations.create(source_portal, target_portal, recommendation_type, details)
+        if self.database is not None:
+            self.database.save_recommendation(recommendation)
+        self.interactions.record(source_portal, target_portal, "recommendation")
+        self.events.publish("recommendation", recommendation)
         logger.info(f"Created new recommendation: {recommendation_type} for portal {target_portal}")
         return recommendation
     
-    def get_recommendations_for_portal(self, portal_name):
-        """Get all recommendations targeting a specific portal."""
-        return [r for r in self.recommendations if r["target_portal"] == portal_name]
+    def get_recommendations_for_portal(self, portal_name, status=None, offset=0, limit=None):
+        """Get recommendations targeting a specific portal, oldest first, including archived ones."""
+        if self.database is not None:
+            return self.database.recommendations(portal_name, status=status, offset=offset, limit=limit)
+        archived = 0 if status == "pending" else self.recommendation_archive.count(portal_name, status)
+        if not archived:
+            return self.recommendations.for_target(portal_name, status=status, offset=offset, limit=limit)
+        
+        # Older pending recommendations stay live while finished ones are archived, so the
+        # two interleave; merge them by creation time, opening only the segments the page reaches
+        sources = self.recommendation_archive.sources(portal_name, status)
+        live = sorted(self.recommendations.for_target(portal_name, status=status), key=lambda rec: rec["created_at"])
+        if live:
+            live_created = [rec["created_at"] for rec in live]
+            sources.append(Source(live_created[0], live_created[-1], len(live), lambda skip: iter(live[skip:]),
+                                  count_before=lambda cutoff: bisect.bisect_left(live_created, cutoff)))
+        return merge_by_created(sources, offset, limit)
+    
+    def count_recommendations_for_portal(self, portal_name, status=None):
+        """Count recommendations targeting a specific portal, including archived ones."""
+        if self.database is not None:
+            return self.database.count_recommendations(portal_name, status=status)
+        archived = 0 if status == "pending" else self.recommendation_archive.count(portal_name, status)
+        return archived + self.recommendations.count_for_target(portal_name, status=status)
+    
+    def compact_recommendations(self):
+        """
+        Expire stale pending recommendations and evict old finished ones from memory.
+        
+        Pending recommendations older than recommendation_ttl become "expired". When more
+        than recommendations_retained implemented or expired recommendations are held in
+        memory, the oldest are evicted down to half that number and archived to a compressed
+        segment (or left to the database, which already holds them).
+        
+        Returns:
+            dict: {"expired", "evicted"}
+        """
+        now = datetime.fromtimestamp(self.clock())
+        cutoff = (now - timedelta(seconds=self.recommendation_ttl)).isoformat()
+        expired = self.recommendations.expire(cutoff, expired_at=now.isoformat())
+        if expired and self.shared_state:
+            self.database.claim_recommendations(expired, "pending", atomic=False)
+        elif expired and self.database is not None:
+            for rec in expired:
+                self.database.save_recommendation(rec)
+        
+        counts = self.recommendations.count_by_status()
+        finished = sum(counts.get(status, 0) for status in FINISHED_STATUSES)
+        evicted = []
+        if finished > self.recommendations_retained:
+            evicted = self.recommendations.evict(FINISHED_STATUSES, finished - self.recommendations_retained // 2)
+            if self.recommendation_archive is not None:
+                try:
+                    self.recommendation_archive.append(evicted)
+                except Exception as e:
+                    logger.error(f"Error archiving recommendations, keeping them in memory: {e}")
+                    for rec in evicted:
+                        self.recommendations.add(rec)
+                    evicted = []
+        
+        counters = self._recommendation_counters
+        counters["expired"] += len(expired)
+        counters["evicted"] += len(evicted)
+        counters["compactions"] += 1
+        counters["last_compaction"] = now.isoformat()
+        if expired or evicted:
+            logger.info(f"Recommendation compaction: {len(expired)} expired, {len(evicted)} evicted")
+        return {"expired": len(expired), "evicted": len(evicted)}
+    
+    def get_recommendation_stats(self):
+        """Get live and archived recommendation counts and compaction counters."""
+        stats = {
+            "live": len(self.recommendations),
+            "live_by_status": self.recommendations.count_by_status(),
+            "ttl_seconds": self.recommendation_ttl,
+            "retained": self.recommendations_retained,
+            **self._recommendation_counters
+        }
+        if self.recommendation_archive is not None:
+            stats.update(self.recommendation_archive.stats())
+        return stats
     
     def implement_recommendation(self, recommendation_id):
         """Implement a recommendation, potentially evolving a portal."""
-        for i, rec in enumerate(self.recommendations):
-            if rec["id"] == recommendation_id and rec["status"] == "pending":
-                # Mark as implemented
-                self.recommendations[i]["status"] = "implemented"
-                self.recommendations[i]["implemented_at"] = datetime.now().isoformat()
-                
-                # Apply evolution boost to target portal
-                target = rec["target_portal"]
-                if target in self.portals:
-                    boost = random.uniform(0.5, 2.0)
-                    new_stage = self.portals[target].update_evolution_score(boost)
-                    
-                    # Record the implementation
-                    self.record_portal_activity(
-                        target, 
-                        f"Implemented recommendation '{rec['type']}' from {rec['source_portal']}"
-                    )
-                    
-                    # Save evolution data
-                    self._save_evolution_data()
-                    
-                    logger.info(f"Implemented recommendation {recommendation_id} for portal {target}")
-                    return {"success": True, "portal": target, "new_stage": new_stage.value}
+        result = self.implement_recommendations([recommendation_id])["results"][0]
+        if not result["success"]:
+            logger.warning(f"Recommendation not found or already implemented: {recommendation_id}")
+            return {"success": False, "error": result["error"]}
+        
+        logger.info(f"Implemented recommendation {recommendation_id} for portal {result['portal']}")
+        return {key: value for key, value in result.items() if key != "recommendation_id"}
+    
+    def _claim_recommendations(self, updated, atomic):
+        """
+        Claim locally implemented recommendations in the shared database.
+        
+        Recommendations another worker implemented first are dropped; those that were not
+        written because an atomic claim failed are moved back to pending.
+        """
+        moved = [rec for rec in updated if rec is not None]
+        claimed = self.database.claim_recommendations(moved, "pending", atomic=atomic)
+        lost = [rec["id"] for rec in moved if rec["id"] not in claimed]
+        if lost:
+            stored = self.database.get_recommendations(lost)
+            revert = [rec_id for rec_id in lost if stored.get(rec_id, {}).get("status") == "pending"]
+            self.recommendations.transition_many(revert, "implemented", "pending", atomic=False, implemented_at=None)
+        return [rec if rec is not None and rec["id"] in claimed else None for rec in updated]
+    
+    def implement_recommendations(self, recommendation_ids, atomic=True):
+        """
+        Implement several recommendations at once.
+        
+        All recommendations are moved to "implemented" under one store lock. Boosts are
+        summed per target portal and applied with a single score update per portal, and
+        the evolution log is flushed once for the whole batch.
+        
+        Args:
+            recommendation_ids (list): Ids of pending recommendations
+            atomic (bool): If any recommendation cannot be implemented, implement none
+            
+        Returns:
+            dict: {"success", "results": [{"recommendation_id", "success", "portal", "new_stage" or "error"}],
+                "portals": {name: {"implemented", "boost", "new_stage"}}, "latency_ms"}
+        """
+        started = time.perf_counter()
+        results = [None] * len(recommendation_ids)
+        seen = set()
+        candidates = []
+        for index, rec_id in enumerate(recommendation_ids):
+            if not isinstance(rec_id, str) or not rec_id:
+                results[index] = {"recommendation_id": rec_id, "success": False, "error": "Invalid recommendation id"}
+            elif rec_id in seen:
+                results[index] = {"recommendation_id": rec_id, "success": False, "error": "Duplicate recommendation id"}
+            else:
+                seen.add(rec_id)
+                candidates.append(index)
+        
+        if self.shared_state:
+            self._sync_recommendations([recommendation_ids[index] for index in candidates])
+        
+        if atomic and len(candidates) < len(recommendation_ids):
+            updated = [None] * len(candidates)
+        else:
+            updated = self.recommendations.transition_many(
+                [recommendation_ids[index] for index in candidates], "pending", "implemented",
+                atomic=atomic, implemented_at=datetime.fromtimestamp(self.clock()).isoformat()
+            )
+        
+        if self.shared_state:
+            updated = self._claim_recommendations(updated, atomic)
+        elif self.database is not None:
+            for rec in updated:
+                if rec is not None:
+                    self.database.save_recommendation(rec)
+        
+        failed = any(rec is None for rec in updated) or len(candidates) < len(recommendation_ids)
+        by_target = {}
+        for index, rec in zip(candidates, updated):
+            if rec is None:
+                rec_id = recommendation_ids[index]
+                current = self.recommendations.get(rec_id)
+                error = ("Recommendation not found or already implemented"
+                         if current is None or current["status"] != "pending"
+                         else "Not applied: another recommendation in the batch failed")
+                results[index] = {"recommendation_id": rec_id, "success": False, "error": error}
+            else:
+                by_target.setdefault(rec["target_portal"], []).append((index, rec))
+        
+        portals = {}
+        for target, items in by_target.items():
+            if target not in self.portals:
+                for index, rec in items:
+                    results[index] = {"recommendation_id": rec["id"], "success": True, "portal": target}
+                continue
+            
+            boost = sum(self.rng.uniform(0.5, 2.0) for _ in items)
+            if len(items) == 1:
+                rec = items[0][1]
+                description = f"Implemented recommendation '{rec['type']}' from {rec['source_portal']}"
+            else:
+                description = f"Implemented {len(items)} recommendations"
+            portal = self.portals[target]
+            with self.state.lock(target):
+                old_score, old_stage = portal.evolution_score, portal.evolution_stage
+                portal.update_evolution_score(boost)
+                self._log_evolution_change(target, old_score, old_stage, flush=False)
+                self.metrics.record_score(target, portal.evolution_score)
                 
-                return {"success": True, "portal": target}
+                # Record the implementation
+                old_score, old_stage = portal.evolution_score, portal.evolution_stage
+                activity = portal.record_activity(description)
+                self._log_evolution_change(target, old_score, old_stage, flush=False)
+                self.state.publish(portal)
+                self._publish_activity(portal, activity)
+                new_stage = portal.evolution_stage.value
+            
+            portals[target] = {"implemented": len(items), "boost": boost, "new_stage": new_stage}
+            for index, rec in items:
+                self.interactions.record(rec["source_portal"], target, "implemented_recommendation")
+                self.events.publish("recommendation_implemented", rec)
+                results[index] = {"recommendation_id": rec["id"], "success": True, "portal": target,
+                                  "new_stage": new_stage}
+        
+        if portals:
+            try:
+                self.evolution_log.flush()
+                self._request_compaction()
+            except Exception as e:
+                logger.error(f"Error flushing evolution log: {e}")
         
-        logger.warning(f"Recommendation not found or already implemented: {recommendation_id}")
-        return {"success": False, "error": "Recommendation not found or already implemented"}
+        latency_ms = (time.perf_counter() - started) * 1000
+        logger.debug(f"Implemented {sum(1 for r in results if r['success'])} of {len(results)} recommendations "
+                     f"across {len(portals)} portals in {latency_ms:.2f} ms")
+        return {"success": not failed, "results": results, "portals": portals, "latency_ms": latency_ms}
@@ -0,0 +1,110 @@
+"""
+Portal Registry
+
+This module provides the declarative registry of portals in the LUMAURA AI System.
+The registry reads portal definitions at startup, which is cheap, and only builds a
+portal the first time it is accessed. It behaves like a read-only mapping of portal
+name to portal instance and records how long each portal took to load.
+"""
+
+import logging
+import threading
+import time
+from collections.abc import Mapping
+
+from lumaura_ai_system.portals.base import DEFINITIONS_FILE, Portal, load_definitions
+
+logger = logging.getLogger(__name__)
+
+
+class PortalRegistry(Mapping):
+    """Lazily instantiated mapping of portal name to portal."""
+
+    def __init__(self, definitions=None, definitions_path=DEFINITIONS_FILE, on_load=None):
+        """
+        Initialize the registry.
+
+        Args:
+            definitions (dict, optional): Portal name -> definition, read from definitions_path by default
+            definitions_path (Path): JSON file with portal definitions
+            on_load (callable, optional): Called with each portal right after it is instantiated
+        """
+        self._definitions = definitions if definitions is not None else load_definitions(definitions_path)
+        self._portals = {}
+        self._load_times = {}
+        self._lock = threading.Lock()
+        self.on_load = on_load
+        logger.info(f"Portal registry created with {len(self._definitions)} portal definitions")
+
+    def __getitem__(self, name):
+        portal = self._portals.get(name)
+        if portal is not None:
+            return portal
+        if name not in self._definitions:
+            raise KeyError(name)
+        with self._lock:
+            portal = self._portals.get(name)
+            if portal is None:
+                started = time.perf_counter()
+                portal = Portal(self._definitions[name])
+                if self.on_load is not None:
+                    self.on_load(portal)
+                self._load_times[name] = time.perf_counter() - started
+                self._portals[name] = portal
+                logger.debug(f"Loaded portal {name} in {self._load_times[name] * 1000:.2f} ms")
+        return portal
+
+    def __contains__(self, name):
+        return name in self._definitions
+
+    def __iter__(self):
+        # Iterate over a copy so definitions registered meanwhile cannot break iteration
+        return iter(list(self._definitions))
+
+    def __len__(self):
+        return len(self._definitions)
+
+    def register(self, definition):
+        """Add a portal definition. The portal is built on first access."""
+        with self._lock:
+            self._definitions[definition["name"]] = definition
+
+    def register_many(self, definitions):
+        """
+        Add several portal definitions under one lock.
+
+        Returns:
+            int: Number of definitions added
+        """
+        with self._lock:
+            count = len(self._definitions)
+            self._definitions.update((definition["name"], definition) for definition in definitions)
+            return len(self._definitions) - count
+
+    def is_loaded(self, name):
+        """Check whether a portal has been instantiated."""
+        return name in self._portals
+
+    def loaded_items(self):
+        """Get (name, portal) pairs of the portals instantiated so far."""
+        return list(self._portals.items())
+
+    def load_all(self):
+        """Instantiate every portal that is not loaded yet."""
+        if len(self._portals) < len(self._definitions):
+            for name in list(self._definitions):
+                self[name]
+
+    def load_times(self):
+        """Get the time in seconds each loaded portal took to instantiate."""
+        return dict(self._load_times)
+
+    def stats(self):
+        """Get registry statistics."""
+        load_times = self.load_times()
+        return {
+            "defined": len(self._definitions),
+            "loaded": len(self._portals),
+            "load_times_ms": {name: seconds * 1000 for name, seconds in load_times.items()},
+            "total_load_time_ms": sum(load_times.values()) * 1000
+        }
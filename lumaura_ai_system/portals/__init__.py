@@ -2,9 +2,6 @@
 Portal package initialization.
 
 This package contains all the AI portals that make up the LUMAURA x XUVE ecosystem.
+Portals are described in portal_definitions.json and run on the generic engine in
+base.py; the per-portal subpackages only hold portal-specific functions.
 """
-# Import all portal modules to make them available when importing the package
-from lumaura_ai_system.portals import (
-    xuvebanker, xuvemark, xuveteam
-    # Other portals will be imported here as they're added
-)
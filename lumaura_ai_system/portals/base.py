@@ -0,0 +1,230 @@
+"""
+Portal Engine
+
+This module provides the generic portal implementation shared by every portal in the
+LUMAURA x XUVE ecosystem. A portal is described by a definition (name, display name and
+the capabilities unlocked at each evolution stage) loaded from portal_definitions.json,
+so adding a portal only requires a new data entry.
+
+Capability sets are computed once per (portal type, stage), frozen, shared by every
+instance and pre-serialised to JSON, so status responses reuse the same fragments.
+"""
+
+import json
+import logging
+from datetime import datetime
+from enum import Enum
+from pathlib import Path
+
+from lumaura_ai_system.activity_store import ActivityStore
+
+logger = logging.getLogger(__name__)
+
+DEFINITIONS_FILE = Path(__file__).parent / "portal_definitions.json"
+
+
+class EvolutionStage(Enum):
+    """Evolution stages for the portal."""
+    BASIC = "Basic"
+    ADVANCED = "Advanced"
+    MASTERY = "Mastery"
+
+
+# Minimum evolution score for each stage, highest first
+STAGE_THRESHOLDS = [
+    (81, EvolutionStage.MASTERY),
+    (41, EvolutionStage.ADVANCED),
+    (0, EvolutionStage.BASIC),
+]
+
+
+def stage_for_score(score):
+    """Get the evolution stage reached at a score."""
+    for threshold, stage in STAGE_THRESHOLDS:
+        if score >= threshold:
+            return stage
+    return EvolutionStage.BASIC
+
+
+def load_definitions(path=DEFINITIONS_FILE):
+    """
+    Load portal definitions.
+
+    Returns:
+        dict: Portal name -> definition dict, in file order
+    """
+    with open(path, "r") as f:
+        data = json.load(f)
+    return {definition["name"]: definition for definition in data.get("portals", [])}
+
+
+_definitions = None
+
+
+def get_definition(name):
+    """Get the definition of a portal from the bundled definitions file."""
+    global _definitions
+    if _definitions is None:
+        _definitions = load_definitions()
+    return _definitions[name]
+
+
+class FrozenCapabilities(dict):
+    """Read-only capability mapping shared between portal instances."""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Portal capabilities are shared and cannot be modified")
+
+    __setitem__ = __delitem__ = __ior__ = clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        return (FrozenCapabilities, (dict(self),))
+
+
+class CapabilityTable:
+    """Frozen capability sets and their JSON fragments for every stage of one portal type."""
+
+    __slots__ = ("definition", "by_stage", "json_by_stage")
+
+    def __init__(self, definition):
+        """Build the cumulative capability set of each stage from a portal definition."""
+        self.definition = definition
+        self.by_stage = {}
+        self.json_by_stage = {}
+        table = definition.get("capabilities", {})
+        capabilities = {}
+        for stage in EvolutionStage:
+            for capability in table.get(stage.value, []):
+                capabilities[capability] = True
+            frozen = FrozenCapabilities(capabilities)
+            self.by_stage[stage] = frozen
+            self.json_by_stage[stage.value] = json.dumps(frozen, separators=(",", ":"))
+
+
+_capability_tables = {}
+
+
+def capability_table(definition):
+    """Get the shared capability table of a portal definition."""
+    table = _capability_tables.get(definition["name"])
+    if table is None or table.definition is not definition:
+        table = CapabilityTable(definition)
+        _capability_tables[definition["name"]] = table
+    return table
+
+
+def status_to_json(status):
+    """
+    Serialise a portal status dict to JSON.
+
+    The capabilities fragment is taken from the shared capability table instead of
+    being serialised again.
+    """
+    table = _capability_tables.get(status["name"])
+    fragment = table.json_by_stage.get(status["evolution_stage"]) if table else None
+    if fragment is None:
+        return json.dumps(status, separators=(",", ":"))
+    fields = json.dumps({key: value for key, value in status.items() if key != "capabilities"},
+                        separators=(",", ":"))
+    return f'{fields[:-1]},"capabilities":{fragment}}}'
+
+
+class Portal:
+    """Generic portal driven by a portal definition."""
+
+    __slots__ = ("definition", "name", "display_name", "activities", "evolution_stage", "last_activity",
+                 "created_at", "capabilities", "_capability_table", "_score", "_score_table", "_score_slot")
+
+    def __init__(self, definition):
+        """Initialize the portal with default settings."""
+        self.definition = definition
+        self._capability_table = capability_table(definition)
+        self.name = definition["name"]
+        self.display_name = definition.get("display_name", self.name.capitalize())
+        self._score = 0
+        self._score_table = None
+        self._score_slot = None
+        self.activities = ActivityStore()
+        self.evolution_stage = EvolutionStage.BASIC
+        self.last_activity = None
+        self.created_at = datetime.now().isoformat()
+        self.capabilities = self._get_capabilities_for_stage(EvolutionStage.BASIC)
+        logger.info(f"Initialized {self.display_name} Portal")
+
+    @property
+    def evolution_score(self):
+        """The portal's score, held in a shared score table once attached to one."""
+        if self._score_table is None:
+            return self._score
+        return self._score_table.get(self._score_slot)
+
+    @evolution_score.setter
+    def evolution_score(self, score):
+        if self._score_table is None:
+            self._score = score
+        else:
+            self._score_table.set(self._score_slot, score)
+
+    def attach_score_table(self, score_table):
+        """Move the portal's score into a shared score table."""
+        self._score_slot = score_table.attach(self.name, self._score)
+        self._score_table = score_table
+
+    def _get_capabilities_for_stage(self, stage):
+        """Get the shared capabilities for the given evolution stage, including those of earlier stages."""
+        return self._capability_table.by_stage.get(stage, {})
+
+    def update_evolution_score(self, points):
+        """Update the evolution score and potentially change the stage."""
+        old_score = self.evolution_score
+        if self._score_table is None:
+            self._score = max(0, min(100, old_score + points))
+        else:
+            self._score_table.add(self._score_slot, points)
+
+        # Determine evolution stage based on score
+        new_stage = stage_for_score(self.evolution_score)
+
+        # If stage changed, update capabilities
+        if new_stage != self.evolution_stage:
+            self.evolution_stage = new_stage
+            self.capabilities = self._get_capabilities_for_stage(new_stage)
+            logger.info(f"{self.display_name} Portal evolved to {new_stage.value} stage")
+
+        logger.debug(f"{self.display_name} Portal evolution score updated: {old_score} -> {self.evolution_score}")
+        return self.evolution_stage
+
+    def record_activity(self, activity_description):
+        """Record portal activity and potentially increase evolution score."""
+        activity = self.activities.append(activity_description)
+        self.last_activity = activity
+
+        # Small evolution gain from activity
+        self.update_evolution_score(0.1)
+        logger.debug(f"{self.display_name} Portal activity: {activity_description}")
+        return activity
+
+    def get_status(self):
+        """Get the current status of the portal."""
+        return {
+            "name": self.name,
+            "display_name": self.display_name,
+            "evolution_score": self.evolution_score,
+            "evolution_stage": self.evolution_stage.value,
+            "capabilities": self.capabilities,
+            "last_activity": self.last_activity,
+            "created_at": self.created_at
+        }
+
+    def to_dict(self):
+        """Convert portal to dictionary representation."""
+        return {
+            "name": self.name,
+            "display_name": self.display_name,
+            "evolution_score": self.evolution_score,
+            "evolution_stage": self.evolution_stage.value,
+            "capabilities": self.capabilities,
+            "last_activity": self.last_activity,
+            "created_at": self.created_at,
+            "activities_count": self.activities.total_count
+        }
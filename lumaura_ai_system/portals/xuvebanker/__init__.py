@@ -3,127 +3,17 @@ xuvebanker Portal Module
 
 This module provides the core functionality for the xuvebanker portal in the LUMAURA x XUVE ecosystem.
 Each portal has specific responsibilities and evolves through usage and interaction.
+The portal runs on the generic engine in lumaura_ai_system.portals.base, configured by
+the xuvebanker entry of portal_definitions.json.
 """
 
-import os
-import logging
-import json
-from datetime import datetime
-from enum import Enum
+from lumaura_ai_system.portals.base import Portal, get_definition
 
-logger = logging.getLogger(__name__)
-
-class EvolutionStage(Enum):
-    """Evolution stages for the portal."""
-    BASIC = "Basic"
-    ADVANCED = "Advanced"
-    MASTERY = "Mastery"
-
-class XuvebankerPortal:
+class XuvebankerPortal(Portal):
     """Xuvebanker Portal implementation."""
     
-    def __init__(self):
-        """Initialize the portal with default settings."""
-        self.name = "xuvebanker"
-        self.display_name = "Xuvebanker"
-        self.evolution_score = 0
-        self.activities = []
-        self.evolution_stage = EvolutionStage.BASIC
-        self.last_activity = None
-        self.created_at = datetime.now().isoformat()
-        self.capabilities = self._get_capabilities_for_stage(EvolutionStage.BASIC)
-        logger.info(f"Initialized {self.display_name} Portal")
-    
-    def _get_capabilities_for_stage(self, stage):
-        """Get capabilities for the given evolution stage."""
-        capabilities = {
-            EvolutionStage.BASIC: self._get_basic_capabilities(),
-            EvolutionStage.ADVANCED: {**self._get_basic_capabilities(), **self._get_advanced_capabilities()},
-            EvolutionStage.MASTERY: {**self._get_basic_capabilities(), **self._get_advanced_capabilities(), **self._get_mastery_capabilities()}
-        }
-        return capabilities.get(stage, {})
-    
-    def _get_basic_capabilities(self):
-        """Get basic portal capabilities."""
-        return {
-            "transaction_processing": True,
-            "financial_reporting": True,
-            "basic_analysis": True
-        }
+    __slots__ = ()
     
-    def _get_advanced_capabilities(self):
-        """Get advanced portal capabilities."""
-        return {
-            "predictive_analysis": True,
-            "automated_transactions": True,
-            "cross_currency_operations": True
-        }
-    
-    def _get_mastery_capabilities(self):
-        """Get mastery level portal capabilities."""
-        return {
-            "autonomous_financial_decisions": True,
-            "blockchain_optimization": True,
-            "financial_ai_advisory": True
-        }
-    
-    def update_evolution_score(self, points):
-        """Update the evolution score and potentially change the stage."""
-        old_score = self.evolution_score
-        self.evolution_score = max(0, min(100, self.evolution_score + points))
-        
-        # Determine evolution stage based on score
-        if self.evolution_score >= 81:
-            new_stage = EvolutionStage.MASTERY
-        elif self.evolution_score >= 41:
-            new_stage = EvolutionStage.ADVANCED
-        else:
-            new_stage = EvolutionStage.BASIC
-        
-        # If stage changed, update capabilities
-        if new_stage != self.evolution_stage:
-            self.evolution_stage = new_stage
-            self.capabilities = self._get_capabilities_for_stage(new_stage)
-            logger.info(f"{self.display_name} Portal evolved to {new_stage.value} stage")
-            
-        logger.debug(f"{self.display_name} Portal evolution score updated: {old_score} -> {self.evolution_score}")
-        return self.evolution_stage
-    
-    def record_activity(self, activity_description):
-        """Record portal activity and potentially increase evolution score."""
-        activity = {
-            "description": activity_description,
-            "timestamp": datetime.now().isoformat()
-        }
-        self.activities.append(activity)
-        self.last_activity = activity
-        
-        # Small evolution gain from activity
-        self.update_evolution_score(0.1)
-        logger.debug(f"{self.display_name} Portal activity: {activity_description}")
-        return activity
-    
-    def get_status(self):
-        """Get the current status of the portal."""
-        return {
-            "name": self.name,
-            "display_name": self.display_name,
-            "evolution_score": self.evolution_score,
-            "evolution_stage": self.evolution_stage.value,
-            "capabilities": self.capabilities,
-            "last_activity": self.last_activity,
-            "created_at": self.created_at
-        }
-        
-    def to_dict(self):
-        """Convert portal to dictionary representation."""
-        return {
-            "name": self.name,
-            "display_name": self.display_name,
-            "evolution_score": self.evolution_score,
-            "evolution_stage": self.evolution_stage.value,
-            "capabilities": self.capabilities,
-            "last_activity": self.last_activity,
-            "created_at": self.created_at,
-            "activities_count": len(self.activities)
-        }
+    def __init__(self):
+        """Initialize the portal from its definition."""
+        super().__init__(get_definition("xuvebanker"))
@@ -0,0 +1,271 @@
+"""
+Recommendation Archive
+
+This module provides on-disk archival of recommendations evicted from the in-memory
+RecommendationStore. Each archival writes one gzip-compressed JSON-lines segment, and a
+small manifest keeps per-portal, per-status counts so totals never require reading the
+segments. The manifest also records, per segment and target portal, the counts and the
+creation-time range of its recommendations, so a listing merged with live recommendations
+by creation time only opens the segments the requested page actually reaches.
+"""
+
+import gzip
+import heapq
+import itertools
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".jsonl.gz"
+
+
+class Source:
+    """A run of recommendations for one listing, sorted by creation time."""
+
+    __slots__ = ("first", "last", "count", "load", "count_before", "skip")
+
+    def __init__(self, first, last, count, load, count_before=None):
+        """
+        Args:
+            first (str): Lower bound of the run's created_at values
+            last (str): Upper bound of the run's created_at values
+            count (int): Number of recommendations in the run
+            load (callable): Called with a number of leading items to skip; returns an
+                iterator over the rest of the run in creation order
+            count_before (callable, optional): Counts the run's items created before a
+                time without loading it, for runs held in memory
+        """
+        self.first = first
+        self.last = last
+        self.count = count
+        self.load = load
+        self.count_before = count_before
+        self.skip = 0
+
+
+# Sorts after every ISO-8601 timestamp
+_END_OF_TIME = "\uffff"
+
+
+def merge_by_created(sources, offset=0, limit=None):
+    """
+    Get one page of several runs merged by creation time.
+
+    The offset is first consumed by finding the latest cut-off time that no unloaded
+    run straddles: whole runs before it are skipped by count and in-memory runs skip
+    their items before it. The remaining runs are only loaded once the merge reaches
+    their first creation time.
+
+    Args:
+        sources (list): Source runs
+        offset (int): Number of merged recommendations to skip
+        limit (int, optional): Maximum number of recommendations to return
+
+    Returns:
+        list: Recommendations, oldest first
+    """
+    pending = sorted((source for source in sources if source.count), key=lambda source: source.first)
+    if offset and pending:
+        cut = None
+        for cutoff in sorted({source.first for source in pending}) + [_END_OF_TIME]:
+            if any(source.first < cutoff <= source.last for source in pending if source.count_before is None):
+                continue
+            before = sum(source.count_before(cutoff) if source.count_before is not None
+                         else source.count if source.last < cutoff else 0 for source in pending)
+            if before > offset:
+                break
+            cut = cutoff, before
+        if cut is not None:
+            cutoff, before = cut
+            offset -= before
+            remaining = []
+            for source in pending:
+                if source.count_before is not None:
+                    source.skip = source.count_before(cutoff)
+                    if source.skip < source.count:
+                        remaining.append(source)
+                elif source.first >= cutoff:
+                    remaining.append(source)
+            pending = remaining
+    if limit is not None and limit <= 0:
+        return []
+
+    heap, sequence = [], itertools.count()
+
+    def activate(source):
+        iterator = source.load(source.skip)
+        item = next(iterator, None)
+        if item is not None:
+            heapq.heappush(heap, (item["created_at"], next(sequence), item, iterator))
+
+    def merged():
+        position = 0
+        while heap or position < len(pending):
+            # Open runs that may hold the next item
+            while position < len(pending) and (not heap or pending[position].first <= heap[0][0]):
+                activate(pending[position])
+                position += 1
+            if not heap:
+                continue
+            _, _, item, iterator = heapq.heappop(heap)
+            yield item
+            following = next(iterator, None)
+            if following is not None:
+                heapq.heappush(heap, (following["created_at"], next(sequence), following, iterator))
+
+    stop = None if limit is None else offset + limit
+    return list(itertools.islice(merged(), offset, stop))
+
+
+def _segment_index(recommendations):
+    """Get per-target-portal status counts and creation-time range of a segment's recommendations."""
+    portals = {}
+    for recommendation in recommendations:
+        created_at = recommendation["created_at"]
+        entry = portals.get(recommendation["target_portal"])
+        if entry is None:
+            entry = portals[recommendation["target_portal"]] = {"counts": {}, "first": created_at, "last": created_at}
+        entry["counts"][recommendation["status"]] = entry["counts"].get(recommendation["status"], 0) + 1
+        entry["first"] = min(entry["first"], created_at)
+        entry["last"] = max(entry["last"], created_at)
+    return portals
+
+
+class RecommendationArchive:
+    """Append-only compressed segments of archived recommendations."""
+
+    def __init__(self, archive_dir="data/portal_evolution/recommendations"):
+        """
+        Open the archive, reading its manifest if present.
+
+        Args:
+            archive_dir (str): Directory holding the manifest and segments
+        """
+        self.archive_dir = Path(archive_dir)
+        self.manifest_file = self.archive_dir / MANIFEST_NAME
+        self._lock = threading.Lock()
+        self._segments = []
+        # Target portal -> status -> count
+        self._counts = {}
+        if self.manifest_file.exists():
+            try:
+                with open(self.manifest_file, "r") as f:
+                    manifest = json.load(f)
+                self._segments = manifest.get("segments", [])
+                self._counts = manifest.get("counts", {})
+            except Exception as e:
+                logger.error(f"Error loading recommendation archive manifest: {e}")
+
+    def _write_atomic(self, path, write):
+        """Write a file through a temporary file and rename it into place."""
+        tmp_path = path.with_name(path.name + ".tmp")
+        write(tmp_path)
+        os.replace(tmp_path, path)
+
+    def append(self, recommendations):
+        """
+        Archive recommendations as a new compressed segment.
+
+        Returns:
+            int: Number of recommendations archived
+        """
+        if not recommendations:
+            return 0
+        with self._lock:
+            self.archive_dir.mkdir(parents=True, exist_ok=True)
+            index = self._segments[-1]["index"] + 1 if self._segments else 1
+            name = f"{SEGMENT_PREFIX}{index:08d}{SEGMENT_SUFFIX}"
+
+            def write_segment(path):
+                with gzip.open(path, "wt", encoding="utf-8") as f:
+                    for recommendation in recommendations:
+                        f.write(json.dumps(recommendation, separators=(",", ":")) + "\n")
+
+            self._write_atomic(self.archive_dir / name, write_segment)
+
+            counts = {target: dict(by_status) for target, by_status in self._counts.items()}
+            for recommendation in recommendations:
+                by_status = counts.setdefault(recommendation["target_portal"], {})
+                by_status[recommendation["status"]] = by_status.get(recommendation["status"], 0) + 1
+            segments = self._segments + [{"index": index, "file": name, "count": len(recommendations),
+                                          "portals": _segment_index(recommendations)}]
+
+            def write_manifest(path):
+                with open(path, "w") as f:
+                    json.dump({"segments": segments, "counts": counts}, f)
+
+            # The segment is only visible once the manifest naming it is in place
+            self._write_atomic(self.manifest_file, write_manifest)
+            self._segments = segments
+            self._counts = counts
+        logger.info(f"Archived {len(recommendations)} recommendations to {name}")
+        return len(recommendations)
+
+    def count(self, target_portal=None, status=None):
+        """Count archived recommendations, optionally for one target portal and status."""
+        counts = self._counts
+        targets = counts.values() if target_portal is None else [counts.get(target_portal, {})]
+        return sum(n for by_status in targets for s, n in by_status.items() if status is None or s == status)
+
+    def counts_by_status(self):
+        """Get the number of archived recommendations in each status."""
+        totals = {}
+        for by_status in self._counts.values():
+            for status, n in by_status.items():
+                totals[status] = totals.get(status, 0) + n
+        return totals
+
+    def sources(self, target_portal, status=None):
+        """
+        Get the archived recommendations of a target portal as one run per segment.
+
+        Returns:
+            list: Source runs for merge_by_created
+        """
+        sources = []
+        for segment in list(self._segments):
+            entry = segment["portals"].get(target_portal)
+            if entry is None:
+                continue
+            count = sum(n for s, n in entry["counts"].items() if status is None or s == status)
+            if count:
+                sources.append(Source(entry["first"], entry["last"], count,
+                                      self._segment_loader(segment["file"], target_portal, status)))
+        return sources
+
+    def _segment_loader(self, file_name, target_portal, status):
+        """Get a Source loader reading one segment's matching recommendations in creation order."""
+        def load(skip):
+            matching = []
+            try:
+                with gzip.open(self.archive_dir / file_name, "rt", encoding="utf-8") as f:
+                    for line in f:
+                        recommendation = json.loads(line)
+                        if recommendation["target_portal"] != target_portal:
+                            continue
+                        if status is not None and recommendation["status"] != status:
+                            continue
+                        matching.append(recommendation)
+            except FileNotFoundError:
+                logger.warning(f"Archived recommendation segment missing: {file_name}")
+            matching.sort(key=lambda recommendation: recommendation["created_at"])
+            return iter(matching[skip:])
+        return load
+
+    def stats(self):
+        """Get archive statistics."""
+        return {
+            "archived": self.count(),
+            "archived_by_status": self.counts_by_status(),
+            "segments": len(self._segments),
+            "bytes": sum(
+                (self.archive_dir / segment["file"]).stat().st_size
+                for segment in self._segments if (self.archive_dir / segment["file"]).exists()
+            )
+        }
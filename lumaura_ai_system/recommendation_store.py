@@ -0,0 +1,245 @@
+"""
+Recommendation Store
+
+This module provides an indexed store for portal recommendations.
+Recommendations are indexed by id, by target portal and by (target portal, status),
+so lookups and status changes are O(1) and per-portal listings never scan the
+full history. Ids are allocated from a monotonic counter and never reused.
+Pending recommendations can be expired and finished ones evicted, so the
+in-memory set stays bounded while older entries are archived elsewhere.
+"""
+
+import itertools
+import logging
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+ID_PREFIX = "rec-"
+
+
+class RecommendationStore:
+    """Recommendations indexed by id, target portal and status."""
+
+    def __init__(self, id_prefix=ID_PREFIX, clock=time.time):
+        """
+        Initialize an empty store.
+
+        Args:
+            id_prefix (str): Prefix of allocated ids; processes sharing a database use
+                distinct prefixes so their ids never collide
+            clock (callable): Returns the current time in epoch seconds, used for creation times
+        """
+        self.id_prefix = id_prefix
+        self.clock = clock
+        self._by_id = {}
+        # Insertion-ordered dicts used as ordered sets of recommendation ids
+        self._by_target = {}
+        self._by_target_status = {}
+        self._status_counts = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def _index(self, recommendation):
+        """Add a recommendation to the indexes. Caller holds the lock."""
+        rec_id = recommendation["id"]
+        target = recommendation["target_portal"]
+        status = recommendation["status"]
+        self._by_id[rec_id] = recommendation
+        self._by_target.setdefault(target, {})[rec_id] = None
+        self._by_target_status.setdefault((target, status), {})[rec_id] = None
+        self._status_counts[status] = self._status_counts.get(status, 0) + 1
+
+    def create(self, source_portal, target_portal, recommendation_type, details):
+        """Create and store a new pending recommendation."""
+        with self._lock:
+            recommendation = {
+                "id": f"{self.id_prefix}{next(self._ids)}",
+                "source_portal": source_portal,
+                "target_portal": target_portal,
+                "type": recommendation_type,
+                "details": details,
+                "created_at": datetime.fromtimestamp(self.clock()).isoformat(),
+                "status": "pending"
+            }
+            self._index(recommendation)
+        return recommendation
+
+    def add(self, recommendation):
+        """Store an existing recommendation, keeping the id counter ahead of its id."""
+        with self._lock:
+            rec_id = recommendation["id"]
+            if rec_id in self._by_id:
+                return
+            if rec_id.startswith(self.id_prefix) and rec_id[len(self.id_prefix):].isdigit():
+                self._advance_ids(int(rec_id[len(self.id_prefix):]))
+            self._index(recommendation)
+
+    def advance_ids(self, number):
+        """Make sure ids allocated from now on are numbered above number."""
+        with self._lock:
+            self._advance_ids(number)
+
+    def _advance_ids(self, number):
+        """Move the id counter past number. Caller holds the lock."""
+        current = next(self._ids)
+        self._ids = itertools.count(max(current, number + 1))
+
+    def export(self):
+        """
+        Get the store's contents for a snapshot.
+
+        Returns:
+            tuple: (number of the last allocated id, recommendations in insertion order)
+        """
+        with self._lock:
+            current = next(self._ids)
+            self._ids = itertools.count(current)
+            return current - 1, list(self._by_id.values())
+
+    def get(self, recommendation_id):
+        """Get a recommendation by id, or None."""
+        return self._by_id.get(recommendation_id)
+
+    def transition(self, recommendation_id, from_status, to_status, **fields):
+        """
+        Atomically move a recommendation from one status to another.
+
+        The stored dict is replaced rather than mutated, so readers holding the old
+        dict keep seeing a consistent record.
+
+        Returns:
+            dict: The updated recommendation, or None if it does not exist or is not in from_status
+        """
+        with self._lock:
+            recommendation = self._by_id.get(recommendation_id)
+            if recommendation is None or recommendation["status"] != from_status:
+                return None
+            return self._move(recommendation, to_status, fields)
+
+    def transition_many(self, recommendation_ids, from_status, to_status, atomic=True, **fields):
+        """
+        Move several recommendations from one status to another under one lock.
+
+        Args:
+            recommendation_ids (list): Ids to move; must not contain duplicates
+            from_status (str): Status every recommendation must currently have
+            to_status (str): New status
+            atomic (bool): If any id cannot be moved, move none of them
+
+        Returns:
+            list: Per id, the updated recommendation or None if it could not be moved
+                (with atomic=True and any failure, every entry for a movable id is also None)
+        """
+        with self._lock:
+            current = [self._by_id.get(rec_id) for rec_id in recommendation_ids]
+            movable = [rec is not None and rec["status"] == from_status for rec in current]
+            if atomic and not all(movable):
+                return [None] * len(recommendation_ids)
+            return [self._move(rec, to_status, fields) if ok else None for rec, ok in zip(current, movable)]
+
+    def expire(self, created_before, **fields):
+        """
+        Move pending recommendations created before a time to "expired".
+
+        Args:
+            created_before (str): ISO-8601 creation time cutoff
+            **fields: Extra fields to set on expired recommendations
+
+        Returns:
+            list: The expired recommendations
+        """
+        expired = []
+        with self._lock:
+            for (target, status), ids in list(self._by_target_status.items()):
+                if status != "pending":
+                    continue
+                # Ids are in insertion order, not creation order: a recommendation moved
+                # back to pending or added from a database sits after newer ones
+                stale = [rec_id for rec_id in ids if self._by_id[rec_id]["created_at"] < created_before]
+                for rec_id in stale:
+                    expired.append(self._move(self._by_id[rec_id], "expired", fields))
+        return expired
+
+    def evict(self, statuses, count):
+        """
+        Remove the oldest recommendations in the given statuses.
+
+        Args:
+            statuses (tuple): Statuses that may be evicted, e.g. ("implemented", "expired")
+            count (int): Maximum number of recommendations to remove
+
+        Returns:
+            list: The removed recommendations, oldest first
+        """
+        with self._lock:
+            victims = []
+            for recommendation in self._by_id.values():
+                if len(victims) >= count:
+                    break
+                if recommendation["status"] in statuses:
+                    victims.append(recommendation)
+            for recommendation in victims:
+                self._unindex(recommendation)
+        return victims
+
+    def _unindex(self, recommendation):
+        """Remove a recommendation from the indexes. Caller holds the lock."""
+        rec_id = recommendation["id"]
+        target = recommendation["target_portal"]
+        status = recommendation["status"]
+        del self._by_id[rec_id]
+        del self._by_target[target][rec_id]
+        del self._by_target_status[(target, status)][rec_id]
+        self._status_counts[status] -= 1
+
+    def _move(self, recommendation, to_status, fields):
+        """Replace a recommendation with a copy in a new status. Caller holds the lock."""
+        rec_id = recommendation["id"]
+        target = recommendation["target_portal"]
+        from_status = recommendation["status"]
+        updated = {**recommendation, **fields, "status": to_status}
+        self._by_id[rec_id] = updated
+        del self._by_target_status[(target, from_status)][rec_id]
+        self._by_target_status.setdefault((target, to_status), {})[rec_id] = None
+        self._status_counts[from_status] -= 1
+        self._status_counts[to_status] = self._status_counts.get(to_status, 0) + 1
+        return updated
+
+    def for_target(self, target_portal, status=None, offset=0, limit=None):
+        """
+        Get recommendations targeting a portal, oldest first.
+
+        Args:
+            target_portal (str): Target portal name
+            status (str, optional): Only return recommendations in this status
+            offset (int): Number of matching recommendations to skip
+            limit (int, optional): Maximum number of recommendations to return
+
+        Returns:
+            list: Matching recommendations
+        """
+        with self._lock:
+            ids = self._ids_for(target_portal, status)
+            stop = None if limit is None else offset + limit
+            return [self._by_id[rec_id] for rec_id in itertools.islice(ids, offset, stop)]
+
+    def count_for_target(self, target_portal, status=None):
+        """Count recommendations targeting a portal."""
+        return len(self._ids_for(target_portal, status))
+
+    def _ids_for(self, target_portal, status):
+        """Get the id index for a target portal and optional status."""
+        if status is None:
+            return self._by_target.get(target_portal, {})
+        return self._by_target_status.get((target_portal, status), {})
+
+    def count_by_status(self):
+        """Get the number of recommendations in each status."""
+        with self._lock:
+            return dict(self._status_counts)
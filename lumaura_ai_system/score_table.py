@@ -0,0 +1,249 @@
+"""
+Score Table
+
+This module provides a columnar table of portal evolution scores. Scores and stage indexes
+of all known portals, instantiated or not, live in two contiguous arrays, so bulk boosts and time-decay sweeps are
+single vectorised operations, and stage classification is one threshold search over the whole
+table. Bulk operations report each moved portal with its old and new stage, so callers emit
+stage-change events only for the portals that crossed a boundary.
+
+NumPy is used when installed; otherwise the table falls back to stdlib arrays and loops.
+"""
+
+import bisect
+import logging
+import threading
+from array import array
+
+from lumaura_ai_system.portals.base import STAGE_THRESHOLDS
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    logger.warning("NumPy not installed. Bulk score operations will use Python loops.")
+
+MIN_SCORE = 0
+MAX_SCORE = 100
+
+# Stages in ascending order with their lower bounds
+STAGES = [stage for _, stage in sorted(STAGE_THRESHOLDS, key=lambda item: item[0])]
+STAGE_BOUNDS = [threshold for threshold, _ in sorted(STAGE_THRESHOLDS, key=lambda item: item[0])]
+
+
+def _stage_index(score):
+    """Get the index into STAGES of the stage reached at a score."""
+    return max(0, bisect.bisect_right(STAGE_BOUNDS, score) - 1)
+
+
+class ScoreTable:
+    """Contiguous score and stage arrays for every attached portal."""
+
+    def __init__(self, capacity=64):
+        """
+        Initialize an empty table.
+
+        Args:
+            capacity (int): Initial number of slots; the arrays double when full
+        """
+        self._lock = threading.Lock()
+        self._names = []
+        self._slots = {}
+        self._size = 0
+        if NUMPY_AVAILABLE:
+            self._scores = np.zeros(capacity, dtype=np.float64)
+            self._stages = np.zeros(capacity, dtype=np.int8)
+            self._bounds = np.array(STAGE_BOUNDS, dtype=np.float64)
+        else:
+            self._scores = array("d", [0.0] * capacity)
+            self._stages = array("b", [0] * capacity)
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, name):
+        return name in self._slots
+
+    def attach(self, name, score=0):
+        """
+        Add a portal to the table, or return its existing slot.
+
+        Returns:
+            int: The portal's slot
+        """
+        with self._lock:
+            slot = self._slots.get(name)
+            if slot is not None:
+                return slot
+            if self._size == len(self._scores):
+                self._grow()
+            slot = self._size
+            self._size += 1
+            self._names.append(name)
+            self._slots[name] = slot
+            self._store(slot, score)
+            return slot
+
+    def load(self, scores):
+        """
+        Attach several portals, or overwrite their scores if already attached.
+
+        Portals do not need to be instantiated to be in the table, so bulk operations
+        also cover portals known only from persisted state.
+
+        Args:
+            scores (dict): Portal name -> score
+        """
+        with self._lock:
+            for name, score in scores.items():
+                slot = self._slots.get(name)
+                if slot is None:
+                    if self._size == len(self._scores):
+                        self._grow()
+                    slot = self._size
+                    self._size += 1
+                    self._names.append(name)
+                    self._slots[name] = slot
+                self._store(slot, score)
+
+    def _grow(self):
+        """Double the capacity of the arrays. Caller holds the lock."""
+        if NUMPY_AVAILABLE:
+            self._scores = np.concatenate([self._scores, np.zeros(len(self._scores), dtype=np.float64)])
+            self._stages = np.concatenate([self._stages, np.zeros(len(self._stages), dtype=np.int8)])
+        else:
+            self._scores.extend([0.0] * len(self._scores))
+            self._stages.extend([0] * len(self._stages))
+
+    def _store(self, slot, score):
+        """Write a clamped score and its stage. Caller holds the lock."""
+        score = max(MIN_SCORE, min(MAX_SCORE, score))
+        self._scores[slot] = score
+        self._stages[slot] = _stage_index(score)
+        return score
+
+    def get(self, slot):
+        """Get the score in a slot."""
+        return float(self._scores[slot])
+
+    def set(self, slot, score):
+        """Set the score in a slot, clamped to the valid range."""
+        with self._lock:
+            return self._store(slot, score)
+
+    def add(self, slot, delta):
+        """Add a delta to the score in a slot, clamped to the valid range. Returns the new score."""
+        with self._lock:
+            return self._store(slot, float(self._scores[slot]) + delta)
+
+    def boost(self, deltas):
+        """
+        Add deltas to several portals at once.
+
+        Args:
+            deltas (dict): Portal name -> delta; names not in the table are ignored
+
+        Returns:
+            list: (name, old_score, new_score, old_stage, new_stage) for every portal whose score changed
+        """
+        slots = [(self._slots[name], delta) for name, delta in deltas.items() if name in self._slots]
+        if not slots:
+            return []
+        with self._lock:
+            if NUMPY_AVAILABLE:
+                index = np.fromiter((slot for slot, _ in slots), dtype=np.intp, count=len(slots))
+                amounts = np.fromiter((delta for _, delta in slots), dtype=np.float64, count=len(slots))
+                old_scores = self._scores[index]
+                old_stages = self._stages[index]
+                self._scores[index] = np.clip(old_scores + amounts, MIN_SCORE, MAX_SCORE)
+                self._stages[index] = self._classify(self._scores[index])
+                return self._changes(index, old_scores, old_stages)
+            changes = []
+            for slot, delta in slots:
+                old_score, old_stage = self._scores[slot], self._stages[slot]
+                new_score = self._store(slot, old_score + delta)
+                if new_score != old_score:
+                    changes.append((self._names[slot], old_score, new_score,
+                                    STAGES[old_stage], STAGES[self._stages[slot]]))
+            return changes
+
+    def decay(self, factor):
+        """
+        Multiply every score by a decay factor in one sweep.
+
+        Args:
+            factor (float): Multiplier between 0 and 1
+
+        Returns:
+            list: (name, old_score, new_score, old_stage, new_stage) for every portal whose score changed
+        """
+        with self._lock:
+            size = self._size
+            if NUMPY_AVAILABLE:
+                scores = self._scores[:size]
+                old_scores = scores.copy()
+                old_stages = self._stages[:size].copy()
+                scores *= factor
+                self._stages[:size] = self._classify(scores)
+                return self._changes(np.arange(size), old_scores, old_stages)
+            changes = []
+            for slot in range(size):
+                old_score, old_stage = self._scores[slot], self._stages[slot]
+                new_score = self._store(slot, old_score * factor)
+                if new_score != old_score:
+                    changes.append((self._names[slot], old_score, new_score,
+                                    STAGES[old_stage], STAGES[self._stages[slot]]))
+            return changes
+
+    def _classify(self, scores):
+        """Get the stage index of each score with one threshold search."""
+        return (np.searchsorted(self._bounds, scores, side="right") - 1).clip(0).astype(np.int8)
+
+    def _changes(self, index, old_scores, old_stages):
+        """Build the change list for the slots whose score moved. Caller holds the lock."""
+        new_scores = self._scores[index]
+        moved = np.nonzero(new_scores != old_scores)[0]
+        names = self._names
+        # Convert whole columns at once; per-element NumPy indexing would dominate the sweep
+        return list(zip(
+            [names[slot] for slot in index[moved].tolist()],
+            old_scores[moved].tolist(),
+            new_scores[moved].tolist(),
+            [STAGES[stage] for stage in old_stages[moved].tolist()],
+            [STAGES[stage] for stage in self._stages[index][moved].tolist()]
+        ))
+
+    def entries(self):
+        """
+        Get the score and stage of every portal in the table.
+
+        Returns:
+            dict: Portal name -> {"evolution_score", "evolution_stage"}
+        """
+        with self._lock:
+            size = self._size
+            names = list(self._names)
+            if NUMPY_AVAILABLE:
+                scores = self._scores[:size].tolist()
+                stages = self._stages[:size].tolist()
+            else:
+                scores = list(self._scores[:size])
+                stages = list(self._stages[:size])
+        return {
+            name: {"evolution_score": score, "evolution_stage": STAGES[stage].value}
+            for name, score, stage in zip(names, scores, stages)
+        }
+
+    def stage_counts(self):
+        """Get the number of portals in each stage."""
+        with self._lock:
+            if NUMPY_AVAILABLE:
+                counts = np.bincount(self._stages[:self._size], minlength=len(STAGES)).tolist()
+            else:
+                counts = [0] * len(STAGES)
+                for slot in range(self._size):
+                    counts[self._stages[slot]] += 1
+        return {stage.value: count for stage, count in zip(STAGES, counts)}
@@ -0,0 +1,224 @@
+"""
+Portal Evolution Simulation
+
+This module provides a deterministic benchmark harness for the Portal Evolution System.
+It drives a fresh system with N portals and M activities as fast as possible: every random
+choice comes from a seeded random source, every timestamp from a simulated clock that
+advances a fixed step per activity, and nothing sleeps, so two runs with the same seed
+apply the same workload and end in the same portal state. Timings, throughput and
+peak RSS are written to a JSON file that can be diffed between releases.
+
+Usage:
+    python -m lumaura_ai_system.simulation --portals 50 --activities 100000 --seed 1 \\
+        --output data/benchmarks/simulation.json
+"""
+
+import argparse
+import json
+import logging
+import math
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from lumaura_ai_system.portal_activity_generator import RECOMMENDATION_TYPES, _generate_activity
+from lumaura_ai_system.portal_evolution_system import PortalEvolutionSystem
+from lumaura_ai_system.portals.base import load_definitions
+
+logger = logging.getLogger(__name__)
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:
+    RESOURCE_AVAILABLE = False
+
+# Portal definition the synthetic portals copy their capabilities from
+TEMPLATE_PORTAL = "xuveteam"
+# Simulated time starts here (2024-01-01T00:00:00Z) and advances this many seconds per activity
+SIMULATION_EPOCH = 1704067200.0
+SIMULATION_TICK = 1.0
+
+
+class SimulatedClock:
+    """Clock returning epoch seconds that only moves when advanced."""
+
+    def __init__(self, start=SIMULATION_EPOCH):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        """Move the clock forward."""
+        self.now += seconds
+
+
+def percentile(sorted_values, fraction):
+    """Get a percentile of an already sorted list (nearest-rank)."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def latency_summary(samples):
+    """Summarise latency samples in seconds as milliseconds."""
+    ordered = sorted(samples)
+
+    def to_ms(value):
+        return None if value is None else round(value * 1000, 4)
+
+    return {
+        "count": len(ordered),
+        "mean_ms": to_ms(sum(ordered) / len(ordered)) if ordered else None,
+        "p50_ms": to_ms(percentile(ordered, 0.50)),
+        "p99_ms": to_ms(percentile(ordered, 0.99)),
+        "max_ms": to_ms(ordered[-1]) if ordered else None
+    }
+
+
+def peak_rss_kb():
+    """Get the peak resident set size of this process in KiB, or None if unavailable."""
+    if not RESOURCE_AVAILABLE:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux kilobytes
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def build_system(portal_count, seed, data_dir, clock=None):
+    """
+    Create an isolated system with portal_count portals.
+
+    The bundled portals are used first; synthetic portals copying the capabilities of
+    TEMPLATE_PORTAL make up the rest. State is logged under data_dir. The caller must
+    shut the system down, which stops its background threads.
+    """
+    system = PortalEvolutionSystem(rng=random.Random(seed), clock=clock, data_dir=data_dir)
+    bundled = load_definitions()
+    template = bundled[TEMPLATE_PORTAL]
+    system.portals.register_many(
+        {**template, "name": f"sim{index:05d}", "display_name": f"Sim {index}"}
+        for index in range(max(0, portal_count - len(bundled)))
+    )
+    system.initialize(start_generation=False)
+    names = sorted(system.portals)[:portal_count]
+    system.portals.load_all()
+    return system, names
+
+
+def run_simulation(portals=3, activities=10000, seed=0, status_every=100, recommendation_every=50):
+    """
+    Run the benchmark.
+
+    Args:
+        portals (int): Number of portals
+        activities (int): Number of activities to record
+        seed (int): Seed of every random choice
+        status_every (int): Time get_all_portals_status after this many activities
+        recommendation_every (int): Create and implement a recommendation after this many activities
+
+    Returns:
+        dict: Benchmark report
+    """
+    rng = random.Random(seed)
+    clock = SimulatedClock()
+    started_at = datetime.now().isoformat()
+    with tempfile.TemporaryDirectory(prefix="portal-simulation-") as data_dir:
+        system, names = build_system(portals, seed, data_dir, clock)
+        try:
+            record_latencies = []
+            status_latencies = []
+            implement_latencies = []
+            started = time.perf_counter()
+
+            for index in range(1, activities + 1):
+                clock.advance(SIMULATION_TICK)
+                portal_name = names[rng.randrange(len(names))]
+                description = _generate_activity(portal_name, rng)
+                begin = time.perf_counter()
+                system.record_portal_activity(portal_name, description)
+                record_latencies.append(time.perf_counter() - begin)
+
+                if status_every and index % status_every == 0:
+                    begin = time.perf_counter()
+                    system.get_all_portals_status()
+                    status_latencies.append(time.perf_counter() - begin)
+
+                if recommendation_every and index % recommendation_every == 0 and len(names) > 1:
+                    source, target = rng.sample(names, 2)
+                    rec_type = rng.choice(RECOMMENDATION_TYPES)
+                    rec = system.create_recommendation(source, target, rec_type,
+                                                       f"Consider {rec_type} for portal {target}")
+                    begin = time.perf_counter()
+                    system.implement_recommendation(rec["id"])
+                    implement_latencies.append(time.perf_counter() - begin)
+
+            elapsed = time.perf_counter() - started
+            statuses = system.get_all_portals_status()
+        finally:
+            system.shutdown()
+
+    stages = {}
+    for status in statuses.values():
+        stages[status["evolution_stage"]] = stages.get(status["evolution_stage"], 0) + 1
+    return {
+        "config": {
+            "portals": len(names),
+            "activities": activities,
+            "seed": seed,
+            "status_every": status_every,
+            "recommendation_every": recommendation_every
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform()
+        },
+        "started_at": started_at,
+        "elapsed_s": round(elapsed, 4),
+        "records_per_sec": round(activities / elapsed, 1) if elapsed else None,
+        "record_portal_activity": latency_summary(record_latencies),
+        "get_all_portals_status": latency_summary(status_latencies),
+        "implement_recommendation": latency_summary(implement_latencies),
+        "peak_rss_kb": peak_rss_kb(),
+        # Depends only on the seed and workload, so it must match between runs
+        "final_state": {
+            "total_score": round(sum(status["evolution_score"] for status in statuses.values()), 6),
+            "stages": dict(sorted(stages.items()))
+        }
+    }
+
+
+def main(argv=None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Deterministic Portal Evolution System benchmark")
+    parser.add_argument("--portals", type=int, default=3, help="number of portals")
+    parser.add_argument("--activities", type=int, default=10000, help="number of activities to record")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--status-every", type=int, default=100, help="activities between status reads")
+    parser.add_argument("--recommendation-every", type=int, default=50,
+                        help="activities between implemented recommendations")
+    parser.add_argument("--output", default="data/benchmarks/simulation.json", help="JSON report path")
+    args = parser.parse_args(argv)
+
+    # Importing the package configures INFO logging; per-activity logs would dominate the timings
+    logging.getLogger().setLevel(logging.WARNING)
+    report = run_simulation(args.portals, args.activities, args.seed, args.status_every, args.recommendation_every)
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"{report['records_per_sec']} records/sec, record p99 {report['record_portal_activity']['p99_ms']} ms, "
+          f"status p99 {report['get_all_portals_status']['p99_ms']} ms -> {output}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
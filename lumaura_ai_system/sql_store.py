@@ -0,0 +1,602 @@
+"""
+SQL Store
+
+This module provides an optional SQLite persistence backend for the Portal Evolution System.
+Portal state, activities and recommendations live in indexed tables of a database opened in
+WAL mode. Writes are buffered and committed in batches (when a batch fills up, after a flush
+interval, or on an explicit flush), and history is only read back when queried, so a restart
+does not reload every activity and recommendation into memory.
+
+The store implements the same load/append_many/flush/compact interface as EvolutionLog, so
+it can replace the JSON evolution log as the store of record for portal scores.
+
+In shared mode several processes use the same database: score changes are written as deltas
+applied inside the database, every portal write bumps a revision so processes can pick up
+each other's changes, and recommendation status changes are claimed with conditional updates.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from lumaura_ai_system.portals.base import STAGE_THRESHOLDS
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS portals (
+    name TEXT PRIMARY KEY,
+    evolution_score REAL NOT NULL,
+    evolution_stage TEXT,
+    updated_at REAL NOT NULL,
+    revision INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_portals_revision ON portals (revision);
+CREATE TABLE IF NOT EXISTS activities (
+    id INTEGER PRIMARY KEY,
+    portal TEXT NOT NULL,
+    timestamp_ms INTEGER NOT NULL,
+    description TEXT NOT NULL,
+    related_portal TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_activities_portal_time ON activities (portal, timestamp_ms);
+CREATE INDEX IF NOT EXISTS idx_activities_related ON activities (portal, related_portal)
+    WHERE related_portal IS NOT NULL;
+CREATE TABLE IF NOT EXISTS recommendations (
+    id TEXT PRIMARY KEY,
+    number INTEGER,
+    target_portal TEXT NOT NULL,
+    status TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_recommendations_target_status ON recommendations (target_portal, status);
+CREATE INDEX IF NOT EXISTS idx_recommendations_status ON recommendations (status);
+CREATE TABLE IF NOT EXISTS metric_buckets (
+    portal TEXT NOT NULL,
+    resolution TEXT NOT NULL,
+    start INTEGER NOT NULL,
+    activities INTEGER NOT NULL,
+    score_open REAL NOT NULL,
+    score_close REAL NOT NULL,
+    score_min REAL NOT NULL,
+    score_max REAL NOT NULL,
+    stage_transitions INTEGER NOT NULL,
+    PRIMARY KEY (portal, resolution, start)
+);
+"""
+
+
+def sqlite_path(database_url):
+    """
+    Get the SQLite database path from an SQLAlchemy-style URL.
+
+    "sqlite:///data/db.sqlite" is relative to the working directory, "sqlite:////abs/db.sqlite"
+    is absolute and "sqlite://" or "sqlite:///:memory:" is an in-memory database.
+
+    Raises:
+        ValueError: If the URL is not an SQLite URL
+    """
+    if not database_url.startswith("sqlite://"):
+        raise ValueError(f"Only sqlite:// database URLs are supported: {database_url}")
+    path = database_url[len("sqlite://"):]
+    if path in ("", "/", "/:memory:"):
+        return ":memory:"
+    return path[1:] if path.startswith("/") else path
+
+
+class SQLStore:
+    """Batched SQLite persistence for portal state, activities and recommendations."""
+
+    def __init__(self, path, batch_size=500, flush_interval=1.0, shared=False, busy_timeout=30.0,
+                 clock=time.time):
+        """
+        Open (and create if needed) the database.
+
+        Args:
+            path (str): Database file, or ":memory:"
+            batch_size (int): Buffered writes that force a commit
+            flush_interval (float): Seconds after which buffered writes are committed
+            shared (bool): Other processes write to the same database
+            busy_timeout (float): Seconds to wait for another process's write lock
+            clock (callable): Returns the current time in epoch seconds, stamped on portal rows
+        """
+        self.path = str(path)
+        self.clock = clock
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.shared = shared
+        # History lives in the tables, so there is no snapshot file to restore it from
+        self.snapshot = None
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=busy_timeout, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+        self._lock = threading.Lock()
+        # Buffered writes; portal and recommendation rows are coalesced by key
+        self._portal_rows = {}
+        self._activity_rows = []
+        self._recommendation_rows = {}
+        self._last_commit = time.monotonic()
+        self._stop = threading.Event()
+        self._flusher = None
+
+    @classmethod
+    def from_url(cls, database_url, **kwargs):
+        """Open the store for an SQLAlchemy-style sqlite:// URL."""
+        return cls(sqlite_path(database_url), **kwargs)
+
+    def start(self):
+        """Start a background thread committing buffered writes every flush_interval."""
+        if self._flusher is not None:
+            return
+        self._stop.clear()
+        self._flusher = threading.Thread(target=self._run_flusher, daemon=True, name="sql-store-flusher")
+        self._flusher.start()
+
+    def _run_flusher(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error committing buffered writes: {e}")
+
+    def _pending(self):
+        """Number of buffered writes. Caller holds the lock."""
+        return len(self._portal_rows) + len(self._activity_rows) + len(self._recommendation_rows)
+
+    def _maybe_flush(self):
+        """Commit if the batch is full or the flush interval has passed. Caller holds the lock."""
+        if (self._pending() >= self.batch_size
+                or time.monotonic() - self._last_commit >= self.flush_interval):
+            self._flush()
+
+    def _flush(self):
+        """Commit all buffered writes in one transaction. Caller holds the lock."""
+        if not self._pending():
+            self._last_commit = time.monotonic()
+            return
+        # Take the write lock up front so revisions are allocated in commit order across processes
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self._portal_rows:
+                revision = self._conn.execute("SELECT COALESCE(MAX(revision), 0) + 1 FROM portals").fetchone()[0]
+                if self.shared:
+                    # Apply deltas so writers in other processes do not overwrite each other
+                    rows = [(name, score, stage, updated_at, revision, delta)
+                            for name, score, stage, updated_at, delta in self._portal_rows.values()]
+                    update = "evolution_score = MAX(0, MIN(100, portals.evolution_score + ?))"
+                else:
+                    rows = [(name, score, stage, updated_at, revision)
+                            for name, score, stage, updated_at, delta in self._portal_rows.values()]
+                    update = "evolution_score = excluded.evolution_score"
+                self._conn.executemany(
+                    "INSERT INTO portals (name, evolution_score, evolution_stage, updated_at, revision) "
+                    f"VALUES (?, ?, ?, ?, ?) ON CONFLICT(name) DO UPDATE SET {update}, "
+                    "evolution_stage = excluded.evolution_stage, updated_at = excluded.updated_at, "
+                    "revision = excluded.revision",
+                    rows
+                )
+            if self._activity_rows:
+                self._conn.executemany(
+                    "INSERT INTO activities (portal, timestamp_ms, description, related_portal) VALUES (?, ?, ?, ?)",
+                    self._activity_rows
+                )
+            if self._recommendation_rows:
+                self._conn.executemany(
+                    "INSERT INTO recommendations (id, number, target_portal, status, data) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET status = excluded.status, data = excluded.data",
+                    list(self._recommendation_rows.values())
+                )
+            self._conn.commit()
+        except Exception:
+            self._conn.rollback()
+            raise
+        self._portal_rows = {}
+        self._activity_rows = []
+        self._recommendation_rows = {}
+        self._last_commit = time.monotonic()
+
+    def flush(self):
+        """Commit all buffered writes."""
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        """Stop the background flusher, commit buffered writes and close the database."""
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout=self.flush_interval + 1)
+            self._flusher = None
+        with self._lock:
+            self._flush()
+            self._conn.close()
+
+    # Evolution log interface
+
+    def load(self):
+        """
+        Load the persisted state of every portal.
+
+        Returns:
+            dict: Portal name -> {"evolution_score", "evolution_stage"}
+        """
+        with self._lock:
+            self._flush()
+            rows = self._conn.execute("SELECT name, evolution_score, evolution_stage FROM portals").fetchall()
+        logger.info(f"Loaded state of {len(rows)} portals from {self.path}")
+        return {
+            row["name"]: {"evolution_score": row["evolution_score"], "evolution_stage": row["evolution_stage"]}
+            for row in rows
+        }
+
+    def append_many(self, entries, flush=True):
+        """
+        Buffer several (portal_name, delta, score, stage) changes.
+
+        Only the latest state of each portal is written (in shared mode, the sum of its
+        deltas). With flush=True the batch is committed if it is full or the flush interval
+        has passed.
+        """
+        now = self.clock()
+        with self._lock:
+            for portal_name, delta, score, stage in entries:
+                pending = self._portal_rows.get(portal_name)
+                total = delta + (pending[4] if pending else 0)
+                self._portal_rows[portal_name] = (portal_name, score, stage, now, total)
+            if flush:
+                self._maybe_flush()
+
+    def append(self, portal_name, delta, score, stage):
+        """Buffer one score/stage change for a portal."""
+        self.append_many([(portal_name, delta, score, stage)])
+
+    def append_decay(self, factor):
+        """Multiply the score of every portal by a decay factor in one statement and commit."""
+        stage = "CASE " + " ".join(
+            f"WHEN evolution_score * :factor >= {threshold} THEN '{stage.value}'"
+            for threshold, stage in STAGE_THRESHOLDS
+        ) + " END"
+        with self._lock:
+            self._flush()
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                revision = self._conn.execute("SELECT COALESCE(MAX(revision), 0) + 1 FROM portals").fetchone()[0]
+                self._conn.execute(
+                    f"UPDATE portals SET evolution_stage = {stage}, evolution_score = evolution_score * :factor, "
+                    "updated_at = :now, revision = :revision",
+                    {"factor": factor, "now": self.clock(), "revision": revision}
+                )
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+    
+    def portals_since(self, revision=0):
+        """
+        Get the state of the portals written after a revision.
+
+        Returns:
+            tuple: (latest revision, portal name -> {"evolution_score", "evolution_stage"})
+        """
+        with self._lock:
+            self._flush()
+            rows = self._conn.execute(
+                "SELECT name, evolution_score, evolution_stage, revision FROM portals WHERE revision > ?", (revision,)
+            ).fetchall()
+        latest = max((row["revision"] for row in rows), default=revision)
+        return latest, {
+            row["name"]: {"evolution_score": row["evolution_score"], "evolution_stage": row["evolution_stage"]}
+            for row in rows
+        }
+
+    def data_version(self):
+        """Get a counter that changes whenever another connection commits to the database."""
+        with self._lock:
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def needs_compaction(self):
+        """The portals table always holds one row per portal, so there is nothing to compact."""
+        return False
+
+    def compact(self, state_provider, sections=None):
+        """
+        Write the state of every portal returned by state_provider and commit.
+
+        Sections are ignored; recommendations are already stored in their table.
+        """
+        self.append_many(
+            (name, 0, state["evolution_score"], state["evolution_stage"])
+            for name, state in state_provider().items()
+        )
+        self.flush()
+        return True
+
+    # Metrics
+
+    def save_metrics(self, increments):
+        """
+        Merge rolled-up metric increments saved by EvolutionMetrics into the stored buckets.
+
+        Several processes add to the same buckets, so activity and stage transition counts
+        are summed, min and max widened, and the close taken from the latest save; the open
+        stays that of the first save.
+
+        Args:
+            increments (dict): Resolution -> portal name -> list of bucket rows
+        """
+        rows = [
+            (portal_name, resolution, *bucket)
+            for resolution, by_portal in increments.items()
+            for portal_name, buckets in by_portal.items()
+            for bucket in buckets
+        ]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO metric_buckets (portal, resolution, start, activities, score_open, score_close, "
+                "score_min, score_max, stage_transitions) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (portal, resolution, start) DO UPDATE SET "
+                "activities = activities + excluded.activities, "
+                "score_close = excluded.score_close, "
+                "score_min = MIN(score_min, excluded.score_min), "
+                "score_max = MAX(score_max, excluded.score_max), "
+                "stage_transitions = stage_transitions + excluded.stage_transitions",
+                rows
+            )
+            self._conn.commit()
+
+    def load_metrics(self):
+        """
+        Get the stored metric buckets in the layout of EvolutionMetrics.export().
+
+        Returns:
+            dict: Resolution -> portal name -> list of bucket rows, oldest first
+        """
+        exported = {}
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT portal, resolution, start, activities, score_open, score_close, score_min, score_max, "
+                "stage_transitions FROM metric_buckets ORDER BY resolution, portal, start"
+            ).fetchall()
+        for row in rows:
+            exported.setdefault(row["resolution"], {}).setdefault(row["portal"], []).append(list(row)[2:])
+        return exported
+
+    # Activities
+
+    def add_activity(self, portal_name, timestamp_ms, description, related_portal=None):
+        """Buffer an activity."""
+        with self._lock:
+            self._activity_rows.append((portal_name, timestamp_ms, description, related_portal))
+            self._maybe_flush()
+
+    def activities(self, portal_name, start_ms=None, end_ms=None, limit=None):
+        """
+        Get the activities of a portal with start_ms <= timestamp < end_ms.
+
+        Returns:
+            list: {"description", "timestamp"} dicts in chronological order; with a limit,
+                the most recent matching activities
+        """
+        clauses, params = ["portal = ?"], [portal_name]
+        if start_ms is not None:
+            clauses.append("timestamp_ms >= ?")
+            params.append(start_ms)
+        if end_ms is not None:
+            clauses.append("timestamp_ms < ?")
+            params.append(end_ms)
+        sql = (f"SELECT timestamp_ms, description FROM activities WHERE {' AND '.join(clauses)} "
+               "ORDER BY timestamp_ms DESC, id DESC")
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            self._flush()
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            {"description": row["description"],
+             "timestamp": datetime.fromtimestamp(row["timestamp_ms"] / 1000).isoformat()}
+            for row in reversed(rows)
+        ]
+
+    def recent_activities(self, portal_name, limit):
+        """
+        Get the most recent activities of a portal for restoring its in-memory ring.
+
+        Returns:
+            list: (timestamp_ms, description) tuples, oldest first
+        """
+        with self._lock:
+            self._flush()
+            rows = self._conn.execute(
+                "SELECT timestamp_ms, description FROM activities WHERE portal = ? "
+                "ORDER BY timestamp_ms DESC, id DESC LIMIT ?", (portal_name, limit)
+            ).fetchall()
+        return [(row["timestamp_ms"], row["description"]) for row in reversed(rows)]
+
+    def last_activity_id(self):
+        """Get the id of the newest stored activity, or 0 if there are none."""
+        with self._lock:
+            self._flush()
+            return self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM activities").fetchone()[0]
+
+    def activity_portals_since(self, after_id):
+        """
+        Get the portals with activities stored after an activity id.
+
+        Returns:
+            tuple: (newest activity id, set of portal names)
+        """
+        with self._lock:
+            self._flush()
+            rows = self._conn.execute(
+                "SELECT portal, MAX(id) FROM activities WHERE id > ? GROUP BY portal", (after_id,)
+            ).fetchall()
+        return max((row[1] for row in rows), default=after_id), {row[0] for row in rows}
+
+    def iter_activities(self, since_ms=None, until_id=None, newest=None, after_id=0, batch_size=10000):
+        """
+        Stream stored activities, oldest first, for rebuilding in-memory indexes.
+
+        Args:
+            since_ms (int, optional): Only activities at or after this time
+            until_id (int, optional): Only activities up to this id, see last_activity_id()
+            newest (int, optional): Only the newest this many activities
+            after_id (int): Only activities after this id
+
+        Yields:
+            tuple: (portal, timestamp_ms, description)
+        """
+        with self._lock:
+            self._flush()
+            if until_id is None:
+                until_id = self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM activities").fetchone()[0]
+            last_id = after_id
+            if newest is not None:
+                # Ids only grow, so the window starts below the newest-th id counted back from until_id
+                row = self._conn.execute(
+                    "SELECT id FROM activities WHERE id <= ? ORDER BY id DESC LIMIT 1 OFFSET ?",
+                    (until_id, newest)
+                ).fetchone()
+                last_id = max(last_id, row[0]) if row is not None else last_id
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT id, portal, timestamp_ms, description FROM activities "
+                    "WHERE id > ? AND id <= ? AND timestamp_ms >= ? ORDER BY id LIMIT ?",
+                    (last_id, until_id, since_ms if since_ms is not None else -2 ** 63, batch_size)
+                ).fetchall()
+            for row in rows:
+                yield row["portal"], row["timestamp_ms"], row["description"]
+            if len(rows) < batch_size:
+                return
+            last_id = rows[-1]["id"]
+
+    def interaction_counts(self):
+        """
+        Count the stored interactions between portals, aggregated in the database.
+
+        Returns:
+            list: (source, target, kind, count) tuples, kinds as in the interaction graph
+        """
+        with self._lock:
+            self._flush()
+            rows = self._conn.execute(
+                "SELECT json_extract(data, '$.source_portal'), target_portal, 'recommendation', COUNT(*) "
+                "FROM recommendations GROUP BY 1, 2 "
+                "UNION ALL "
+                "SELECT json_extract(data, '$.source_portal'), target_portal, 'implemented_recommendation', COUNT(*) "
+                "FROM recommendations WHERE status = 'implemented' GROUP BY 1, 2 "
+                "UNION ALL "
+                "SELECT portal, related_portal, 'activity', COUNT(*) "
+                "FROM activities WHERE related_portal IS NOT NULL GROUP BY 1, 2"
+            ).fetchall()
+        return [tuple(row) for row in rows]
+
+    def activity_count(self, portal_name):
+        """Count the persisted activities of a portal."""
+        with self._lock:
+            self._flush()
+            return self._conn.execute("SELECT COUNT(*) FROM activities WHERE portal = ?", (portal_name,)).fetchone()[0]
+
+    # Recommendations
+
+    def save_recommendation(self, recommendation):
+        """Buffer an insert or update of a recommendation."""
+        rec_id = recommendation["id"]
+        suffix = rec_id.rsplit("-", 1)[-1]
+        row = (rec_id, int(suffix) if suffix.isdigit() else None, recommendation["target_portal"],
+               recommendation["status"], json.dumps(recommendation))
+        with self._lock:
+            self._recommendation_rows[rec_id] = row
+            self._maybe_flush()
+
+    def recommendations(self, target_portal=None, status=None, offset=0, limit=None):
+        """Get recommendations, optionally filtered by target portal and status, oldest first."""
+        clauses, params = [], []
+        if target_portal is not None:
+            clauses.append("target_portal = ?")
+            params.append(target_portal)
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = f"SELECT data FROM recommendations{where} ORDER BY rowid LIMIT ? OFFSET ?"
+        params += [-1 if limit is None else limit, offset]
+        with self._lock:
+            self._flush()
+            rows = self._conn.execute(sql, params).fetchall()
+        return [json.loads(row["data"]) for row in rows]
+
+    def count_recommendations(self, target_portal, status=None):
+        """Count recommendations targeting a portal."""
+        sql, params = "SELECT COUNT(*) FROM recommendations WHERE target_portal = ?", [target_portal]
+        if status is not None:
+            sql += " AND status = ?"
+            params.append(status)
+        with self._lock:
+            self._flush()
+            return self._conn.execute(sql, params).fetchone()[0]
+
+    def get_recommendations(self, recommendation_ids):
+        """Get recommendations by id; ids that are not stored are left out."""
+        if not recommendation_ids:
+            return {}
+        placeholders = ",".join("?" * len(recommendation_ids))
+        with self._lock:
+            self._flush()
+            rows = self._conn.execute(
+                f"SELECT data FROM recommendations WHERE id IN ({placeholders})", list(recommendation_ids)
+            ).fetchall()
+        return {rec["id"]: rec for rec in (json.loads(row["data"]) for row in rows)}
+
+    def claim_recommendations(self, recommendations, from_status, atomic=True):
+        """
+        Write status changes only for recommendations still in from_status in the database.
+
+        The check and the writes run in one transaction, so two processes can never both
+        move the same recommendation out of from_status.
+
+        Args:
+            recommendations (list): Updated recommendation dicts
+            from_status (str): Status each recommendation must still have in the database
+            atomic (bool): If any recommendation was claimed elsewhere, write none
+
+        Returns:
+            set: Ids of the recommendations written
+        """
+        claimed = set()
+        with self._lock:
+            self._flush()
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for rec in recommendations:
+                    cursor = self._conn.execute(
+                        "UPDATE recommendations SET status = ?, data = ? WHERE id = ? AND status = ?",
+                        (rec["status"], json.dumps(rec), rec["id"], from_status)
+                    )
+                    if cursor.rowcount:
+                        claimed.add(rec["id"])
+                if atomic and len(claimed) < len(recommendations):
+                    self._conn.rollback()
+                    return set()
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        return claimed
+
+    def max_recommendation_number(self):
+        """Get the highest numeric recommendation id suffix, or 0."""
+        with self._lock:
+            self._flush()
+            return self._conn.execute("SELECT MAX(number) FROM recommendations").fetchone()[0] or 0
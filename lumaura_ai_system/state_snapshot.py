@@ -0,0 +1,300 @@
+"""
+State Snapshot
+
+This module provides the binary snapshot format of the Portal Evolution System state.
+A snapshot holds, per portal, the evolution score plus a history record (creation time,
+last activity and the in-memory activity ring), and named sections for system-wide state
+such as recommendations and the interaction graph.
+
+The file is opened with mmap and only its header and index are read up front, so opening
+costs O(portals) however much history it holds. Portal records are decoded when a portal
+is first loaded, and records of portals that were never loaded are copied verbatim into
+the next snapshot.
+
+Layout (little-endian):
+    header   magic, format version, creation time, evolution log sequence, portal count,
+             index offset/length/CRC-32, header CRC-32
+    records  portal history records and section blobs, each with a CRC-32 in the index
+    index    one entry per record: kind, score, offset, length, CRC-32, name
+"""
+
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from array import array
+from collections import namedtuple
+from pathlib import Path
+
+from lumaura_ai_system.activity_store import _iso, to_epoch_ms
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"LXSS"
+FORMAT_VERSION = 1
+
+# magic, version, flags, created_ms, log_sequence, portal_count, index_offset, index_length, index_crc
+HEADER = struct.Struct("<4sHHqQIQQI")
+HEADER_CRC = struct.Struct("<I")
+# kind, name length, score, offset, length, crc
+INDEX_ENTRY = struct.Struct("<BHdQII")
+# last activity ms (-1 if none), evicted count, activity count, description count,
+# last activity description (-1 if none), created_at length
+PORTAL_RECORD = struct.Struct("<qqIIiI")
+STRING_LENGTH = struct.Struct("<I")
+
+KIND_PORTAL = 0
+KIND_SECTION = 1
+
+# Location of a record in the snapshot file
+Entry = namedtuple("Entry", ["score", "offset", "length", "crc"])
+
+
+class SnapshotError(ValueError):
+    """Raised when a snapshot file is truncated, corrupt or of an unsupported version."""
+
+
+def encode_portal(created_at, last_activity, timestamps, descriptions, evicted=0):
+    """
+    Encode the history record of one portal.
+
+    Args:
+        created_at (str): ISO-8601 creation time of the portal
+        last_activity (dict, optional): {"description", "timestamp"} of the latest activity
+        timestamps (array): Epoch-ms timestamps of the in-memory activities, oldest first
+        descriptions (list): Description of each activity, parallel to timestamps
+        evicted (int): Activities recorded before the oldest one kept
+
+    Returns:
+        bytes: The encoded record
+    """
+    local_ids = {}
+    description_ids = array("i", [local_ids.setdefault(d, len(local_ids)) for d in descriptions])
+    last_ms, last_description = -1, -1
+    if last_activity:
+        last_ms = to_epoch_ms(last_activity["timestamp"])
+        last_description = local_ids.setdefault(last_activity["description"], len(local_ids))
+    if not isinstance(timestamps, array) or timestamps.typecode != "q":
+        timestamps = array("q", timestamps)
+
+    created = (created_at or "").encode("utf-8")
+    parts = [
+        PORTAL_RECORD.pack(last_ms, evicted, len(timestamps), len(local_ids), last_description, len(created)),
+        created,
+        timestamps.tobytes(),
+        description_ids.tobytes()
+    ]
+    for description in local_ids:
+        encoded = description.encode("utf-8")
+        parts.append(STRING_LENGTH.pack(len(encoded)))
+        parts.append(encoded)
+    return b"".join(parts)
+
+
+def decode_portal(data):
+    """
+    Decode a portal history record.
+
+    Returns:
+        dict: {"created_at", "last_activity" ({"description", "timestamp"} or None), "evicted",
+            "timestamps" (array of epoch ms), "description_ids" (array), "descriptions" (list)}
+    """
+    last_ms, evicted, count, description_count, last_description, created_length = \
+        PORTAL_RECORD.unpack_from(data, 0)
+    position = PORTAL_RECORD.size
+    created_at = bytes(data[position:position + created_length]).decode("utf-8") or None
+    position += created_length
+    timestamps = array("q")
+    timestamps.frombytes(data[position:position + 8 * count])
+    position += 8 * count
+    description_ids = array("i")
+    description_ids.frombytes(data[position:position + 4 * count])
+    position += 4 * count
+    descriptions = []
+    for _ in range(description_count):
+        (length,) = STRING_LENGTH.unpack_from(data, position)
+        position += STRING_LENGTH.size
+        descriptions.append(bytes(data[position:position + length]).decode("utf-8"))
+        position += length
+    return {
+        "created_at": created_at,
+        "last_activity": {
+            "description": descriptions[last_description],
+            "timestamp": _iso(last_ms)
+        } if last_ms >= 0 and last_description >= 0 else None,
+        "evicted": evicted,
+        "timestamps": timestamps,
+        "description_ids": description_ids,
+        "descriptions": descriptions
+    }
+
+
+def write_snapshot(path, log_sequence, portals, sections=None):
+    """
+    Write a snapshot atomically.
+
+    Args:
+        path (str): Destination file; written through a temporary file and renamed into place
+        log_sequence (int): Last evolution log sequence number the snapshot covers
+        portals (iterable): (name, score, record bytes) per portal; record may be b"" for a
+            portal without history
+        sections (dict, optional): Section name -> JSON-serialisable value
+
+    Returns:
+        int: Size of the snapshot in bytes
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    index = []
+    portal_count = 0
+    with open(tmp_path, "wb") as f:
+        f.write(b"\0" * (HEADER.size + HEADER_CRC.size))
+        offset = HEADER.size + HEADER_CRC.size
+
+        def write_record(kind, name, score, record):
+            nonlocal offset
+            f.write(record)
+            encoded_name = name.encode("utf-8")
+            index.append(INDEX_ENTRY.pack(kind, len(encoded_name), score, offset, len(record),
+                                          zlib.crc32(record)) + encoded_name)
+            offset += len(record)
+
+        for name, score, record in portals:
+            write_record(KIND_PORTAL, name, score, record)
+            portal_count += 1
+        for name, value in (sections or {}).items():
+            write_record(KIND_SECTION, name, 0.0, json.dumps(value, separators=(",", ":")).encode("utf-8"))
+
+        index_data = b"".join(index)
+        f.write(index_data)
+        header = HEADER.pack(MAGIC, FORMAT_VERSION, 0, int(time.time() * 1000), log_sequence, portal_count,
+                             offset, len(index_data), zlib.crc32(index_data))
+        f.seek(0)
+        f.write(header + HEADER_CRC.pack(zlib.crc32(header)))
+        f.flush()
+        os.fsync(f.fileno())
+        size = offset + len(index_data)
+    os.replace(tmp_path, path)
+    return size
+
+
+class StateSnapshot:
+    """Memory-mapped, lazily decoded snapshot file; close() unmaps it."""
+
+    def __init__(self, path):
+        """
+        Open a snapshot and read its header and index.
+
+        Raises:
+            SnapshotError: If the file is not a valid snapshot
+        """
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < HEADER.size + HEADER_CRC.size:
+                raise SnapshotError(f"{self.path.name} is truncated")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._data = memoryview(self._map)
+
+        header = self._data[:HEADER.size]
+        (header_crc,) = HEADER_CRC.unpack_from(self._data, HEADER.size)
+        if zlib.crc32(header) != header_crc:
+            raise SnapshotError(f"{self.path.name} has a corrupt header")
+        magic, version, _, created_ms, log_sequence, portal_count, index_offset, index_length, index_crc = \
+            HEADER.unpack(header)
+        if magic != MAGIC:
+            raise SnapshotError(f"{self.path.name} is not a portal state snapshot")
+        if version > FORMAT_VERSION:
+            raise SnapshotError(f"{self.path.name} has unsupported format version {version}")
+        index = self._data[index_offset:index_offset + index_length]
+        if len(index) != index_length or zlib.crc32(index) != index_crc:
+            raise SnapshotError(f"{self.path.name} has a corrupt index")
+
+        self.version = version
+        self.created_ms = created_ms
+        self.log_sequence = log_sequence
+        self.size = size
+        # Readers decode under the lock so close() never unmaps a record being read
+        self._lock = threading.Lock()
+        self._portals = {}
+        self._sections = {}
+        position = 0
+        while position < index_length:
+            kind, name_length, score, offset, length, crc = INDEX_ENTRY.unpack_from(index, position)
+            position += INDEX_ENTRY.size
+            name = bytes(index[position:position + name_length]).decode("utf-8")
+            position += name_length
+            entries = self._portals if kind == KIND_PORTAL else self._sections
+            entries[name] = Entry(score, offset, length, crc)
+        if len(self._portals) != portal_count:
+            raise SnapshotError(f"{self.path.name} index does not match its header")
+
+    def __contains__(self, name):
+        return name in self._portals
+
+    def __len__(self):
+        return len(self._portals)
+
+    def scores(self):
+        """Get portal name -> evolution score without decoding any record."""
+        return {name: entry.score for name, entry in self._portals.items()}
+
+    def _record(self, entry, name):
+        """Get a record's bytes after checking its checksum. Caller holds the lock."""
+        if self._map is None:
+            raise SnapshotError(f"{self.path.name} is closed")
+        record = self._data[entry.offset:entry.offset + entry.length]
+        if len(record) != entry.length or zlib.crc32(record) != entry.crc:
+            raise SnapshotError(f"Record {name!r} in {self.path.name} is corrupt")
+        return record
+
+    def record_bytes(self, name):
+        """Get the encoded history record of a portal, or None if it has none."""
+        entry = self._portals.get(name)
+        if entry is None or not entry.length:
+            return None
+        with self._lock:
+            return bytes(self._record(entry, name))
+
+    def portal(self, name):
+        """Decode the history record of a portal (see decode_portal), or None if it has none."""
+        entry = self._portals.get(name)
+        if entry is None or not entry.length:
+            return None
+        with self._lock:
+            return decode_portal(self._record(entry, name))
+
+    def section(self, name, default=None):
+        """Decode a named section."""
+        entry = self._sections.get(name)
+        if entry is None:
+            return default
+        with self._lock:
+            data = bytes(self._record(entry, name))
+        return json.loads(data.decode("utf-8"))
+
+    def close(self):
+        """Unmap the file; later reads raise SnapshotError."""
+        with self._lock:
+            if self._map is None:
+                return
+            self._data.release()
+            self._map.close()
+            self._map = None
+
+    def stats(self):
+        """Get snapshot statistics."""
+        return {
+            "path": str(self.path),
+            "version": self.version,
+            "created_ms": self.created_ms,
+            "log_sequence": self.log_sequence,
+            "portals": len(self._portals),
+            "sections": sorted(self._sections),
+            "bytes": self.size
+        }
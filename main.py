@@ -5,6 +5,7 @@ This is the main entry point for the LUMAURA x XUVE platform.
 It initializes all components and starts the Flask web server.
 """
 
+import atexit
 import os
 import logging
 from flask import Flask, render_template, jsonify, request, redirect, url_for
@@ -46,8 +47,16 @@ os.makedirs("data", exist_ok=True)
 try:
     # Portal Evolution System
     from lumaura_ai_system.portal_evolution_system import PortalEvolutionSystem
-    portal_system = PortalEvolutionSystem()
+    # PORTAL_PERSISTENCE=sql keeps portal state and history in the configured SQLite database;
+    # PORTAL_SHARED_STATE=1 additionally lets several gunicorn workers share it
+    portal_database_url = app.config["SQLALCHEMY_DATABASE_URI"] if os.environ.get("PORTAL_PERSISTENCE") == "sql" else None
+    portal_system = PortalEvolutionSystem(
+        database_url=portal_database_url,
+        shared_state=os.environ.get("PORTAL_SHARED_STATE") == "1"
+    )
     portal_system.initialize()
+    # Write a final state snapshot so the next start restores full portal state
+    atexit.register(portal_system.shutdown)
     
     from routes.portal_evolution_routes import register_routes as register_portal_routes
     register_portal_routes(app, portal_system)
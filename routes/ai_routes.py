@@ -5,12 +5,17 @@ This module defines the API routes for AI services.
 """
 
 import logging
-from flask import jsonify, request, render_template
+from flask import jsonify, request, render_template, Response
 import base64
+import json
 import os
+import time
 
 logger = logging.getLogger(__name__)
 
+# Largest number of prompts accepted by one batch request
+MAX_BATCH_PROMPTS = int(os.environ.get("AI_MAX_BATCH_PROMPTS", 50))
+
 def register_routes(app):
     """Register AI routes with the Flask app."""
     logger.info("AI routes registered")
@@ -20,6 +25,30 @@ def register_routes(app):
         """Render the AI dashboard."""
         return render_template('ai/dashboard.html')
     
+    @app.route('/api/ai/providers')
+    def ai_providers():
+        """Get provider availability and connection pool statistics."""
+        from services.ai.ai_factory import AIFactory
+        
+        return jsonify({
+            "status": "ok",
+            "pool": AIFactory.get_pool_stats(),
+            "async": AIFactory.get_async_stats(),
+            "coalescing": AIFactory.get_coalescing_stats()
+        })
+    
+    @app.route('/api/ai/cache')
+    def ai_cache():
+        """Get response cache hit/miss metrics and sizes."""
+        from services.ai.response_cache import get_response_cache
+        
+        cache = get_response_cache()
+        return jsonify({
+            "status": "ok",
+            "enabled": cache is not None,
+            "cache": cache.stats() if cache is not None else None
+        })
+    
     @app.route('/api/ai/generate-text', methods=['POST'])
     def generate_text():
         """Generate text using AI."""
@@ -28,6 +57,7 @@ def register_routes(app):
         provider = data.get('provider')
         use_case = data.get('use_case')
         max_tokens = data.get('max_tokens', 500)
+        use_cache = data.get('cache', True) is not False
         
         if not prompt:
             return jsonify({"error": "Missing prompt"}), 400
@@ -35,13 +65,11 @@ def register_routes(app):
         try:
             from services.ai.ai_factory import AIFactory
             
-            ai_service = AIFactory.get_provider(provider, use_case)
+            text = AIFactory.generate_text(prompt, max_tokens, provider, use_case, cache=use_cache)
             
-            if not ai_service:
+            if text is None:
                 return jsonify({"error": "No AI service available"}), 503
             
-            text = ai_service.generate_text(prompt, max_tokens)
-            
             return jsonify({
                 "status": "ok",
                 "text": text
@@ -50,6 +78,95 @@ def register_routes(app):
             logger.error(f"Error generating text: {e}")
             return jsonify({"error": str(e)}), 500
     
+    @app.route('/api/ai/generate-text/stream', methods=['POST'])
+    def stream_text():
+        """
+        Generate text using AI, relaying chunks as Server-Sent Events as they arrive.
+        
+        Emits "token" events ({"text"}), then "done", or "error" ({"error"}) on failure.
+        A client disconnect closes the upstream provider stream.
+        """
+        data = request.json
+        prompt = data.get('prompt')
+        provider = data.get('provider')
+        use_case = data.get('use_case')
+        max_tokens = data.get('max_tokens', 500)
+        use_cache = data.get('cache', True) is not False
+        
+        if not prompt:
+            return jsonify({"error": "Missing prompt"}), 400
+        
+        from services.ai.ai_factory import AIFactory
+        
+        # Leased until the response closes, so a rotated API key can't close the client mid-stream
+        ai_service = AIFactory.acquire_provider(provider, use_case)
+        
+        if not ai_service:
+            return jsonify({"error": "No AI service available"}), 503
+        
+        def stream():
+            chunks = ai_service.stream_text(prompt, max_tokens, cache=use_cache)
+            try:
+                for text in chunks:
+                    yield f"event: token\ndata: {json.dumps({'text': text})}\n\n"
+                yield 'event: done\ndata: {"status":"ok"}\n\n'
+            except Exception as e:
+                logger.error(f"Error streaming text: {e}")
+                yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+            finally:
+                # Runs when the server closes the response after a client disconnect
+                chunks.close()
+        
+        response = Response(stream(), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
+        response.call_on_close(lambda: AIFactory.release_provider(ai_service))
+        return response
+    
+    @app.route('/api/ai/generate-batch', methods=['POST'])
+    def generate_batch():
+        """
+        Run several prompts concurrently using AI.
+        
+        Takes {"prompts": [...], "kind": "text" | "json"} plus the options of the single
+        endpoints, and returns one result per prompt in order.
+        """
+        data = request.json
+        prompts = data.get('prompts')
+        kind = data.get('kind', 'text')
+        schema = data.get('schema')
+        provider = data.get('provider')
+        use_case = data.get('use_case')
+        max_tokens = data.get('max_tokens', 500)
+        use_cache = data.get('cache', True) is not False
+        
+        if not prompts or not isinstance(prompts, list) or not all(isinstance(p, str) and p for p in prompts):
+            return jsonify({"error": "prompts must be a non-empty list of prompts"}), 400
+        if kind not in ("text", "json"):
+            return jsonify({"error": "kind must be 'text' or 'json'"}), 400
+        if len(prompts) > MAX_BATCH_PROMPTS:
+            return jsonify({"error": f"At most {MAX_BATCH_PROMPTS} prompts per batch"}), 413
+        
+        try:
+            from services.ai.ai_factory import AIFactory
+            
+            started = time.perf_counter()
+            results = AIFactory.generate_many(prompts, provider, use_case, kind=kind, schema=schema,
+                                              max_tokens=max_tokens, cache=use_cache)
+            
+            if results is None:
+                return jsonify({"error": "No AI service available"}), 503
+            
+            return jsonify({
+                "status": "ok",
+                "results": results,
+                "latency_ms": round((time.perf_counter() - started) * 1000, 1)
+            })
+        except Exception as e:
+            logger.error(f"Error generating batch: {e}")
+            return jsonify({"error": str(e)}), 500
+    
     @app.route('/api/ai/generate-json', methods=['POST'])
     def generate_json():
         """Generate JSON using AI."""
@@ -58,6 +175,7 @@ def register_routes(app):
         schema = data.get('schema')
         provider = data.get('provider')
         use_case = data.get('use_case')
+        use_cache = data.get('cache', True) is not False
         
         if not prompt:
             return jsonify({"error": "Missing prompt"}), 400
@@ -65,13 +183,11 @@ def register_routes(app):
         try:
             from services.ai.ai_factory import AIFactory
             
-            ai_service = AIFactory.get_provider(provider, use_case)
+            result = AIFactory.generate_json(prompt, schema, provider, use_case, cache=use_cache)
             
-            if not ai_service:
+            if result is None:
                 return jsonify({"error": "No AI service available"}), 503
             
-            result = ai_service.generate_json(prompt, schema)
-            
             return jsonify({
                 "status": "ok",
                 "result": result
@@ -104,12 +220,11 @@ def register_routes(app):
         try:
             from services.ai.ai_factory import AIFactory
             
-            ai_service = AIFactory.get_provider(provider, use_case)
-            
-            if not ai_service:
-                return jsonify({"error": "No AI service available"}), 503
-            
-            analysis = ai_service.analyze_image(image_data, prompt)
+            with AIFactory.lease_provider(provider, use_case) as ai_service:
+                if not ai_service:
+                    return jsonify({"error": "No AI service available"}), 503
+                
+                analysis = ai_service.analyze_image(image_data, prompt)
             
             return jsonify({
                 "status": "ok",
@@ -4,11 +4,18 @@ Portal Evolution Routes
 This module defines the API routes for the Portal Evolution System.
 """
 
+import json
 import logging
-from flask import jsonify, request, render_template, abort
+from flask import jsonify, request, render_template, abort, Response
 
 logger = logging.getLogger(__name__)
 
+DETAIL_RECOMMENDATIONS_LIMIT = 100
+MAX_PAGE_SIZE = 500
+EVENT_KEEPALIVE_SECONDS = 15
+MAX_BATCH_SIZE = 10000
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/jsonl', 'application/x-jsonlines')
+
 def register_routes(app, portal_system):
     """Register Portal Evolution System routes with the Flask app."""
     logger.info("Portal Evolution routes registered at /portal-evolution")
@@ -26,18 +33,100 @@ def register_routes(app, portal_system):
         if not portal_status:
             abort(404)
         
-        recommendations = portal_system.get_recommendations_for_portal(portal_name)
+        recommendations = portal_system.get_recommendations_for_portal(
+            portal_name, status="pending", limit=DETAIL_RECOMMENDATIONS_LIMIT
+        )
         return render_template('portal_evolution/portal_detail.html', 
                                portal=portal_status, 
                                recommendations=recommendations)
     
     @app.route('/api/portal-evolution/status')
     def portal_evolution_status():
-        """Get the status of all portals."""
-        portals = portal_system.get_all_portals_status()
+        """
+        Get the status of all portals.
+        
+        Supports If-None-Match (304 when nothing changed) and ?since=<version>[&epoch=<epoch>]
+        to return only the portals changed after that version.
+        """
+        etag = portal_system.get_status_etag()
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+        
+        snapshot = portal_system.get_status_since(
+            since=request.args.get('since', type=int),
+            epoch=request.args.get('epoch', type=int),
+            as_json=True
+        )
+        # Portals are already serialised per snapshot; only the envelope is built here
+        body = '{"status":"ok","version":%d,"epoch":%d,"delta":%s,"portals":%s}' % (
+            snapshot["version"], snapshot["epoch"], json.dumps(snapshot["delta"]), snapshot["portals"]
+        )
+        response = Response(body, mimetype='application/json')
+        response.set_etag(snapshot["etag"])
+        return response
+    
+    @app.route('/api/portal-evolution/events')
+    def portal_events():
+        """Stream portal events as Server-Sent Events, resuming from Last-Event-ID if sent."""
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        subscription = portal_system.subscribe_events(last_event_id)
+        
+        def stream():
+            try:
+                yield "retry: 3000\n\n"
+                while not subscription.closed:
+                    frames, dropped = subscription.get(timeout=EVENT_KEEPALIVE_SECONDS)
+                    if dropped:
+                        # Tell slow clients they missed events so they can resync from /status
+                        yield f"event: overflow\ndata: {{\"dropped\":{dropped}}}\n\n"
+                    if frames:
+                        yield "".join(frames)
+                    else:
+                        yield ": keep-alive\n\n"
+            finally:
+                portal_system.unsubscribe_events(subscription)
+        
+        return Response(stream(), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
+    
+    @app.route('/api/portal-evolution/events/stats')
+    def portal_event_stats():
+        """Get event stream statistics."""
+        return jsonify({
+            "status": "ok",
+            "events": portal_system.get_event_stats()
+        })
+    
+    @app.route('/api/portal-evolution/registry')
+    def registry_stats():
+        """Get portal registry statistics, including per-portal load times."""
+        return jsonify({
+            "status": "ok",
+            "registry": portal_system.get_registry_stats()
+        })
+    
+    @app.route('/api/portal-evolution/cluster')
+    def cluster_stats():
+        """Get the shared-state and leadership status of the worker serving the request."""
+        return jsonify({
+            "status": "ok",
+            "cluster": portal_system.get_cluster_stats()
+        })
+    
+    @app.route('/api/portal-evolution/generator/stats')
+    def generator_stats():
+        """Get statistics of the simulated activity generator."""
+        stats = portal_system.get_generation_stats()
+        if stats is None:
+            return jsonify({"error": "Activity generation is not running"}), 404
+        
         return jsonify({
             "status": "ok",
-            "portals": portals
+            "stats": stats
         })
     
     @app.route('/api/portal-evolution/portal/<portal_name>')
@@ -52,15 +141,176 @@ def register_routes(app, portal_system):
             "portal": portal_status
         })
     
+    @app.route('/api/portal-evolution/activities/<portal_name>')
+    def portal_activities(portal_name):
+        """Get activities for a portal, optionally between start and end (epoch ms or ISO-8601)."""
+        try:
+            activities = portal_system.get_portal_activities(
+                portal_name,
+                start=request.args.get('start'),
+                end=request.args.get('end'),
+                limit=request.args.get('limit', type=int)
+            )
+        except ValueError:
+            return jsonify({"error": "Invalid start or end"}), 400
+        
+        if activities is None:
+            return jsonify({"error": "Portal not found"}), 404
+        
+        return jsonify({
+            "status": "ok",
+            "portal_name": portal_name,
+            "activities": activities
+        })
+    
+    @app.route('/api/portal-evolution/search')
+    def search_activities():
+        """Search activity descriptions (?q=terms "or phrases"&portal=&start=&end=&limit=)."""
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({"error": "Missing q"}), 400
+        portal_name = request.args.get('portal') or None
+        limit = min(MAX_PAGE_SIZE, max(1, request.args.get('limit', 50, type=int)))
+
+        try:
+            matches = portal_system.search_activities(
+                query,
+                portal_name=portal_name,
+                start=request.args.get('start'),
+                end=request.args.get('end'),
+                limit=limit
+            )
+        except ValueError:
+            return jsonify({"error": "Invalid start or end"}), 400
+
+        if matches is None:
+            return jsonify({"error": "Portal not found"}), 404
+
+        return jsonify({
+            "status": "ok",
+            "query": query,
+            "portal_name": portal_name,
+            "total": matches["total"],
+            "results": matches["results"],
+            "limit": limit
+        })
+
+    @app.route('/api/portal-evolution/metrics/<portal_name>')
+    def portal_metrics(portal_name):
+        """Get rolled-up evolution metrics for a portal (?resolution=1m|1h|1d&start=&end=)."""
+        try:
+            metrics = portal_system.get_portal_metrics(
+                portal_name,
+                resolution=request.args.get('resolution', '1h'),
+                start=request.args.get('start'),
+                end=request.args.get('end')
+            )
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        if metrics is None:
+            return jsonify({"error": "Portal not found"}), 404
+        
+        return jsonify({
+            "status": "ok",
+            "portal_name": portal_name,
+            **metrics
+        })
+    
+    @app.route('/api/portal-evolution/graph')
+    def interaction_graph_stats():
+        """Get interaction graph statistics."""
+        return jsonify({
+            "status": "ok",
+            "graph": portal_system.get_interaction_stats()
+        })
+    
+    @app.route('/api/portal-evolution/graph/influence')
+    def portal_influence():
+        """Get portals ranked by interaction influence."""
+        limit = request.args.get('limit', type=int)
+        return jsonify({
+            "status": "ok",
+            "influence": portal_system.get_portal_influence(limit)
+        })
+    
+    @app.route('/api/portal-evolution/graph/path')
+    def interaction_path():
+        """Get the strongest chain of interactions from one portal to another."""
+        source = request.args.get('source')
+        target = request.args.get('target')
+        if not source or not target:
+            return jsonify({"error": "Missing source or target"}), 400
+        
+        path = portal_system.get_interaction_path(source, target)
+        if path is None:
+            return jsonify({"error": "No interaction path"}), 404
+        
+        return jsonify({
+            "status": "ok",
+            "source": source,
+            "target": target,
+            **path
+        })
+    
+    @app.route('/api/portal-evolution/graph/<portal_name>/neighbours')
+    def portal_neighbours(portal_name):
+        """Get the portals a portal interacts with; direction is out, in or both."""
+        direction = request.args.get('direction', 'both')
+        if direction not in ('out', 'in', 'both'):
+            return jsonify({"error": "direction must be out, in or both"}), 400
+        
+        neighbours = portal_system.get_portal_neighbours(portal_name, direction)
+        if neighbours is None:
+            return jsonify({"error": "Portal not found"}), 404
+        
+        return jsonify({
+            "status": "ok",
+            "portal_name": portal_name,
+            "direction": direction,
+            "neighbours": neighbours
+        })
+    
+    @app.route('/api/portal-evolution/graph/<portal_name>/collaborators')
+    def portal_collaborators(portal_name):
+        """Get a portal's strongest collaborators."""
+        limit = min(MAX_PAGE_SIZE, max(1, request.args.get('limit', 5, type=int)))
+        collaborators = portal_system.get_top_collaborators(portal_name, limit)
+        if collaborators is None:
+            return jsonify({"error": "Portal not found"}), 404
+        
+        return jsonify({
+            "status": "ok",
+            "portal_name": portal_name,
+            "collaborators": collaborators
+        })
+    
+    @app.route('/api/portal-evolution/recommendation-stats')
+    def recommendation_stats():
+        """Get live and archived recommendation counts."""
+        return jsonify({
+            "status": "ok",
+            "recommendations": portal_system.get_recommendation_stats()
+        })
+    
     @app.route('/api/portal-evolution/recommendations/<portal_name>')
     def portal_recommendations(portal_name):
-        """Get recommendations for a specific portal."""
-        recommendations = portal_system.get_recommendations_for_portal(portal_name)
+        """Get recommendations for a specific portal, paginated with offset/limit and filtered by status."""
+        status = request.args.get('status')
+        offset = max(0, request.args.get('offset', 0, type=int))
+        limit = min(MAX_PAGE_SIZE, max(1, request.args.get('limit', MAX_PAGE_SIZE, type=int)))
+        
+        recommendations = portal_system.get_recommendations_for_portal(
+            portal_name, status=status, offset=offset, limit=limit
+        )
         
         return jsonify({
             "status": "ok",
             "portal_name": portal_name,
-            "recommendations": recommendations
+            "recommendations": recommendations,
+            "total": portal_system.count_recommendations_for_portal(portal_name, status=status),
+            "offset": offset,
+            "limit": limit
         })
     
     @app.route('/api/portal-evolution/implement-recommendation', methods=['POST'])
@@ -85,6 +335,38 @@ def register_routes(app, portal_system):
                 "error": result.get('error', 'Unknown error')
             }), 400
     
+    @app.route('/api/portal-evolution/implement-recommendations', methods=['POST'])
+    def implement_recommendations():
+        """
+        Implement a batch of recommendations.
+        
+        Accepts {"recommendation_ids": [...], "atomic": true}. With atomic (the default)
+        either every recommendation is implemented or none is.
+        """
+        data = request.get_json(silent=True)
+        recommendation_ids = data.get('recommendation_ids') if isinstance(data, dict) else None
+        if not isinstance(recommendation_ids, list) or not recommendation_ids:
+            return jsonify({"error": "Missing recommendation_ids"}), 400
+        if len(recommendation_ids) > MAX_BATCH_SIZE:
+            return jsonify({"error": f"Batch exceeds {MAX_BATCH_SIZE} recommendations"}), 413
+        
+        atomic = data.get('atomic', True)
+        if not isinstance(atomic, bool):
+            return jsonify({"error": "atomic must be a boolean"}), 400
+        
+        result = portal_system.implement_recommendations(recommendation_ids, atomic=atomic)
+        implemented = sum(1 for item in result["results"] if item["success"])
+        
+        return jsonify({
+            "status": "ok" if result["success"] else "error",
+            "atomic": atomic,
+            "implemented": implemented,
+            "failed": len(result["results"]) - implemented,
+            "results": result["results"],
+            "portals": result["portals"],
+            "latency_ms": round(result["latency_ms"], 3)
+        }), 200 if result["success"] or not atomic else 409
+    
     @app.route('/api/portal-evolution/record-activity', methods=['POST'])
     def record_portal_activity():
         """Record activity for a portal."""
@@ -94,8 +376,12 @@ def register_routes(app, portal_system):
         
         if not portal_name or not activity:
             return jsonify({"error": "Missing portal_name or activity"}), 400
+        related_portal = data.get('related_portal')
+        if (not isinstance(portal_name, str) or not isinstance(activity, str)
+                or not isinstance(related_portal, (str, type(None)))):
+            return jsonify({"error": "portal_name, activity and related_portal must be strings"}), 400
         
-        activity = portal_system.record_portal_activity(portal_name, activity)
+        activity = portal_system.record_portal_activity(portal_name, activity, related_portal)
         
         if activity:
             return jsonify({
@@ -107,3 +393,43 @@ def register_routes(app, portal_system):
                 "status": "error",
                 "error": "Failed to record activity"
             }), 400
+    
+    @app.route('/api/portal-evolution/record-activities', methods=['POST'])
+    def record_portal_activities():
+        """
+        Record a batch of activities.
+        
+        Accepts a JSON array (or {"activities": [...]}) or an NDJSON body of
+        {"portal_name", "activity"} records and returns one result per record.
+        """
+        if request.mimetype in NDJSON_MIMETYPES:
+            records = []
+            for line in request.stream:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # Keep the slot so results stay aligned with input lines
+                    records.append(None)
+                if len(records) > MAX_BATCH_SIZE:
+                    break
+        else:
+            data = request.get_json(silent=True)
+            records = data.get('activities') if isinstance(data, dict) else data
+            if not isinstance(records, list):
+                return jsonify({"error": "Expected a JSON array of activities or an NDJSON body"}), 400
+        
+        if len(records) > MAX_BATCH_SIZE:
+            return jsonify({"error": f"Batch exceeds {MAX_BATCH_SIZE} activities"}), 413
+        
+        results = portal_system.record_portal_activities(records)
+        recorded = sum(1 for result in results if result["success"])
+        
+        return jsonify({
+            "status": "ok",
+            "recorded": recorded,
+            "failed": len(results) - recorded,
+            "results": results
+        })
@@ -3,19 +3,41 @@ AI Factory Module
 
 This module provides a factory pattern for creating AI service instances.
 The factory determines which AI provider to use based on available credentials and use case.
+Provider services are long-lived: each is built once per process and shared by every request.
 """
 
 import os
+import asyncio
 import logging
-import importlib
+import contextlib
+import concurrent.futures
+
+from services.ai.async_bridge import fan_out, get_bridge
+from services.ai.provider_pool import ProviderPool
+from services.ai.response_cache import cache_key
+from services.ai.single_flight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
+# Seconds generate_many waits for a whole batch unless told otherwise
+DEFAULT_BATCH_TIMEOUT = 120.0
+
+
+def batch_timeout():
+    """Get the default batch timeout from the environment; 0 waits indefinitely."""
+    return float(os.environ.get("AI_BATCH_TIMEOUT", DEFAULT_BATCH_TIMEOUT)) or None
+
 class AIFactory:
     """Factory for creating AI service instances."""
     
     PROVIDERS = ["openai", "anthropic"]
     
+    # Shared provider services, built on first use
+    _pool = ProviderPool(PROVIDERS)
+    
+    # Shares one upstream call between concurrent identical requests
+    _coalescer = SingleFlight(enabled=os.environ.get("AI_COALESCING_ENABLED", "1") != "0")
+    
     @staticmethod
     def get_provider(provider_name=None, use_case=None):
         """
@@ -27,48 +49,209 @@ class AIFactory:
             
         Returns:
             object: AI provider service or None if not available
+        
+        A rotated API key closes the service it returns; callers that keep using it
+        should use lease_provider instead.
         """
+        return AIFactory._select_provider(provider_name, use_case)[1]
+    
+    @staticmethod
+    def acquire_provider(provider_name=None, use_case=None):
+        """
+        Lease an AI provider service, as get_provider; it stays open until release_provider.
+        
+        Returns:
+            object: AI provider service or None if not available
+        """
+        return AIFactory._select_provider(provider_name, use_case, lease=True)[1]
+    
+    @staticmethod
+    def release_provider(service):
+        """Return a service leased with acquire_provider."""
+        AIFactory._pool.release(service)
+    
+    @staticmethod
+    @contextlib.contextmanager
+    def lease_provider(provider_name=None, use_case=None):
+        """Lease an AI provider service for the duration of a with block; yields None if unavailable."""
+        with AIFactory._leased_provider(provider_name, use_case) as (_, service):
+            yield service
+    
+    @staticmethod
+    @contextlib.contextmanager
+    def _leased_provider(provider_name=None, use_case=None):
+        """Lease the provider get_provider would use; yields its name and service, or (None, None)."""
+        provider, service = AIFactory._select_provider(provider_name, use_case, lease=True)
+        try:
+            yield provider, service
+        finally:
+            if service is not None:
+                AIFactory._pool.release(service)
+    
+    @staticmethod
+    def _select_provider(provider_name=None, use_case=None, lease=False):
+        """Get the name and service of the provider get_provider would use, or (None, None)."""
         # If provider specified, attempt to use that one
         if provider_name and provider_name.lower() in AIFactory.PROVIDERS:
-            return AIFactory._get_specific_provider(provider_name.lower())
+            provider_name = provider_name.lower()
+            service = AIFactory._get_specific_provider(provider_name, lease)
+            return (provider_name, service) if service else (None, None)
         
         # Otherwise, try each provider in order of preference based on use case
         preferred_order = AIFactory._get_preferred_order(use_case)
         
         for provider in preferred_order:
-            service = AIFactory._get_specific_provider(provider)
+            service = AIFactory._get_specific_provider(provider, lease)
             if service:
                 logger.info(f"Using {provider} for AI service")
-                return service
+                return provider, service
         
         logger.warning("No AI providers available")
-        return None
+        return None, None
     
     @staticmethod
-    def _get_specific_provider(provider_name):
-        """Get a specific AI provider service."""
-        try:
-            # Import the provider module
-            module_name = f"services.ai.{provider_name}_service"
-            provider_module = importlib.import_module(module_name)
+    def _get_specific_provider(provider_name, lease=False):
+        """Get the shared service of a specific AI provider, leased if asked."""
+        if lease:
+            return AIFactory._pool.acquire(provider_name)
+        return AIFactory._pool.get(provider_name)
+    
+    @staticmethod
+    def get_pool_stats():
+        """Get availability, client reuse and connection pool statistics of the providers."""
+        return AIFactory._pool.stats()
+    
+    @staticmethod
+    def reset_providers(provider_name=None):
+        """Drop pooled provider services so they are rebuilt on next use."""
+        AIFactory._pool.reset(provider_name)
+    
+    @staticmethod
+    def _request_key(provider, service, kind, prompt, schema, max_tokens, cache):
+        """Get the canonical key of a request; cache-bypassing requests only join each other."""
+        model = getattr(service, "default_model", None)
+        return cache_key(provider, model, kind if cache else f"{kind}:nocache", prompt, schema, max_tokens)
+    
+    @staticmethod
+    def _cached_response(service, key, cache):
+        """
+        Look a request up in the service's response cache before it joins a shared call.
+        
+        The key of a cached request is the service's own cache key, so a hit here is
+        answered without counting as an upstream call.
+        
+        Returns:
+            The cached response, or None
+        """
+        response_cache = getattr(service, "cache", None)
+        if not cache or response_cache is None:
+            return None
+        value = response_cache.get(key, record_miss=False)
+        if value is not None:
+            AIFactory._coalescer.record_cache_hit()
+        return value
+    
+    @staticmethod
+    def generate_text(prompt, max_tokens=1000, provider_name=None, use_case=None, cache=True):
+        """
+        Generate text, sharing one upstream call between concurrent identical requests.
+        
+        Returns:
+            str: The generated text, or None if no provider is available
+        """
+        with AIFactory._leased_provider(provider_name, use_case) as (provider, service):
+            if service is None:
+                return None
+            key = AIFactory._request_key(provider, service, "text", prompt, None, max_tokens, cache)
+            cached = AIFactory._cached_response(service, key, cache)
+            if cached is not None:
+                return cached
+            return AIFactory._coalescer.do(key, lambda: service.generate_text(prompt, max_tokens, cache=cache))
+    
+    @staticmethod
+    def generate_json(prompt, schema=None, provider_name=None, use_case=None, cache=True):
+        """
+        Generate JSON, sharing one upstream call between concurrent identical requests.
+        
+        Returns:
+            dict: The generated JSON, or None if no provider is available
+        """
+        with AIFactory._leased_provider(provider_name, use_case) as (provider, service):
+            if service is None:
+                return None
+            key = AIFactory._request_key(provider, service, "json", prompt, schema, 1000, cache)
+            cached = AIFactory._cached_response(service, key, cache)
+            if cached is not None:
+                return cached
+            return AIFactory._coalescer.do(key, lambda: service.generate_json(prompt, schema, cache=cache))
+    
+    @staticmethod
+    def get_coalescing_stats():
+        """Get the number of requests that shared another request's upstream call."""
+        return AIFactory._coalescer.stats()
+    
+    @staticmethod
+    def generate_many(prompts, provider_name=None, use_case=None, kind="text", schema=None,
+                      max_tokens=1000, cache=True, timeout=None):
+        """
+        Run several prompts concurrently on the shared event loop.
+        
+        Each prompt joins the same single-flight calls as generate_text and generate_json,
+        so repeats within the batch and requests already in flight elsewhere are sent once.
+        
+        Args:
+            prompts (list): Prompts to send
+            provider_name (str, optional): Specific provider to use
+            use_case (str, optional): Use case to determine best provider
+            kind (str): "text" or "json"
+            schema (dict, optional): JSON schema for kind "json"
+            max_tokens (int): Maximum tokens per completion for kind "text"
+            cache (bool): Whether to use the response cache
+            timeout (float, optional): Seconds to wait for the whole batch, AI_BATCH_TIMEOUT
+                (120 by default) if not given
             
-            # Check if provider is available
-            is_available_func = getattr(provider_module, "is_available", None)
-            if is_available_func and is_available_func():
-                # Get the service
-                get_service_func = getattr(provider_module, "get_service", None)
-                if get_service_func:
-                    return get_service_func()
-                else:
-                    logger.warning(f"No get_service function in {provider_name}_service")
+        Returns:
+            list: One result per prompt, in order, or None if no provider is available
+        """
+        with AIFactory._leased_provider(provider_name, use_case) as (provider, service):
+            if service is None:
+                return None
+            if timeout is None:
+                timeout = batch_timeout()
+            
+            if kind == "json":
+                def complete(prompt):
+                    return service.agenerate_json(prompt, schema, cache=cache)
             else:
-                logger.debug(f"{provider_name} is not available")
-        except ImportError:
-            logger.warning(f"Could not import {provider_name}_service")
-        except Exception as e:
-            logger.error(f"Error getting {provider_name} service: {e}")
-        
-        return None
+                def complete(prompt):
+                    return service.agenerate_text(prompt, max_tokens, cache=cache)
+            
+            async def call(prompt):
+                key = AIFactory._request_key(provider, service, kind, prompt, schema if kind == "json" else None,
+                                             1000 if kind == "json" else max_tokens, cache)
+                # The cache's SQLite tier blocks, so look it up off the event loop
+                cached = await asyncio.to_thread(AIFactory._cached_response, service, key, cache)
+                if cached is not None:
+                    return cached
+                return await AIFactory._coalescer.ado(key, lambda: complete(prompt))
+            
+            try:
+                results = get_bridge().run(fan_out(call, prompts), timeout)
+            except concurrent.futures.TimeoutError:
+                logger.error(f"AI batch of {len(prompts)} prompts timed out")
+                return [{"error": "Timed out"} if kind == "json" else "Error generating text: Timed out"
+                        for _ in prompts]
+            
+            for index, result in enumerate(results):
+                if isinstance(result, Exception):
+                    logger.error(f"Error in AI batch prompt {index}: {result}")
+                    results[index] = {"error": str(result)} if kind == "json" else f"Error generating text: {result}"
+            return results
+    
+    @staticmethod
+    def get_async_stats():
+        """Get the shared event loop's statistics."""
+        return get_bridge().stats()
     
     @staticmethod
     def _get_preferred_order(use_case):
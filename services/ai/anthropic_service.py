@@ -7,12 +7,17 @@ This module provides integration with Anthropic's Claude AI services for the LUM
 import os
 import logging
 import json
+import re
+
+from services.ai.base_service import BaseAIService
 
 logger = logging.getLogger(__name__)
 
+API_KEY_ENV = "ANTHROPIC_API_KEY"
+
 # Check if Anthropic Python package is installed
 try:
-    from anthropic import Anthropic
+    from anthropic import Anthropic, AsyncAnthropic
     ANTHROPIC_AVAILABLE = True
 except ImportError:
     ANTHROPIC_AVAILABLE = False
@@ -20,42 +25,87 @@ except ImportError:
 
 def is_available():
     """Check if Anthropic service is available."""
-    api_key = os.environ.get("ANTHROPIC_API_KEY")
+    api_key = os.environ.get(API_KEY_ENV)
     return ANTHROPIC_AVAILABLE and api_key is not None
 
-class AnthropicService:
+class AnthropicService(BaseAIService):
     """Service for Anthropic integration."""
     
+    PROVIDER = "anthropic"
+    DISPLAY_NAME = "Anthropic"
+    
     def __init__(self):
         """Initialize the Anthropic service."""
         if not is_available():
             raise ValueError("Anthropic service is not available")
         
-        self.api_key = os.environ.get("ANTHROPIC_API_KEY")
-        self.client = Anthropic(api_key=self.api_key)
-        self.default_model = "claude-3-5-sonnet-20241022"  # the newest Anthropic model is "claude-3-5-sonnet-20241022"
-        logger.info("Anthropic service initialized")
+        # the newest Anthropic model is "claude-3-5-sonnet-20241022"
+        super().__init__(os.environ.get(API_KEY_ENV), "claude-3-5-sonnet-20241022")
     
-    def generate_text(self, prompt, max_tokens=1000, model=None):
-        """Generate text from a prompt."""
+    def _create_client(self, http_client):
+        """Create the sync Anthropic client."""
+        return Anthropic(**self._client_kwargs(http_client))
+    
+    def _create_async_client(self, http_client):
+        """Create the async Anthropic client."""
+        return AsyncAnthropic(**self._client_kwargs(http_client))
+    
+    def generate_text(self, prompt, max_tokens=1000, model=None, cache=True):
+        """Generate text from a prompt. Pass cache=False to bypass the response cache."""
         try:
             model = model or self.default_model
             
-            message = self.client.messages.create(
-                model=model,
-                max_tokens=max_tokens,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
+            def complete():
+                message = self.client.messages.create(
+                    model=model,
+                    max_tokens=max_tokens,
+                    messages=[
+                        {"role": "user", "content": prompt}
+                    ]
+                )
+                return message.content[0].text
             
-            return message.content[0].text
+            return self._cached(cache, complete, model, "text", prompt, max_tokens=max_tokens)
         except Exception as e:
             logger.error(f"Error generating text with Anthropic: {e}")
             return f"Error generating text: {str(e)}"
     
-    def generate_json(self, prompt, schema=None, model=None):
-        """Generate JSON-formatted response from a prompt."""
+    async def agenerate_text(self, prompt, max_tokens=1000, model=None, cache=True):
+        """Async generate_text, limited to AI_MAX_CONCURRENCY requests in flight."""
+        try:
+            model = model or self.default_model
+            client = self._async_client()
+            
+            async def complete():
+                async with self._semaphore:
+                    message = await client.messages.create(
+                        model=model,
+                        max_tokens=max_tokens,
+                        messages=[
+                            {"role": "user", "content": prompt}
+                        ]
+                    )
+                return message.content[0].text
+            
+            return await self._acached(cache, complete, model, "text", prompt, max_tokens=max_tokens)
+        except Exception as e:
+            logger.error(f"Error generating text with Anthropic: {e}")
+            return f"Error generating text: {str(e)}"
+    
+    def _stream(self, model, prompt, max_tokens):
+        """Yield the text chunks of a streamed message."""
+        # Leaving the context manager closes the upstream response
+        with self.client.messages.stream(
+            model=model,
+            max_tokens=max_tokens,
+            messages=[
+                {"role": "user", "content": prompt}
+            ]
+        ) as stream:
+            yield from stream.text_stream
+    
+    def generate_json(self, prompt, schema=None, model=None, cache=True):
+        """Generate JSON-formatted response from a prompt. Pass cache=False to bypass the response cache."""
         try:
             model = model or self.default_model
             
@@ -66,37 +116,69 @@ class AnthropicService:
             # Anthropic needs explicit instructions for JSON format in the prompt
             json_prompt = f"{prompt}\n\nPlease format your entire response as a valid JSON object."
             
-            message = self.client.messages.create(
-                model=model,
-                max_tokens=1000,
-                system=system_prompt,
-                messages=[
-                    {"role": "user", "content": json_prompt}
-                ]
-            )
+            def complete():
+                message = self.client.messages.create(
+                    model=model,
+                    max_tokens=1000,
+                    system=system_prompt,
+                    messages=[
+                        {"role": "user", "content": json_prompt}
+                    ]
+                )
+                return self._parse_json(message.content[0].text)
             
-            # Extract JSON from response text
-            response_text = message.content[0].text
+            return self._cached(cache, complete, model, "json", prompt, schema, 1000)
+        except Exception as e:
+            logger.error(f"Error generating JSON with Anthropic: {e}")
+            return {"error": str(e)}
+    
+    async def agenerate_json(self, prompt, schema=None, model=None, cache=True):
+        """Async generate_json, limited to AI_MAX_CONCURRENCY requests in flight."""
+        try:
+            model = model or self.default_model
+            client = self._async_client()
             
-            # Find and extract JSON
-            import re
-            json_match = re.search(r'```json\s*([\s\S]*?)\s*```', response_text)
-            if json_match:
-                json_str = json_match.group(1)
-            else:
-                json_str = response_text
+            system_prompt = "Respond with valid JSON."
+            if schema:
+                system_prompt += f" Use this schema: {json.dumps(schema)}"
+            
+            # Anthropic needs explicit instructions for JSON format in the prompt
+            json_prompt = f"{prompt}\n\nPlease format your entire response as a valid JSON object."
             
-            # Clean and parse
-            try:
-                return json.loads(json_str)
-            except json.JSONDecodeError:
-                # Try to fix common JSON issues
-                fixed_json = re.sub(r'([{,])\s*([a-zA-Z0-9_]+)\s*:', r'\1"\2":', json_str)
-                return json.loads(fixed_json)
+            async def complete():
+                async with self._semaphore:
+                    message = await client.messages.create(
+                        model=model,
+                        max_tokens=1000,
+                        system=system_prompt,
+                        messages=[
+                            {"role": "user", "content": json_prompt}
+                        ]
+                    )
+                return self._parse_json(message.content[0].text)
+            
+            return await self._acached(cache, complete, model, "json", prompt, schema, 1000)
         except Exception as e:
             logger.error(f"Error generating JSON with Anthropic: {e}")
             return {"error": str(e)}
     
+    def _parse_json(self, response_text):
+        """Extract and parse the JSON object in a response."""
+        # Find and extract JSON
+        json_match = re.search(r'```json\s*([\s\S]*?)\s*```', response_text)
+        if json_match:
+            json_str = json_match.group(1)
+        else:
+            json_str = response_text
+        
+        # Clean and parse
+        try:
+            return json.loads(json_str)
+        except json.JSONDecodeError:
+            # Try to fix common JSON issues
+            fixed_json = re.sub(r'([{,])\s*([a-zA-Z0-9_]+)\s*:', r'\1"\2":', json_str)
+            return json.loads(fixed_json)
+    
     def analyze_image(self, image_data, prompt="Describe this image in detail"):
         """Analyze an image and provide a description."""
         try:
@@ -130,7 +212,7 @@ class AnthropicService:
             return f"Error analyzing image: {str(e)}"
 
 def get_service():
-    """Get an instance of the Anthropic service."""
+    """Get a new instance of the Anthropic service."""
     if is_available():
         try:
             return AnthropicService()
@@ -0,0 +1,119 @@
+"""
+Async Bridge
+
+This module runs one asyncio event loop per process in a background thread, so
+synchronous Flask routes can hand AI calls to the provider services' async clients.
+A route thread submits a coroutine and waits for its result while the loop keeps many
+provider requests in flight at once; fan_out runs a batch of calls concurrently.
+"""
+
+import os
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Requests in flight per provider service on the shared loop
+DEFAULT_MAX_CONCURRENCY = 32
+
+
+def max_concurrency():
+    """Get the per-provider limit on concurrent async requests from the environment."""
+    return int(os.environ.get("AI_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY))
+
+
+async def fan_out(call, items):
+    """
+    Await call(item) for every item concurrently.
+
+    Returns:
+        list: Results in the order of items; an exception is returned in place of its result
+    """
+    return await asyncio.gather(*(call(item) for item in items), return_exceptions=True)
+
+
+class AsyncBridge:
+    """Background event loop that synchronous code submits coroutines to."""
+
+    def __init__(self, name="ai-event-loop"):
+        """Initialize the bridge. The loop thread starts on first use."""
+        self.name = name
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._submitted = 0
+        self._in_flight = 0
+
+    def _ensure_running(self):
+        """Start the loop thread if it is not running."""
+        if self._thread is not None and self._thread.is_alive():
+            return self._loop
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name=self.name, daemon=True)
+                self._thread.start()
+                logger.info("AI event loop started")
+        return self._loop
+
+    def submit(self, coroutine):
+        """
+        Schedule a coroutine on the loop.
+
+        Returns:
+            concurrent.futures.Future: Future of the coroutine's result
+        """
+        loop = self._ensure_running()
+        with self._lock:
+            self._submitted += 1
+            self._in_flight += 1
+        future = asyncio.run_coroutine_threadsafe(coroutine, loop)
+        future.add_done_callback(self._finished)
+        return future
+
+    def _finished(self, future):
+        """Count a submitted coroutine as finished."""
+        with self._lock:
+            self._in_flight -= 1
+
+    def run(self, coroutine, timeout=None):
+        """
+        Run a coroutine on the loop and wait for its result.
+
+        Raises:
+            concurrent.futures.TimeoutError: If it does not finish within timeout seconds;
+                the coroutine is cancelled
+        """
+        future = self.submit(coroutine)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    def stop(self):
+        """Stop the loop thread."""
+        with self._lock:
+            if self._loop is not None and self._thread is not None:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join(timeout=5)
+            self._thread = None
+            self._loop = None
+
+    def stats(self):
+        """Get the loop's state and the number of submitted coroutines still running."""
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "submitted": self._submitted,
+            "in_flight": self._in_flight,
+            "max_concurrency": max_concurrency()
+        }
+
+
+_bridge = AsyncBridge()
+
+
+def get_bridge():
+    """Get the process-wide bridge."""
+    return _bridge
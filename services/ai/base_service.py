@@ -0,0 +1,156 @@
+"""
+AI Provider Service Base
+
+This module provides the scaffolding every AI provider service shares: the pooled sync
+client, the async client built on the shared event loop, response caching, closing and
+streaming with caching. Provider services subclass BaseAIService and supply only their
+SDK clients and provider-specific request code.
+"""
+
+import asyncio
+import logging
+
+from services.ai.async_bridge import get_bridge, max_concurrency
+from services.ai.provider_pool import create_async_http_client, create_http_client
+from services.ai.response_cache import cache_key, get_response_cache
+
+logger = logging.getLogger(__name__)
+
+
+def _log_close_error(future):
+    """Log a failure to close an async client."""
+    if not future.cancelled() and future.exception() is not None:
+        logger.warning(f"Error closing async AI client: {future.exception()}")
+
+
+class BaseAIService:
+    """Shared client, cache and streaming scaffolding of the provider services."""
+
+    # Provider name used in cache keys, and its display name for logs
+    PROVIDER = None
+    DISPLAY_NAME = None
+
+    def __init__(self, api_key, default_model):
+        """
+        Initialize the service.
+
+        Args:
+            api_key (str): Provider API key
+            default_model (str): Model used when a request names none
+        """
+        self.api_key = api_key
+        # Requests go through one keep-alive connection pool for the life of the service
+        self.http_client = create_http_client()
+        self.client = self._create_client(self.http_client)
+        self.default_model = default_model
+        # Async client for the shared event loop (see async_bridge), built on first use
+        self.async_client = None
+        self._semaphore = None
+        # Shared with every other provider service; None when caching is disabled
+        self.cache = get_response_cache()
+        logger.info(f"{self.DISPLAY_NAME} service initialized")
+
+    def _client_kwargs(self, http_client):
+        """Get the SDK client arguments, leaving the HTTP client to the SDK when none is given."""
+        if http_client is not None:
+            return {"api_key": self.api_key, "http_client": http_client}
+        return {"api_key": self.api_key}
+
+    def _create_client(self, http_client):
+        """Create the provider's sync SDK client."""
+        raise NotImplementedError
+
+    def _create_async_client(self, http_client):
+        """Create the provider's async SDK client."""
+        raise NotImplementedError
+
+    def _stream(self, model, prompt, max_tokens):
+        """
+        Yield the text chunks of a completion as the provider produces them.
+
+        Closing the generator must close the upstream stream.
+        """
+        raise NotImplementedError
+
+    def _cached(self, use_cache, compute, model, kind, prompt, schema=None, max_tokens=None):
+        """Answer a request from the response cache, calling compute() on a miss."""
+        if self.cache is None:
+            return compute()
+        if not use_cache:
+            self.cache.record_bypass()
+            return compute()
+        key = cache_key(self.PROVIDER, model, kind, prompt, schema, max_tokens)
+        return self.cache.get_or_compute(key, compute)
+
+    async def _acached(self, use_cache, compute, model, kind, prompt, schema=None, max_tokens=None):
+        """
+        Async _cached: answer from the response cache, awaiting compute() on a miss.
+
+        The cache's SQLite tier blocks, so lookups and stores run in a worker thread
+        rather than on the shared event loop.
+        """
+        if self.cache is None:
+            return await compute()
+        if not use_cache:
+            self.cache.record_bypass()
+            return await compute()
+        key = cache_key(self.PROVIDER, model, kind, prompt, schema, max_tokens)
+        value = await asyncio.to_thread(self.cache.get, key)
+        if value is None:
+            value = await compute()
+            if value is not None:
+                await asyncio.to_thread(self.cache.put, key, value)
+        return value
+
+    def _async_client(self):
+        """Get the async client, built on first use inside the shared event loop."""
+        if self.async_client is None:
+            self.async_client = self._create_async_client(create_async_http_client())
+            self._semaphore = asyncio.Semaphore(max_concurrency())
+        return self.async_client
+
+    def close(self):
+        """Close the service's sync and async clients and their connection pools."""
+        try:
+            self.client.close()
+        except Exception as e:
+            logger.warning(f"Error closing {self.DISPLAY_NAME} client: {e}")
+        async_client, self.async_client = self.async_client, None
+        if async_client is not None:
+            # The async client's connections belong to the shared event loop
+            future = get_bridge().submit(async_client.close())
+            future.add_done_callback(_log_close_error)
+
+    def stream_text(self, prompt, max_tokens=1000, model=None, cache=True):
+        """
+        Generate text from a prompt, yielding chunks as the provider produces them.
+
+        Closing the generator (e.g. when the client disconnects) closes the upstream
+        stream. A cached response is yielded as one chunk, and a completed stream is
+        cached like generate_text. Errors are raised to the caller.
+        """
+        model = model or self.default_model
+        key = None
+        if self.cache is not None and cache:
+            key = cache_key(self.PROVIDER, model, "text", prompt, None, max_tokens)
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+        elif self.cache is not None:
+            self.cache.record_bypass()
+
+        stream = self._stream(model, prompt, max_tokens)
+        chunks = []
+        try:
+            for text in stream:
+                chunks.append(text)
+                yield text
+        except GeneratorExit:
+            logger.info(f"{self.DISPLAY_NAME} text stream cancelled by the caller")
+            raise
+        finally:
+            stream.close()
+
+        if key is not None:
+            self.cache.put(key, "".join(chunks))
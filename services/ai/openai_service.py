@@ -8,11 +8,15 @@ import os
 import logging
 import json
 
+from services.ai.base_service import BaseAIService
+
 logger = logging.getLogger(__name__)
 
+API_KEY_ENV = "OPENAI_API_KEY"
+
 # Check if OpenAI Python package is installed
 try:
-    from openai import OpenAI
+    from openai import AsyncOpenAI, OpenAI
     OPENAI_AVAILABLE = True
 except ImportError:
     OPENAI_AVAILABLE = False
@@ -20,43 +24,96 @@ except ImportError:
 
 def is_available():
     """Check if OpenAI service is available."""
-    api_key = os.environ.get("OPENAI_API_KEY")
+    api_key = os.environ.get(API_KEY_ENV)
     return OPENAI_AVAILABLE and api_key is not None
 
-class OpenAIService:
+class OpenAIService(BaseAIService):
     """Service for OpenAI integration."""
     
+    PROVIDER = "openai"
+    DISPLAY_NAME = "OpenAI"
+    
     def __init__(self):
         """Initialize the OpenAI service."""
         if not is_available():
             raise ValueError("OpenAI service is not available")
         
-        self.api_key = os.environ.get("OPENAI_API_KEY")
-        self.client = OpenAI(api_key=self.api_key)
-        self.default_model = "gpt-4o"  # the newest OpenAI model is "gpt-4o" which was released May 13, 2024
-        logger.info("OpenAI service initialized")
+        # the newest OpenAI model is "gpt-4o" which was released May 13, 2024
+        super().__init__(os.environ.get(API_KEY_ENV), "gpt-4o")
+    
+    def _create_client(self, http_client):
+        """Create the sync OpenAI client."""
+        return OpenAI(**self._client_kwargs(http_client))
+    
+    def _create_async_client(self, http_client):
+        """Create the async OpenAI client."""
+        return AsyncOpenAI(**self._client_kwargs(http_client))
     
-    def generate_text(self, prompt, max_tokens=1000, model=None):
-        """Generate text from a prompt."""
+    def generate_text(self, prompt, max_tokens=1000, model=None, cache=True):
+        """Generate text from a prompt. Pass cache=False to bypass the response cache."""
         try:
             model = model or self.default_model
             
-            response = self.client.chat.completions.create(
-                model=model,
-                messages=[
-                    {"role": "system", "content": "You are a helpful AI assistant."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=max_tokens
-            )
+            def complete():
+                response = self.client.chat.completions.create(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": "You are a helpful AI assistant."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    max_tokens=max_tokens
+                )
+                return response.choices[0].message.content
             
-            return response.choices[0].message.content
+            return self._cached(cache, complete, model, "text", prompt, max_tokens=max_tokens)
+        except Exception as e:
+            logger.error(f"Error generating text with OpenAI: {e}")
+            return f"Error generating text: {str(e)}"
+    
+    async def agenerate_text(self, prompt, max_tokens=1000, model=None, cache=True):
+        """Async generate_text, limited to AI_MAX_CONCURRENCY requests in flight."""
+        try:
+            model = model or self.default_model
+            client = self._async_client()
+            
+            async def complete():
+                async with self._semaphore:
+                    response = await client.chat.completions.create(
+                        model=model,
+                        messages=[
+                            {"role": "system", "content": "You are a helpful AI assistant."},
+                            {"role": "user", "content": prompt}
+                        ],
+                        max_tokens=max_tokens
+                    )
+                return response.choices[0].message.content
+            
+            return await self._acached(cache, complete, model, "text", prompt, max_tokens=max_tokens)
         except Exception as e:
             logger.error(f"Error generating text with OpenAI: {e}")
             return f"Error generating text: {str(e)}"
     
-    def generate_json(self, prompt, schema=None, model=None):
-        """Generate JSON-formatted response from a prompt."""
+    def _stream(self, model, prompt, max_tokens):
+        """Yield the text chunks of a streamed chat completion."""
+        stream = self.client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": "You are a helpful AI assistant."},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=max_tokens,
+            stream=True
+        )
+        try:
+            for chunk in stream:
+                text = chunk.choices[0].delta.content if chunk.choices else None
+                if text:
+                    yield text
+        finally:
+            stream.close()
+    
+    def generate_json(self, prompt, schema=None, model=None, cache=True):
+        """Generate JSON-formatted response from a prompt. Pass cache=False to bypass the response cache."""
         try:
             model = model or self.default_model
             
@@ -64,17 +121,47 @@ class OpenAIService:
             if schema:
                 system_message += f" Use this schema: {json.dumps(schema)}"
             
-            response = self.client.chat.completions.create(
-                model=model,
-                messages=[
-                    {"role": "system", "content": system_message},
-                    {"role": "user", "content": prompt}
-                ],
-                response_format={"type": "json_object"},
-                max_tokens=1000
-            )
+            def complete():
+                response = self.client.chat.completions.create(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": system_message},
+                        {"role": "user", "content": prompt}
+                    ],
+                    response_format={"type": "json_object"},
+                    max_tokens=1000
+                )
+                return json.loads(response.choices[0].message.content)
+            
+            return self._cached(cache, complete, model, "json", prompt, schema, 1000)
+        except Exception as e:
+            logger.error(f"Error generating JSON with OpenAI: {e}")
+            return {"error": str(e)}
+    
+    async def agenerate_json(self, prompt, schema=None, model=None, cache=True):
+        """Async generate_json, limited to AI_MAX_CONCURRENCY requests in flight."""
+        try:
+            model = model or self.default_model
+            client = self._async_client()
+            
+            system_message = "You are a helpful AI assistant. Respond with valid JSON."
+            if schema:
+                system_message += f" Use this schema: {json.dumps(schema)}"
+            
+            async def complete():
+                async with self._semaphore:
+                    response = await client.chat.completions.create(
+                        model=model,
+                        messages=[
+                            {"role": "system", "content": system_message},
+                            {"role": "user", "content": prompt}
+                        ],
+                        response_format={"type": "json_object"},
+                        max_tokens=1000
+                    )
+                return json.loads(response.choices[0].message.content)
             
-            return json.loads(response.choices[0].message.content)
+            return await self._acached(cache, complete, model, "json", prompt, schema, 1000)
         except Exception as e:
             logger.error(f"Error generating JSON with OpenAI: {e}")
             return {"error": str(e)}
@@ -105,7 +192,7 @@ class OpenAIService:
             return f"Error analyzing image: {str(e)}"
 
 def get_service():
-    """Get an instance of the OpenAI service."""
+    """Get a new instance of the OpenAI service."""
     if is_available():
         try:
             return OpenAIService()
@@ -0,0 +1,305 @@
+"""
+AI Provider Pool
+
+This module keeps one long-lived service instance per AI provider for the whole process.
+Provider modules are imported once and each service's SDK client is built once, on a
+shared HTTP connection pool with keep-alive, so requests reuse warm connections instead
+of building a client and doing a TLS handshake every time. Provider availability is
+re-checked when the cached result is older than the re-check interval, and a rotated
+API key rebuilds the service. Callers lease a service while they use it, and a replaced
+service is closed only once its last lease is released, so requests already in flight
+on other threads finish on their own client.
+"""
+
+import os
+import contextlib
+import logging
+import importlib
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+# Seconds a provider's availability is trusted before it is checked again
+DEFAULT_RECHECK_INTERVAL = 60.0
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_MAX_KEEPALIVE = 20
+# Idle connections are kept open this many seconds so bursts of requests reuse them
+DEFAULT_KEEPALIVE_EXPIRY = 60.0
+
+
+def pool_limits():
+    """Get the HTTP connection pool limits from the environment."""
+    return {
+        "max_connections": int(os.environ.get("AI_HTTP_MAX_CONNECTIONS", DEFAULT_MAX_CONNECTIONS)),
+        "max_keepalive_connections": int(os.environ.get("AI_HTTP_MAX_KEEPALIVE", DEFAULT_MAX_KEEPALIVE)),
+        "keepalive_expiry": float(os.environ.get("AI_HTTP_KEEPALIVE_EXPIRY", DEFAULT_KEEPALIVE_EXPIRY))
+    }
+
+
+def create_http_client():
+    """
+    Create the HTTP client a provider SDK client sends its requests through.
+
+    Returns:
+        httpx.Client: Client with the configured pool limits, or None to use the SDK default
+    """
+    if not HTTPX_AVAILABLE:
+        return None
+    return httpx.Client(limits=httpx.Limits(**pool_limits()))
+
+
+def create_async_http_client():
+    """Create the async counterpart of create_http_client, or None to use the SDK default."""
+    if not HTTPX_AVAILABLE:
+        return None
+    return httpx.AsyncClient(limits=httpx.Limits(**pool_limits()))
+
+
+def connection_stats(http_client):
+    """
+    Get the open and idle connection counts of an HTTP client, where it exposes them.
+
+    The counts come from httpx's private transport internals, so any failure to read them
+    yields no counts rather than an error.
+    """
+    try:
+        pool = getattr(getattr(http_client, "_transport", None), "_pool", None)
+        connections = getattr(pool, "connections", None)
+        if connections is None:
+            return {}
+        # Snapshot the list; the pool changes it while requests run
+        connections = list(connections)
+        return {
+            "open_connections": len(connections),
+            "idle_connections": sum(1 for connection in connections if connection.is_idle())
+        }
+    except Exception as e:
+        logger.debug(f"Could not read HTTP connection pool statistics: {e}")
+        return {}
+
+
+def close_service(provider_name, service):
+    """Close a service the pool no longer hands out, if it supports closing."""
+    close = getattr(service, "close", None)
+    if close is None:
+        return
+    try:
+        close()
+        logger.info(f"Closed retired {provider_name} service")
+    except Exception as e:
+        logger.warning(f"Error closing retired {provider_name} service: {e}")
+
+
+class ProviderPool:
+    """Process-wide cache of AI provider services."""
+
+    def __init__(self, providers, recheck_interval=None, clock=time.monotonic):
+        """
+        Initialize the pool. Nothing is imported or built until a provider is requested.
+
+        Args:
+            providers (list): Provider names; each maps to the module services.ai.<name>_service
+            recheck_interval (float, optional): Seconds between availability checks, from
+                AI_PROVIDER_RECHECK_INTERVAL by default
+            clock (callable): Monotonic clock in seconds
+        """
+        if recheck_interval is None:
+            recheck_interval = float(os.environ.get("AI_PROVIDER_RECHECK_INTERVAL", DEFAULT_RECHECK_INTERVAL))
+        self.recheck_interval = recheck_interval
+        self.clock = clock
+        self._lock = threading.Lock()
+        # Service -> number of callers using it
+        self._leases = {}
+        # Replaced service -> provider name, for services to close on their last release
+        self._retiring = {}
+        self._entries = {
+            name: {
+                "module": None,
+                "service": None,
+                "credential": None,
+                "available": False,
+                "checked_at": None,
+                "created": 0,
+                "requests": 0,
+                "last_error": None
+            }
+            for name in providers
+        }
+
+    def get(self, provider_name):
+        """
+        Get the shared service of a provider without leasing it.
+
+        The pool may close the service when it is replaced, so callers that keep using it
+        should lease it instead.
+
+        Returns:
+            object: The provider service, or None if it is not available
+        """
+        return self._take(provider_name, lease=False)
+
+    def acquire(self, provider_name):
+        """
+        Lease the shared service of a provider; it stays open until release() is called.
+
+        Returns:
+            object: The provider service, or None if it is not available
+        """
+        return self._take(provider_name, lease=True)
+
+    def release(self, service):
+        """Return a leased service, closing it if it was replaced and this was its last lease."""
+        with self._lock:
+            count = self._leases[service] - 1
+            if count:
+                self._leases[service] = count
+                return
+            del self._leases[service]
+            provider_name = self._retiring.pop(service, None)
+        if provider_name is not None:
+            close_service(provider_name, service)
+
+    @contextlib.contextmanager
+    def lease(self, provider_name):
+        """Lease a provider's service for the duration of a with block; yields None if unavailable."""
+        service = self.acquire(provider_name)
+        try:
+            yield service
+        finally:
+            if service is not None:
+                self.release(service)
+
+    def _take(self, provider_name, lease):
+        """Get a provider's service, re-checking it if due, and optionally lease it."""
+        entry = self._entries.get(provider_name)
+        if entry is None:
+            return None
+        checked_at = entry["checked_at"]
+        if checked_at is None or self.clock() - checked_at >= self.recheck_interval:
+            retired = self._refresh(provider_name, entry)
+            if retired is not None:
+                self._retire(provider_name, retired)
+        with self._lock:
+            service = entry["service"]
+            if service is not None:
+                entry["requests"] += 1
+                if lease:
+                    self._leases[service] = self._leases.get(service, 0) + 1
+        return service
+
+    def _retire(self, provider_name, service):
+        """Close a service the pool no longer hands out, or defer that to its last release."""
+        with self._lock:
+            # No new lease can start: the service is already out of its entry
+            if self._leases.get(service):
+                self._retiring[service] = provider_name
+                logger.info(f"Closing retired {provider_name} service once its requests finish")
+                return
+        close_service(provider_name, service)
+
+    def _refresh(self, provider_name, entry):
+        """
+        Re-check a provider's availability and (re)build its service if needed.
+
+        Returns:
+            object: The service this replaced or dropped, for the caller to retire outside
+                the lock, or None
+        """
+        with self._lock:
+            previous = entry["service"]
+            self._check(provider_name, entry)
+            current = entry["service"]
+        return previous if previous is not None and previous is not current else None
+
+    def _check(self, provider_name, entry):
+        """Re-check a provider and (re)build its service if needed. Caller holds the lock."""
+        now = self.clock()
+        if entry["checked_at"] is not None and now - entry["checked_at"] < self.recheck_interval:
+            return
+        try:
+            if entry["module"] is None:
+                entry["module"] = importlib.import_module(f"services.ai.{provider_name}_service")
+            module = entry["module"]
+
+            is_available_func = getattr(module, "is_available", None)
+            available = bool(is_available_func and is_available_func())
+            entry["available"] = available
+            if not available:
+                if entry["service"] is not None:
+                    logger.info(f"{provider_name} is no longer available")
+                entry["service"] = None
+                entry["credential"] = None
+                logger.debug(f"{provider_name} is not available")
+                return
+
+            # A rotated API key needs a new client
+            credential = os.environ.get(getattr(module, "API_KEY_ENV", ""), "")
+            if entry["service"] is not None and credential == entry["credential"]:
+                return
+            get_service_func = getattr(module, "get_service", None)
+            if get_service_func is None:
+                logger.warning(f"No get_service function in {provider_name}_service")
+                return
+            entry["service"] = get_service_func()
+            entry["credential"] = credential if entry["service"] is not None else None
+            if entry["service"] is not None:
+                entry["created"] += 1
+                entry["last_error"] = None
+                logger.info(f"Created pooled {provider_name} service")
+        except ImportError:
+            entry["last_error"] = f"Could not import {provider_name}_service"
+            logger.warning(entry["last_error"])
+        except Exception as e:
+            entry["last_error"] = str(e)
+            logger.error(f"Error getting {provider_name} service: {e}")
+        finally:
+            # Set last, so concurrent callers never see a fresh check without its service
+            entry["checked_at"] = now
+
+    def reset(self, provider_name=None):
+        """Drop cached services, closing them, so the next request rebuilds them."""
+        retired = []
+        with self._lock:
+            for name, entry in self._entries.items():
+                if provider_name is None or name == provider_name:
+                    if entry["service"] is not None:
+                        retired.append((name, entry["service"]))
+                    entry["service"] = None
+                    entry["credential"] = None
+                    entry["checked_at"] = None
+        for name, service in retired:
+            self._retire(name, service)
+
+    def stats(self):
+        """Get per-provider availability, client reuse and connection pool statistics."""
+        now = self.clock()
+        providers = {}
+        with self._lock:
+            entries = {name: dict(entry) for name, entry in self._entries.items()}
+            retiring = list(self._retiring.values())
+            leases = dict(self._leases)
+        for name, entry in entries.items():
+            service = entry["service"]
+            providers[name] = {
+                "available": entry["available"],
+                "pooled": service is not None,
+                "clients_created": entry["created"],
+                "requests": entry["requests"],
+                "in_use": leases.get(service, 0) if service is not None else 0,
+                "retiring": retiring.count(name),
+                "checked_seconds_ago": None if entry["checked_at"] is None else round(now - entry["checked_at"], 3),
+                "last_error": entry["last_error"],
+                **connection_stats(getattr(service, "http_client", None))
+            }
+        return {
+            "recheck_interval": self.recheck_interval,
+            "http_pool_limits": pool_limits() if HTTPX_AVAILABLE else None,
+            "providers": providers
+        }
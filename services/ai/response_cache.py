@@ -0,0 +1,296 @@
+"""
+AI Response Cache
+
+This module provides a two-tier cache of AI provider responses. Identical requests
+(same provider, model, request kind, prompt, schema and max_tokens) are answered from an
+in-memory LRU tier, then from a SQLite tier that survives restarts, before they reach the
+provider. Entries expire after a TTL, both tiers evict the least recently used entries
+once they exceed their size budget, and hits and misses are counted per tier.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 3600.0
+DEFAULT_MEMORY_ENTRIES = 1024
+DEFAULT_MEMORY_BYTES = 16 * 1024 * 1024
+DEFAULT_DISK_BYTES = 100 * 1024 * 1024
+DEFAULT_PATH = "data/ai_cache.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at);
+-- Encoded bytes of every response, kept up to date by triggers in the writing transaction
+CREATE TABLE IF NOT EXISTS cache_size (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    bytes INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_size (id, bytes) SELECT 0, COALESCE(SUM(size), 0) FROM responses;
+CREATE TRIGGER IF NOT EXISTS responses_size_insert AFTER INSERT ON responses BEGIN
+    UPDATE cache_size SET bytes = bytes + new.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS responses_size_update AFTER UPDATE OF size ON responses BEGIN
+    UPDATE cache_size SET bytes = bytes + new.size - old.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS responses_size_delete AFTER DELETE ON responses BEGIN
+    UPDATE cache_size SET bytes = bytes - old.size WHERE id = 0;
+END;
+"""
+
+
+def cache_key(provider, model, kind, prompt, schema=None, max_tokens=None):
+    """Get the canonical cache key of a request."""
+    canonical = json.dumps([provider, model, kind, prompt, schema, max_tokens],
+                           sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """In-memory LRU tier in front of a SQLite tier, both with TTLs and size limits."""
+
+    def __init__(self, path=DEFAULT_PATH, ttl=DEFAULT_TTL, memory_entries=DEFAULT_MEMORY_ENTRIES,
+                 memory_bytes=DEFAULT_MEMORY_BYTES, disk_bytes=DEFAULT_DISK_BYTES, clock=time.time):
+        """
+        Initialize the cache.
+
+        Args:
+            path (str, optional): SQLite file of the disk tier; None keeps only the memory tier
+            ttl (float): Seconds a response stays valid
+            memory_entries (int): Maximum entries in the memory tier
+            memory_bytes (int): Maximum encoded bytes in the memory tier
+            disk_bytes (int): Maximum encoded bytes in the disk tier
+            clock (callable): Wall clock in seconds
+        """
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.clock = clock
+        self._lock = threading.Lock()
+        # Key -> (encoded value, expires_at), least recently used first
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "bypassed": 0,
+            "expired": 0,
+            "memory_evictions": 0,
+            "disk_evictions": 0
+        }
+        self._conn = None
+        self._disk_size = 0
+        if path:
+            try:
+                if path != ":memory:":
+                    Path(path).parent.mkdir(parents=True, exist_ok=True)
+                self._conn = sqlite3.connect(path, check_same_thread=False)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+                self._conn.executescript(SCHEMA)
+                self._conn.execute("DELETE FROM responses WHERE expires_at <= ?", (self.clock(),))
+                self._conn.commit()
+                self._disk_size = self._read_disk_size()
+            except sqlite3.Error as e:
+                logger.error(f"Error opening AI response cache, keeping it in memory only: {e}")
+                self._conn = None
+
+    def get(self, key, record_miss=True):
+        """
+        Get a cached response.
+
+        Args:
+            key (str): Cache key
+            record_miss (bool): Count a miss; a caller that looks ahead of the provider
+                service, which then counts the miss itself, passes False
+
+        Returns:
+            The decoded response, or None on a miss
+        """
+        now = self.clock()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._memory.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    return json.loads(entry[0])
+                self._drop_memory(key)
+                self._counters["expired"] += 1
+
+            if self._conn is not None:
+                try:
+                    row = self._conn.execute(
+                        "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row is not None and row[1] > now:
+                        self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                        self._conn.commit()
+                        self._store_memory(key, row[0], row[1])
+                        self._counters["disk_hits"] += 1
+                        return json.loads(row[0])
+                    if row is not None:
+                        self._delete_disk([key])
+                        self._counters["expired"] += 1
+                except sqlite3.Error as e:
+                    logger.error(f"Error reading AI response cache: {e}")
+
+            if record_miss:
+                self._counters["misses"] += 1
+            return None
+
+    def put(self, key, value, ttl=None):
+        """Cache a JSON-serialisable response in both tiers."""
+        encoded = json.dumps(value, separators=(",", ":"))
+        now = self.clock()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._store_memory(key, encoded, expires_at)
+            self._counters["stores"] += 1
+            if self._conn is None:
+                return
+            try:
+                # An upsert, not INSERT OR REPLACE: replace deletes don't fire the size triggers
+                self._conn.execute(
+                    "INSERT INTO responses (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET value = excluded.value, size = excluded.size, "
+                    "expires_at = excluded.expires_at, accessed_at = excluded.accessed_at",
+                    (key, encoded, len(encoded), expires_at, now)
+                )
+                self._evict_disk(now)
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Error writing AI response cache: {e}")
+
+    def get_or_compute(self, key, compute, ttl=None):
+        """Return the cached response for key, or call compute() and cache its result."""
+        value = self.get(key)
+        if value is not None:
+            return value
+        value = compute()
+        if value is not None:
+            self.put(key, value, ttl)
+        return value
+
+    def record_bypass(self):
+        """Count a request that opted out of the cache."""
+        with self._lock:
+            self._counters["bypassed"] += 1
+
+    def _store_memory(self, key, encoded, expires_at):
+        """Add an entry to the memory tier and evict over budget. Caller holds the lock."""
+        if key in self._memory:
+            self._drop_memory(key)
+        if len(encoded) > self.memory_bytes:
+            return
+        self._memory[key] = (encoded, expires_at)
+        self._memory_size += len(encoded)
+        while len(self._memory) > self.memory_entries or self._memory_size > self.memory_bytes:
+            oldest = next(iter(self._memory))
+            self._drop_memory(oldest)
+            self._counters["memory_evictions"] += 1
+
+    def _drop_memory(self, key):
+        """Remove an entry from the memory tier. Caller holds the lock."""
+        encoded, _ = self._memory.pop(key)
+        self._memory_size -= len(encoded)
+
+    def _read_disk_size(self):
+        """Get the encoded bytes in the disk tier, written by every process sharing the file."""
+        return self._conn.execute("SELECT bytes FROM cache_size WHERE id = 0").fetchone()[0]
+
+    def _delete_disk(self, keys):
+        """Remove entries from the disk tier. Caller holds the lock."""
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", [(key,) for key in keys])
+        self._disk_size = self._read_disk_size()
+        self._conn.commit()
+
+    def _evict_disk(self, now):
+        """Drop expired entries, then least recently used ones, until the disk tier fits. Caller holds the lock."""
+        # Other worker processes write to the same file, so read the shared total
+        self._disk_size = self._read_disk_size()
+        if self._disk_size <= self.disk_bytes:
+            return
+        self._conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+        self._disk_size = self._read_disk_size()
+        excess = self._disk_size - self.disk_bytes
+        if excess <= 0:
+            return
+        victims, freed = [], 0
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            if freed >= excess:
+                break
+            victims.append((key,))
+            freed += size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+        self._disk_size -= freed
+        self._counters["disk_evictions"] += len(victims)
+
+    def clear(self):
+        """Drop every cached response."""
+        with self._lock:
+            self._memory.clear()
+            self._memory_size = 0
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM responses")
+                self._conn.commit()
+                self._disk_size = 0
+
+    def stats(self):
+        """Get hit/miss counters and tier sizes."""
+        with self._lock:
+            counters = dict(self._counters)
+            lookups = counters["memory_hits"] + counters["disk_hits"] + counters["misses"]
+            return {
+                **counters,
+                "hit_ratio": (counters["memory_hits"] + counters["disk_hits"]) / lookups if lookups else None,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_size,
+                "disk_enabled": self._conn is not None,
+                "disk_bytes": self._disk_size,
+                "ttl": self.ttl
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """
+    Get the process-wide response cache, configured from the environment.
+
+    Returns:
+        ResponseCache: The shared cache, or None if AI_CACHE_ENABLED=0
+    """
+    global _cache
+    if os.environ.get("AI_CACHE_ENABLED", "1") == "0":
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(
+                    path=os.environ.get("AI_CACHE_PATH", DEFAULT_PATH) or None,
+                    ttl=float(os.environ.get("AI_CACHE_TTL", DEFAULT_TTL)),
+                    memory_entries=int(os.environ.get("AI_CACHE_MEMORY_ENTRIES", DEFAULT_MEMORY_ENTRIES)),
+                    memory_bytes=int(os.environ.get("AI_CACHE_MEMORY_BYTES", DEFAULT_MEMORY_BYTES)),
+                    disk_bytes=int(float(os.environ.get("AI_CACHE_MAX_DISK_MB", DEFAULT_DISK_BYTES / 2 ** 20)) * 2 ** 20)
+                )
+    return _cache
@@ -0,0 +1,186 @@
+"""
+Single-Flight Request Coalescing
+
+This module collapses concurrent identical AI requests into one upstream call. The first
+caller with a given request key runs the call; callers arriving with the same key while
+it is in flight wait for it and receive the same result, or the same exception. Thread
+callers (do) and coroutines on the shared event loop (ado) share one in-flight map, so a
+batch prompt joins a route's identical call and the reverse. Nothing is kept once the
+call finishes, so this complements the response cache rather than replacing it: it
+covers the window before the first response has been cached.
+"""
+
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """An in-flight call and the callers waiting on it."""
+
+    __slots__ = ("done", "result", "error", "waiters", "futures")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+        # (event loop, future) of each coroutine waiting on the call
+        self.futures = []
+
+
+def _resolve(future, call):
+    """Hand a finished call's outcome to a waiting coroutine. Runs on the future's loop."""
+    if future.done():
+        return
+    if call.error is not None:
+        future.set_exception(call.error)
+    else:
+        future.set_result(call.result)
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key."""
+
+    def __init__(self, enabled=True):
+        """
+        Initialize the coalescer.
+
+        Args:
+            enabled (bool): When False every call runs on its own and is only counted
+        """
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._counters = {
+            "requests": 0,
+            "cache_hits": 0,
+            "upstream_calls": 0,
+            "coalesced": 0,
+            "max_waiters": 0
+        }
+
+    def _join(self, key, loop=None):
+        """
+        Register a caller of key.
+
+        Args:
+            key (str): Canonical request key
+            loop (asyncio.AbstractEventLoop, optional): Loop of a coroutine caller, which
+                waits on a future instead of the call's event
+
+        Returns:
+            tuple: (call, whether the caller leads it, future to await or None)
+        """
+        with self._lock:
+            self._counters["requests"] += 1
+            call = self._calls.get(key) if self.enabled else None
+            if call is not None:
+                call.waiters += 1
+                self._counters["coalesced"] += 1
+                self._counters["max_waiters"] = max(self._counters["max_waiters"], call.waiters)
+                future = None
+                if loop is not None:
+                    future = loop.create_future()
+                    call.futures.append((loop, future))
+                return call, False, future
+            call = _Call()
+            if self.enabled:
+                self._calls[key] = call
+            self._counters["upstream_calls"] += 1
+            return call, True, None
+
+    def _finish(self, key, call):
+        """Retire a finished call and wake every caller waiting on it."""
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+            futures, call.futures = call.futures, []
+        call.done.set()
+        for loop, future in futures:
+            try:
+                loop.call_soon_threadsafe(_resolve, future, call)
+            except RuntimeError:
+                # The waiter's loop has been closed
+                pass
+
+    def do(self, key, fn):
+        """
+        Run fn() once for all concurrent callers with the same key.
+
+        Args:
+            key (str): Canonical request key
+            fn (callable): Performs the upstream call
+
+        Returns:
+            The result of fn(), shared by every caller that joined the call
+
+        Raises:
+            Exception: The exception raised by fn(), re-raised in every caller
+        """
+        call, leader, _ = self._join(key)
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            self._finish(key, call)
+        return call.result
+
+    async def ado(self, key, fn):
+        """
+        Async do(): await fn() once for all concurrent callers with the same key.
+
+        Args:
+            key (str): Canonical request key
+            fn (callable): Returns an awaitable performing the upstream call
+
+        Returns:
+            The result of fn(), shared by every caller that joined the call
+
+        Raises:
+            Exception: The exception raised by fn(), re-raised in every caller
+        """
+        call, leader, future = self._join(key, asyncio.get_running_loop())
+        if not leader:
+            return await future
+
+        try:
+            call.result = await fn()
+        except asyncio.CancelledError:
+            call.error = RuntimeError("Shared request was cancelled")
+            raise
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            self._finish(key, call)
+        return call.result
+
+    def record_cache_hit(self):
+        """Count a request answered from the response cache without joining or making a call."""
+        with self._lock:
+            self._counters["requests"] += 1
+            self._counters["cache_hits"] += 1
+
+    def stats(self):
+        """Get request, cache hit, upstream call and coalescing counters."""
+        with self._lock:
+            counters = dict(self._counters)
+            in_flight = len(self._calls)
+        requests = counters["requests"]
+        return {
+            "enabled": self.enabled,
+            **counters,
+            "coalescing_ratio": counters["coalesced"] / requests if requests else None,
+            "in_flight": in_flight
+        }
@@ -36,6 +36,11 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     });
     
+    // Live updates for the dashboard
+    if (portalCards.length > 0) {
+        subscribePortalEvents();
+    }
+    
     // Recommendation implementation
     const implementButtons = document.querySelectorAll('.implement-btn');
     
@@ -140,3 +145,71 @@ function recordPortalActivity(portalName, activity) {
         console.error('Error recording activity:', error);
     });
 }
+
+/**
+ * Subscribe to the portal event stream and keep portal cards up to date
+ * @returns {EventSource|null} The event source, or null if unsupported
+ */
+function subscribePortalEvents() {
+    if (!window.EventSource) {
+        return null;
+    }
+    
+    // EventSource resends Last-Event-ID on reconnect, so missed events are replayed
+    const source = new EventSource('/api/portal-evolution/events');
+    
+    source.addEventListener('activity', function(event) {
+        const data = JSON.parse(event.data);
+        updatePortalCard(data.portal, data.evolution_score, data.evolution_stage);
+    });
+    
+    source.addEventListener('stage_change', function(event) {
+        const data = JSON.parse(event.data);
+        updatePortalCard(data.portal, data.evolution_score, data.new_stage);
+    });
+    
+    // Events were dropped or cannot be resumed: resync from the status endpoint
+    source.addEventListener('overflow', refreshPortalCards);
+    source.addEventListener('reset', refreshPortalCards);
+    
+    return source;
+}
+
+/**
+ * Reload all portal cards from the status endpoint
+ */
+function refreshPortalCards() {
+    fetch('/api/portal-evolution/status')
+    .then(response => response.json())
+    .then(data => {
+        Object.entries(data.portals || {}).forEach(([name, portal]) => {
+            updatePortalCard(name, portal.evolution_score, portal.evolution_stage);
+        });
+    })
+    .catch(error => {
+        console.error('Error refreshing portals:', error);
+    });
+}
+
+/**
+ * Update the progress bar and stage of a portal card
+ * @param {string} portalName - Name of the portal
+ * @param {number} score - Evolution score
+ * @param {string} stage - Evolution stage
+ */
+function updatePortalCard(portalName, score, stage) {
+    const card = document.querySelector(`.portal-card[data-name="${portalName}"]`);
+    if (!card) {
+        return;
+    }
+    
+    const progress = card.querySelector('.progress-fill');
+    if (progress) {
+        progress.style.width = `${score}%`;
+    }
+    
+    const stageElement = card.querySelector('.evolution-stage');
+    if (stageElement) {
+        stageElement.textContent = stage;
+    }
+}
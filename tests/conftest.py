@@ -0,0 +1,61 @@
+"""
+Shared test fixtures.
+
+Portal Evolution Systems built by these fixtures keep their evolution log, snapshot and
+recommendation archive under a temporary working directory and are shut down after
+the test, so tests never touch the repository's data directory.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from lumaura_ai_system.portal_evolution_system import PortalEvolutionSystem  # noqa: E402
+
+
+class SystemFactory:
+    """Starts Portal Evolution Systems in one data directory and stops them."""
+
+    def __init__(self):
+        self._running = []
+
+    def start(self, **kwargs):
+        """Create and initialize a system without the simulated activity generator."""
+        system = PortalEvolutionSystem(**kwargs)
+        system.initialize(start_generation=False)
+        self._running.append(system)
+        return system
+
+    def stop(self, system):
+        """Shut a system down, writing its final snapshot."""
+        self._running.remove(system)
+        system.shutdown()
+
+    def restart(self, system, **kwargs):
+        """Shut a system down and start a new one on the same data."""
+        self.stop(system)
+        return self.start(**kwargs)
+
+    def stop_all(self):
+        """Shut down every system still running."""
+        while self._running:
+            self.stop(self._running[-1])
+
+
+@pytest.fixture
+def systems(tmp_path, monkeypatch):
+    """Start systems whose state lives under a temporary directory."""
+    monkeypatch.chdir(tmp_path)
+    factory = SystemFactory()
+    yield factory
+    factory.stop_all()
+
+
+@pytest.fixture
+def portal_names():
+    """Names of two bundled portals."""
+    from lumaura_ai_system.portals.base import load_definitions
+    return sorted(load_definitions())[:2]
@@ -0,0 +1,94 @@
+"""Activity search index: queries, retention and concurrent pruning."""
+
+import random
+import threading
+
+from lumaura_ai_system.activity_index import ActivityIndex
+
+BASE_MS = 1704067200000
+
+
+def descriptions(result):
+    return [item["description"] for item in result["results"]]
+
+
+def test_terms_phrases_portals_and_time_ranges():
+    index = ActivityIndex()
+    index.add("bank", "Optimizing encryption keys for wallet integrations", BASE_MS)
+    index.add("mark", "Optimizing campaign strategies", BASE_MS + 1000)
+    index.add("bank", "Rotating keys for encryption", BASE_MS + 2000)
+
+    assert descriptions(index.search("encryption keys")) == [
+        "Rotating keys for encryption", "Optimizing encryption keys for wallet integrations"
+    ]
+    assert descriptions(index.search('"encryption keys"')) == ["Optimizing encryption keys for wallet integrations"]
+    assert index.search("optimizing", portal_name="mark")["total"] == 1
+    assert index.search("optimizing", start_ms=BASE_MS + 500)["total"] == 1
+    assert index.search("optimizing", end_ms=BASE_MS + 500)["total"] == 1
+    assert index.search("missing")["total"] == 0
+    assert index.search('""')["total"] == 0
+
+
+def test_size_cap_keeps_the_newest_activities_even_out_of_order():
+    index = ActivityIndex(max_activities=100)
+    offsets = list(range(1000))
+    random.Random(7).shuffle(offsets)
+    for offset in offsets:
+        index.add(f"portal{offset % 3}", f"Event number {offset % 40}", BASE_MS + offset)
+
+    assert 100 <= len(index) <= 101
+    kept = sorted(item["timestamp"] for item in index.search("event", limit=None)["results"])
+    everything = ActivityIndex()
+    for offset in range(1000 - len(index), 1000):
+        everything.add("portal", "event", BASE_MS + offset)
+    assert kept == sorted(item["timestamp"] for item in everything.search("event", limit=None)["results"])
+
+
+def test_pruned_descriptions_drop_their_terms_and_recycle_ids():
+    index = ActivityIndex(max_activities=10)
+    for number in range(50):
+        index.add("bank", f"Unique{number} activity", BASE_MS + number)
+
+    stats = index.stats()
+    assert stats["activities"] <= 11
+    assert stats["descriptions"] == stats["postings"] == stats["activities"]
+    assert stats["pruned"] == 50 - stats["activities"]
+    assert index.search("unique0")["total"] == 0
+    assert descriptions(index.search("unique49")) == ["Unique49 activity"]
+    assert len(index._descriptions) < 50
+
+
+def test_age_limit_is_measured_from_the_newest_activity():
+    index = ActivityIndex(max_activities=None, max_age=10)
+    for second in range(100):
+        index.add("bank", "Heartbeat", BASE_MS + second * 1000)
+
+    assert index.search("heartbeat")["total"] <= 11
+    # Too old to be indexed at all
+    index.add("bank", "Late arrival", BASE_MS)
+    assert index.search("late")["total"] == 0
+
+
+def test_search_results_never_show_recycled_descriptions():
+    index = ActivityIndex(max_activities=50)
+    stop = threading.Event()
+    wrong = []
+
+    def write():
+        for number in range(20000):
+            index.add("bank", f"Alpha {number}" if number % 2 else f"Beta {number}", BASE_MS + number)
+        stop.set()
+
+    def read():
+        while not stop.is_set():
+            for description in descriptions(index.search("alpha", limit=20)):
+                if description is None or not description.startswith("Alpha"):
+                    wrong.append(description)
+
+    threads = [threading.Thread(target=write)] + [threading.Thread(target=read) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert wrong == []
@@ -0,0 +1,68 @@
+"""Heap-based simulated activity scheduler."""
+
+import random
+import threading
+import types
+
+from lumaura_ai_system.portal_activity_generator import ACTIVITY, ActivityScheduler
+
+
+class RecordingSystem:
+    """Portal system stand-in recording generated events."""
+
+    def __init__(self, names):
+        self.portals = types.SimpleNamespace(keys=lambda: list(names))
+        self.activities = []
+        self.recommendations = []
+
+    def record_portal_activity(self, portal_name, description):
+        self.activities.append(portal_name)
+
+    def create_recommendation(self, source_portal, target_portal, recommendation_type, details):
+        assert source_portal != target_portal
+        self.recommendations.append((source_portal, target_portal))
+
+
+def test_events_fire_when_due_and_rates_can_be_changed():
+    now = [0.0]
+    system = RecordingSystem(["a", "b", "c"])
+    scheduler = ActivityScheduler(system, activity_interval=(1, 1), recommendation_interval=(5, 5),
+                                  rng=random.Random(1), clock=lambda: now[0])
+    scheduler.sync_portals()
+    scheduler.set_rate("c", activity_interval=False)
+
+    assert scheduler.run_pending(0.5) == 0
+    for second in range(1, 11):
+        scheduler.run_pending(float(second))
+
+    assert system.activities.count("a") == system.activities.count("b") == 10
+    assert "c" not in system.activities
+    now[0] = 10.0
+    assert scheduler.stats()["activities"] == 20
+
+
+def test_stats_can_be_read_while_the_worker_counts():
+    system = RecordingSystem(["a"])
+    scheduler = ActivityScheduler(system, rng=random.Random(1), clock=lambda: 0.0)
+    stop = threading.Event()
+    errors = []
+
+    def read():
+        while not stop.is_set():
+            try:
+                scheduler.stats()
+            except Exception as e:
+                errors.append(e)
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    try:
+        # Spread counts over many seconds so the window keeps growing and shrinking
+        for index in range(50000):
+            scheduler._count(ACTIVITY, index / 10)
+    finally:
+        stop.set()
+        reader.join()
+
+    assert errors == []
+    assert scheduler.stats()["activities"] == 50000
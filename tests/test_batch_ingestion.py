@@ -0,0 +1,94 @@
+"""Validation of batch activity ingestion, in the system and at the HTTP endpoint."""
+
+import json
+
+import pytest
+from flask import Flask
+
+import routes.portal_evolution_routes as portal_evolution_routes
+
+ENDPOINT = "/api/portal-evolution/record-activities"
+
+
+@pytest.fixture
+def client(systems):
+    """Test client of an app serving the portal evolution routes."""
+    system = systems.start()
+    app = Flask(__name__)
+    portal_evolution_routes.register_routes(app, system)
+    app.system = system
+    return app.test_client()
+
+
+def test_results_stay_aligned_with_invalid_records(systems, portal_names):
+    first, second = portal_names
+    system = systems.start()
+
+    results = system.record_portal_activities([
+        {"portal_name": first, "activity": "Valid"},
+        {"portal_name": first},
+        {"portal_name": first, "activity": ["not", "a", "string"]},
+        {"portal_name": "no-such-portal", "activity": "Lost"},
+        "not a record",
+        {"portal_name": second, "activity": "Related", "related_portal": 7},
+        {"portal_name": second, "activity": "Also valid", "related_portal": first},
+    ])
+
+    assert [result["index"] for result in results] == list(range(7))
+    assert [result["success"] for result in results] == [True, False, False, False, False, False, True]
+    assert results[1]["error"] == "Missing portal_name or activity"
+    assert results[2]["error"] == "portal_name, activity and related_portal must be strings"
+    assert results[3]["error"] == "Portal not found"
+    assert results[4]["error"] == "Missing portal_name or activity"
+    assert results[5]["error"] == "portal_name, activity and related_portal must be strings"
+    assert system.get_portal_status(first)["activities_count"] == 1
+    assert system.get_portal_status(second)["activities_count"] == 1
+    assert system.interactions.edge(second, first)["interactions"] == 1
+
+
+def test_json_array_and_wrapped_object(client, portal_names):
+    first, second = portal_names
+    records = [{"portal_name": first, "activity": "One"}, {"portal_name": second, "activity": "Two"}]
+
+    response = client.post(ENDPOINT, json=records)
+    assert response.status_code == 200
+    assert response.json["recorded"] == 2 and response.json["failed"] == 0
+
+    response = client.post(ENDPOINT, json={"activities": records})
+    assert response.json["recorded"] == 2
+    assert client.application.system.get_portal_status(first)["activities_count"] == 2
+
+
+def test_ndjson_keeps_a_slot_for_malformed_lines(client, portal_names):
+    first, _ = portal_names
+    body = "\n".join([
+        json.dumps({"portal_name": first, "activity": "Streamed"}),
+        "{not json",
+        "",
+        json.dumps({"portal_name": first, "activity": 42}),
+    ])
+
+    response = client.post(ENDPOINT, data=body, content_type="application/x-ndjson")
+
+    assert response.status_code == 200
+    assert [result["success"] for result in response.json["results"]] == [True, False, False]
+    assert response.json["results"][1]["error"] == "Missing portal_name or activity"
+    assert response.json["results"][2]["error"] == "portal_name, activity and related_portal must be strings"
+
+
+def test_rejects_non_list_bodies_and_oversized_batches(client, portal_names, monkeypatch):
+    assert client.post(ENDPOINT, json={"portal_name": portal_names[0]}).status_code == 400
+    assert client.post(ENDPOINT, data="plain text", content_type="text/plain").status_code == 400
+
+    monkeypatch.setattr(portal_evolution_routes, "MAX_BATCH_SIZE", 3)
+    records = [{"portal_name": portal_names[0], "activity": str(i)} for i in range(4)]
+    assert client.post(ENDPOINT, json=records).status_code == 413
+    ndjson = "\n".join(json.dumps(record) for record in records)
+    assert client.post(ENDPOINT, data=ndjson, content_type="application/x-ndjson").status_code == 413
+    assert client.application.system.get_portal_status(portal_names[0])["activities_count"] == 0
+
+
+def test_single_activity_endpoint_rejects_non_string_activity(client, portal_names):
+    response = client.post("/api/portal-evolution/record-activity",
+                           json={"portal_name": portal_names[0], "activity": {"nested": True}})
+    assert response.status_code == 400
@@ -0,0 +1,102 @@
+"""Concurrent writers against readers and snapshot exports."""
+
+import threading
+
+THREADS = 8
+ACTIVITIES_PER_THREAD = 200
+
+
+def run_threads(target, count):
+    """Run target(index) on count threads and re-raise the first failure."""
+    errors = []
+
+    def run(index):
+        try:
+            target(index)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+
+
+def test_concurrent_records_and_exports_keep_history_consistent(systems, portal_names):
+    system = systems.start()
+    stop = threading.Event()
+    export_errors = []
+
+    def export():
+        # Snapshots and status reads race with the writers the whole time
+        while not stop.is_set():
+            try:
+                system._save_evolution_data()
+                system.get_all_portals_status()
+            except Exception as e:
+                export_errors.append(e)
+
+    exporter = threading.Thread(target=export)
+    exporter.start()
+    try:
+        run_threads(
+            lambda index: [system.record_portal_activity(portal_names[index % 2], f"Thread {index} step {step}")
+                           for step in range(ACTIVITIES_PER_THREAD)],
+            THREADS
+        )
+    finally:
+        stop.set()
+        exporter.join()
+
+    assert export_errors == []
+    per_portal = THREADS // 2 * ACTIVITIES_PER_THREAD
+    for name in portal_names:
+        assert system.get_portal_status(name)["activities_count"] == per_portal
+
+    system = systems.restart(system)
+
+    for name in portal_names:
+        assert system.get_portal_status(name)["activities_count"] == per_portal
+        timestamps = [activity["timestamp"] for activity in system.get_portal_activities(name)]
+        assert timestamps == sorted(timestamps)
+
+
+def test_concurrent_recommendations_get_unique_ids(systems, portal_names):
+    source, target = portal_names
+    system = systems.start()
+    created = []
+    lock = threading.Lock()
+
+    def create(index):
+        for step in range(50):
+            recommendation = system.create_recommendation(source, target, "integration", f"{index}-{step}")
+            with lock:
+                created.append(recommendation["id"])
+
+    run_threads(create, THREADS)
+
+    assert len(set(created)) == len(created) == THREADS * 50
+    assert system.count_recommendations_for_portal(target) == len(created)
+
+
+def test_concurrent_implementation_applies_each_recommendation_once(systems, portal_names):
+    source, target = portal_names
+    system = systems.start()
+    ids = [system.create_recommendation(source, target, "integration", str(i))["id"] for i in range(20)]
+    outcomes = []
+    lock = threading.Lock()
+
+    def implement(index):
+        for rec_id in ids:
+            result = system.implement_recommendation(rec_id)
+            with lock:
+                outcomes.append((rec_id, result["success"]))
+
+    run_threads(implement, 4)
+
+    succeeded = [rec_id for rec_id, success in outcomes if success]
+    assert sorted(succeeded) == sorted(ids)
+    assert system.recommendations.count_by_status().get("implemented") == len(ids)
@@ -0,0 +1,48 @@
+"""Starting a system on a portal database."""
+
+from pathlib import Path
+
+from lumaura_ai_system.simulation import SimulatedClock
+from lumaura_ai_system.sql_store import SQLStore
+
+DATABASE_URL = "sqlite:///portal.db"
+
+
+def test_empty_database_startup_creates_no_evolution_log(systems):
+    systems.start(database_url=DATABASE_URL)
+
+    assert Path("portal.db").exists()
+    assert not Path("data/portal_evolution").exists()
+
+
+def test_stored_activities_are_indexed_on_the_first_search(systems, portal_names, monkeypatch):
+    first, second = portal_names
+    clock = SimulatedClock()
+    system = systems.start(database_url=DATABASE_URL, clock=clock)
+    for number in range(20):
+        clock.advance(1)
+        system.record_portal_activity(first, f"Stored heartbeat {number}")
+
+    monkeypatch.setenv("PORTAL_ACTIVITY_INDEX_MAX", "5")
+    system = systems.restart(system, database_url=DATABASE_URL, clock=clock)
+    assert len(system.activity_index) == 0
+    clock.advance(1)
+    system.record_portal_activity(second, "Live heartbeat")
+
+    result = system.search_activities("heartbeat", limit=None)
+
+    # Only the newest stored activities fit the index, and the live one is not indexed twice
+    descriptions = [item["description"] for item in result["results"]]
+    assert descriptions == ["Live heartbeat"] + [f"Stored heartbeat {number}" for number in range(19, 15, -1)]
+    assert system.get_portal_status(first)["activities_count"] == 20
+
+
+def test_interaction_counts_read_the_related_portal_index(tmp_path):
+    store = SQLStore(str(tmp_path / "portal.db"))
+    plan = store._conn.execute(
+        "EXPLAIN QUERY PLAN SELECT portal, related_portal, COUNT(*) "
+        "FROM activities WHERE related_portal IS NOT NULL GROUP BY 1, 2"
+    ).fetchall()
+    store.close()
+
+    assert any("idx_activities_related" in row[-1] for row in plan)
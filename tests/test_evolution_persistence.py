@@ -0,0 +1,110 @@
+"""Restart round-trips of the evolution log and state snapshot."""
+
+import time
+
+
+def wait_for(condition, timeout=5.0):
+    """Poll until condition() is true or the timeout passes."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+def test_restart_restores_scores_history_and_recommendations(systems, portal_names):
+    first, second = portal_names
+    system = systems.start()
+    for index in range(25):
+        system.record_portal_activity(first, f"Deployed model {index}", related_portal=second)
+    system.record_portal_activity(second, "Reviewed the roadmap")
+    recommendation = system.create_recommendation(first, second, "integration", "Share the model registry")
+    system.implement_recommendation(recommendation["id"])
+
+    before = {name: system.get_portal_status(name) for name in portal_names}
+    activities = system.get_portal_activities(first)
+    edge = system.interactions.edge(first, second)
+
+    system = systems.restart(system)
+
+    for name in portal_names:
+        status = system.get_portal_status(name)
+        assert status["evolution_score"] == before[name]["evolution_score"]
+        assert status["evolution_stage"] == before[name]["evolution_stage"]
+        assert status["activities_count"] == before[name]["activities_count"]
+        assert status["last_activity"] == before[name]["last_activity"]
+    assert system.get_portal_activities(first) == activities
+    assert system.interactions.edge(first, second) == edge
+    restored = system.get_recommendations_for_portal(second)
+    assert [rec["id"] for rec in restored] == [recommendation["id"]]
+    assert restored[0]["status"] == "implemented"
+    assert system.search_activities("deployed")["total"] == 25
+
+
+def test_scores_replay_from_the_log_without_a_snapshot(systems, portal_names):
+    first, _ = portal_names
+    system = systems.start()
+    for index in range(10):
+        system.record_portal_activity(first, f"Activity {index}")
+    system.evolution_log.flush()
+    expected = system.get_portal_status(first)["evolution_score"]
+
+    # A second process on the same data sees only the write-ahead log, as after a crash
+    recovered = systems.start()
+
+    assert not recovered.evolution_log.snapshot_file.exists()
+    assert recovered.get_portal_status(first)["evolution_score"] == expected
+
+
+def test_log_compaction_runs_on_the_snapshot_writer(systems, portal_names):
+    first, second = portal_names
+    system = systems.start()
+    system.evolution_log.max_segment_entries = 10
+    system.evolution_log.compact_after_segments = 2
+
+    for index in range(100):
+        system.record_portal_activity(first if index % 2 else second, f"Burst {index}")
+
+    assert wait_for(system.evolution_log.snapshot_file.exists)
+    assert wait_for(lambda: not system.evolution_log.needs_compaction())
+    scores = {name: system.get_portal_status(name)["evolution_score"] for name in portal_names}
+
+    system = systems.restart(system)
+
+    assert {name: system.get_portal_status(name)["evolution_score"] for name in portal_names} == scores
+    assert system.get_portal_status(first)["activities_count"] == 50
+
+
+def test_compaction_closes_the_replaced_snapshot(systems, portal_names):
+    first, _ = portal_names
+    system = systems.start()
+    system.record_portal_activity(first, "Before the first snapshot")
+    system._save_evolution_data()
+    replaced = system.evolution_log.snapshot
+
+    system.record_portal_activity(first, "Before the second snapshot")
+    system._save_evolution_data()
+
+    assert system.evolution_log.snapshot is not replaced
+    assert replaced._map is None
+    assert system.evolution_log.snapshot.portal(first)["last_activity"]["description"] == "Before the second snapshot"
+
+
+def test_compaction_waits_for_the_writer_instead_of_running_on_the_caller(systems, portal_names):
+    first, _ = portal_names
+    system = systems.start()
+    system.evolution_log.max_segment_entries = 10
+    system.evolution_log.compact_after_segments = 2
+    # Stop the snapshot writer as shutdown does
+    system._background_stop.set()
+    system._compaction_requested.set()
+    system._snapshot_writer.join()
+    system._compaction_requested.clear()
+
+    for index in range(50):
+        system.record_portal_activity(first, f"Burst {index}")
+
+    assert system.evolution_log.needs_compaction()
+    assert system._compaction_requested.is_set()
+    assert not system.evolution_log.snapshot_file.exists()
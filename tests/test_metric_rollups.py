@@ -0,0 +1,39 @@
+"""Metric rollups persisted to a database shared by several processes."""
+
+from lumaura_ai_system.simulation import SimulatedClock
+
+DATABASE_URL = "sqlite:///shared.db"
+
+
+def hourly_activities(system, portal_name):
+    return sum(bucket["activities"] for bucket in system.get_portal_metrics(portal_name, "1h")["buckets"])
+
+
+def test_workers_add_their_counts_to_the_shared_buckets(systems, portal_names):
+    first, _ = portal_names
+    clock = SimulatedClock()
+    workers = [systems.start(database_url=DATABASE_URL, shared_state=True, clock=clock) for _ in range(2)]
+    for count, worker in zip((3, 5), workers):
+        for _ in range(count):
+            worker.record_portal_activity(first, "Heartbeat")
+        # Saving twice only adds what was recorded since the previous save
+        worker._save_metrics()
+        worker._save_metrics()
+
+    reader = systems.start(database_url=DATABASE_URL, shared_state=True, clock=clock)
+
+    assert hourly_activities(reader, first) == 8
+
+
+def test_restored_buckets_are_not_saved_again(systems, portal_names):
+    first, _ = portal_names
+    clock = SimulatedClock()
+    system = systems.start(database_url=DATABASE_URL, clock=clock)
+    for _ in range(4):
+        system.record_portal_activity(first, "Heartbeat")
+
+    system = systems.restart(system, database_url=DATABASE_URL, clock=clock)
+    system.record_portal_activity(first, "Heartbeat")
+    system = systems.restart(system, database_url=DATABASE_URL, clock=clock)
+
+    assert hourly_activities(system, first) == 5
@@ -0,0 +1,115 @@
+"""Provider pool reuse, refresh and retirement of replaced services."""
+
+import os
+import sys
+import threading
+import types
+
+import pytest
+
+from services.ai.provider_pool import ProviderPool
+
+
+class FakeService:
+    """Provider service that fails requests once closed."""
+
+    def __init__(self, credential):
+        self.credential = credential
+        self.closed = False
+
+    def generate_text(self):
+        assert not self.closed, "request on a closed client"
+        return self.credential
+
+    def close(self):
+        self.closed = True
+
+
+class FakeClock:
+    """Monotonic clock that only moves when told to."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    module = types.SimpleNamespace(
+        API_KEY_ENV="FAKE_API_KEY",
+        is_available=lambda: True,
+        get_service=lambda: FakeService(os.environ.get("FAKE_API_KEY"))
+    )
+    monkeypatch.setitem(sys.modules, "services.ai.fake_service", module)
+    monkeypatch.setenv("FAKE_API_KEY", "key-1")
+    return ProviderPool(["fake"], recheck_interval=10, clock=FakeClock())
+
+
+def rotate(pool, monkeypatch, credential):
+    monkeypatch.setenv("FAKE_API_KEY", credential)
+    pool.clock.now += pool.recheck_interval
+
+
+def test_service_is_reused_until_the_key_rotates(pool, monkeypatch):
+    first = pool.get("fake")
+    assert pool.get("fake") is first
+
+    rotate(pool, monkeypatch, "key-2")
+    second = pool.get("fake")
+
+    assert second is not first and second.credential == "key-2"
+    # Nothing was using it, so it closes right away
+    assert first.closed
+    assert pool.stats()["providers"]["fake"]["clients_created"] == 2
+
+
+def test_leased_service_closes_after_its_last_release(pool, monkeypatch):
+    first = pool.acquire("fake")
+    with pool.lease("fake") as same:
+        assert same is first
+        rotate(pool, monkeypatch, "key-2")
+        assert pool.get("fake") is not first
+        assert pool.stats()["providers"]["fake"]["retiring"] == 1
+    assert not first.closed
+    assert first.generate_text() == "key-1"
+
+    pool.release(first)
+
+    assert first.closed
+    assert pool.stats()["providers"]["fake"]["retiring"] == 0
+
+
+def test_reset_defers_closing_leased_services(pool):
+    with pool.lease("fake") as service:
+        pool.reset()
+        assert not service.closed
+    assert service.closed
+
+
+def test_requests_in_flight_survive_key_rotation(pool, monkeypatch):
+    stop = threading.Event()
+    errors = []
+
+    def request():
+        while not stop.is_set():
+            try:
+                with pool.lease("fake") as service:
+                    service.generate_text()
+                    service.generate_text()
+            except AssertionError as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=request) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for index in range(200):
+        rotate(pool, monkeypatch, f"key-{index}")
+        pool.get("fake")
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert pool.stats()["providers"]["fake"]["retiring"] == 0
@@ -0,0 +1,52 @@
+"""Expiry, eviction and archiving of recommendations."""
+
+from lumaura_ai_system.simulation import SimulatedClock
+
+
+def test_stale_pending_recommendations_expire(systems, portal_names):
+    source, target = portal_names
+    clock = SimulatedClock()
+    system = systems.start(clock=clock)
+    system.recommendation_ttl = 3600
+    stale = system.create_recommendation(source, target, "integration", "stale")
+    clock.advance(3000)
+    fresh = system.create_recommendation(source, target, "integration", "fresh")
+    clock.advance(1000)
+
+    assert system.compact_recommendations() == {"expired": 1, "evicted": 0}
+
+    assert system.recommendations.get(stale["id"])["status"] == "expired"
+    assert system.recommendations.get(fresh["id"])["status"] == "pending"
+    assert system.get_recommendation_stats()["expired"] == 1
+    # Expired recommendations can no longer be implemented
+    assert not system.implement_recommendation(stale["id"])["success"]
+
+
+def test_evicted_recommendations_stay_listed_in_creation_order(systems, portal_names):
+    source, target = portal_names
+    clock = SimulatedClock()
+    system = systems.start(clock=clock)
+    system.recommendations_retained = 4
+    created = []
+    for index in range(10):
+        clock.advance(1)
+        created.append(system.create_recommendation(source, target, "integration", str(index))["id"])
+    for rec_id in created[:8]:
+        system.implement_recommendation(rec_id)
+
+    result = system.compact_recommendations()
+
+    assert result["evicted"] == 6
+    assert system.recommendation_archive.count(target) == 6
+    assert len(system.recommendations) == 4
+    assert system.count_recommendations_for_portal(target) == 10
+    assert [rec["id"] for rec in system.get_recommendations_for_portal(target)] == created
+    page = system.get_recommendations_for_portal(target, offset=5, limit=3)
+    assert [rec["id"] for rec in page] == created[5:8]
+    implemented = system.get_recommendations_for_portal(target, status="implemented")
+    assert [rec["id"] for rec in implemented] == created[:8]
+
+    system = systems.restart(system, clock=clock)
+
+    assert system.count_recommendations_for_portal(target) == 10
+    assert [rec["id"] for rec in system.get_recommendations_for_portal(target)] == created
@@ -0,0 +1,73 @@
+"""Indexing, transitions and expiry of the recommendation store."""
+
+from datetime import datetime
+
+from lumaura_ai_system.recommendation_store import RecommendationStore
+
+
+class FakeClock:
+    """Wall clock that only moves when told to."""
+
+    def __init__(self, now=1704067200.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def iso(clock, offset=0):
+    return datetime.fromtimestamp(clock() + offset).isoformat()
+
+
+def test_transitions_keep_the_indexes_consistent():
+    store = RecommendationStore()
+    first = store.create("a", "b", "integration", "one")
+    store.create("a", "b", "integration", "two")
+    store.create("a", "c", "integration", "three")
+
+    implemented = store.transition(first["id"], "pending", "implemented")
+
+    assert implemented["status"] == "implemented"
+    assert first["status"] == "pending"
+    assert store.transition(first["id"], "pending", "implemented") is None
+    assert store.count_for_target("b") == 2
+    assert [rec["details"] for rec in store.for_target("b", status="pending")] == ["two"]
+    assert store.count_by_status() == {"pending": 2, "implemented": 1}
+
+
+def test_atomic_batch_moves_nothing_when_one_id_fails():
+    store = RecommendationStore()
+    ids = [store.create("a", "b", "integration", str(i))["id"] for i in range(3)]
+
+    assert store.transition_many(ids + ["rec-missing"], "pending", "implemented") == [None] * 4
+    assert store.count_by_status() == {"pending": 3}
+    moved = store.transition_many(ids + ["rec-missing"], "pending", "implemented", atomic=False)
+    assert [rec is not None for rec in moved] == [True, True, True, False]
+
+
+def test_expire_finds_old_recommendations_behind_newer_ones():
+    clock = FakeClock()
+    store = RecommendationStore(clock=clock)
+    oldest = store.create("a", "b", "integration", "oldest")
+    clock.now += 100
+    older = store.create("a", "b", "integration", "older")
+    clock.now += 100
+    recent = store.create("a", "b", "integration", "recent")
+    # Moving back to pending puts the oldest one after the newer ids
+    store.transition(oldest["id"], "pending", "implemented")
+    store.transition(oldest["id"], "implemented", "pending")
+
+    expired = store.expire(iso(clock, -50), expired_at=iso(clock))
+
+    assert sorted(rec["id"] for rec in expired) == sorted([oldest["id"], older["id"]])
+    assert [rec["id"] for rec in store.for_target("b", status="pending")] == [recent["id"]]
+    assert all(rec["expired_at"] == iso(clock) for rec in expired)
+
+
+def test_ids_are_never_reused():
+    store = RecommendationStore()
+    store.add({"id": "rec-41", "target_portal": "b", "status": "implemented", "created_at": ""})
+    store.evict(("implemented",), 1)
+
+    assert store.create("a", "b", "integration", "next")["id"] == "rec-42"
+    assert store.export()[0] == 42
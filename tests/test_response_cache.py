@@ -0,0 +1,163 @@
+"""Response cache keys, tiers and opt-outs."""
+
+import types
+
+import pytest
+
+from services.ai import response_cache
+from services.ai.ai_factory import AIFactory
+from services.ai.base_service import BaseAIService
+from services.ai.response_cache import ResponseCache, cache_key
+
+BASE = dict(provider="openai", model="gpt-4o", kind="text", prompt="Hello", schema=None, max_tokens=100)
+
+
+class FakeClock:
+    """Wall clock that only moves when told to."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.parametrize("field, value", [
+    ("provider", "anthropic"),
+    ("model", "gpt-4o-mini"),
+    ("kind", "json"),
+    ("prompt", "Hello!"),
+    ("schema", {"type": "object"}),
+    ("max_tokens", 200),
+])
+def test_every_request_field_is_part_of_the_key(field, value):
+    assert cache_key(**{**BASE, field: value}) != cache_key(**BASE)
+
+
+def test_key_ignores_schema_key_order():
+    first = cache_key(**{**BASE, "schema": {"type": "object", "required": ["a"]}})
+    second = cache_key(**{**BASE, "schema": {"required": ["a"], "type": "object"}})
+    assert first == second
+
+
+def test_memory_tier_hits_expires_and_evicts():
+    clock = FakeClock()
+    cache = ResponseCache(path=None, ttl=10, memory_entries=2, clock=clock)
+    cache.put("a", "first")
+    cache.put("b", {"value": 2})
+
+    assert cache.get("a") == "first"
+    cache.put("c", "third")
+    # "b" was least recently used
+    assert cache.get("b") is None
+    clock.now += 11
+    assert cache.get("a") is None
+
+    stats = cache.stats()
+    assert stats["memory_hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["expired"] == 1
+    assert stats["memory_evictions"] == 1
+
+
+def test_memory_tier_respects_its_byte_budget():
+    cache = ResponseCache(path=None, memory_bytes=50)
+    for index in range(10):
+        cache.put(f"key-{index}", "x" * 20)
+    assert cache.stats()["memory_bytes"] <= 50
+
+
+def test_disk_tier_survives_a_new_instance(tmp_path):
+    path = str(tmp_path / "cache.db")
+    ResponseCache(path=path).put("key", {"answer": 42})
+
+    reopened = ResponseCache(path=path)
+
+    assert reopened.get("key") == {"answer": 42}
+    assert reopened.stats()["disk_hits"] == 1
+
+
+def test_disk_budget_holds_across_processes_sharing_the_file(tmp_path):
+    path = str(tmp_path / "cache.db")
+    first = ResponseCache(path=path, disk_bytes=1000)
+    second = ResponseCache(path=path, disk_bytes=1000)
+    for index in range(30):
+        first.put(f"a{index}", "a" * 40)
+        second.put(f"b{index}", "b" * 40)
+
+    assert first.stats()["disk_bytes"] <= 1000
+    assert second.stats()["disk_bytes"] <= 1000
+
+
+def test_disk_size_is_kept_without_summing_the_table(tmp_path):
+    path = str(tmp_path / "cache.db")
+    clock = FakeClock()
+    first = ResponseCache(path=path, ttl=10, clock=clock)
+    second = ResponseCache(path=path, ttl=10, clock=clock)
+    first.put("a", "a" * 40)
+    second.put("b", "b" * 20)
+    # Replacing an entry swaps its size rather than adding to it
+    first.put("a", "a" * 10)
+    clock.now += 11
+    assert second.get("b") is None
+
+    total = first._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+    assert first._read_disk_size() == second._read_disk_size() == total == len('"' + "a" * 10 + '"')
+
+
+def test_cache_can_be_disabled_and_configured_from_the_environment(monkeypatch):
+    monkeypatch.setattr(response_cache, "_cache", None)
+    monkeypatch.setenv("AI_CACHE_ENABLED", "0")
+    assert response_cache.get_response_cache() is None
+
+    monkeypatch.setenv("AI_CACHE_ENABLED", "1")
+    monkeypatch.setenv("AI_CACHE_PATH", "")
+    monkeypatch.setenv("AI_CACHE_MEMORY_BYTES", "4096")
+    cache = response_cache.get_response_cache()
+    assert cache.memory_bytes == 4096
+    assert cache.stats()["disk_enabled"] is False
+
+
+def test_requests_opting_out_of_the_cache_never_read_it():
+    service = types.SimpleNamespace(default_model="model", cache=ResponseCache(path=None))
+    cached_key = AIFactory._request_key("fake", service, "text", "Hello", None, 100, True)
+    bypass_key = AIFactory._request_key("fake", service, "text", "Hello", None, 100, False)
+    service.cache.put(cached_key, "cached answer")
+
+    # Opted-out requests only coalesce with each other, never with cached ones
+    assert bypass_key != cached_key
+    assert AIFactory._cached_response(service, cached_key, False) is None
+    assert AIFactory._cached_response(service, cached_key, True) == "cached answer"
+
+
+class FakeService(BaseAIService):
+    """Provider service streaming canned chunks."""
+
+    PROVIDER = "fake"
+    DISPLAY_NAME = "Fake"
+
+    def __init__(self, cache):
+        self.client = None
+        self.default_model = "model"
+        self.cache = cache
+        self.streams = []
+
+    def _stream(self, model, prompt, max_tokens):
+        self.streams.append("open")
+        try:
+            yield from ["Hel", "lo"]
+        finally:
+            self.streams.append("closed")
+
+
+def test_completed_streams_are_cached_and_abandoned_ones_are_closed():
+    service = FakeService(ResponseCache(path=None))
+
+    abandoned = service.stream_text("Hi")
+    assert next(abandoned) == "Hel"
+    abandoned.close()
+    assert service.streams == ["open", "closed"]
+
+    assert list(service.stream_text("Hi")) == ["Hel", "lo"]
+    assert list(service.stream_text("Hi")) == ["Hello"]
+    assert service.streams == ["open", "closed"] * 2
@@ -0,0 +1,46 @@
+"""Bulk score decay: publication and logging."""
+
+import threading
+
+
+def test_decay_republishes_every_moved_portal(systems, portal_names):
+    first, second = portal_names
+    system = systems.start()
+    system.boost_scores({first: 40, second: 5})
+    since = system.get_status_since()
+    etag = system.get_status_etag()
+
+    result = system.decay_scores(0.5)
+
+    delta = system.get_status_since(since["version"], since["epoch"])
+    assert result["changed"] >= 2
+    assert delta["delta"] and {first, second} <= set(delta["portals"])
+    assert system.get_status_etag() != etag
+    for name, score in ((first, 20), (second, 2.5)):
+        assert system.get_portal_status(name)["evolution_score"] == score
+
+
+def test_decay_during_a_compaction_is_replayed_once(systems, portal_names):
+    first, _ = portal_names
+    system = systems.start()
+    system.boost_scores({first: 80})
+    entries = system.score_table.entries
+    decayer = []
+
+    def entries_racing_a_decay():
+        # A decay arrives after the log was rotated but before the state is read
+        if not decayer:
+            decayer.append(threading.Thread(target=system.decay_scores, args=(0.5,)))
+            decayer[0].start()
+            decayer[0].join(0.5)
+        return entries()
+
+    system.score_table.entries = entries_racing_a_decay
+    system._save_evolution_data()
+    decayer[0].join()
+    system.score_table.entries = entries
+    expected = system.get_portal_status(first)["evolution_score"]
+
+    assert expected == 40
+    # A second process on the same data recovers from the snapshot and the log, as after a crash
+    assert systems.start().get_portal_status(first)["evolution_score"] == expected
@@ -0,0 +1,45 @@
+"""Worker processes sharing one portal database."""
+
+from lumaura_ai_system.simulation import SimulatedClock
+
+DATABASE_URL = "sqlite:///shared.db"
+
+
+def test_workers_agree_on_counts_latest_activity_and_search(systems, portal_names):
+    first, _ = portal_names
+    clock = SimulatedClock()
+    workers = [systems.start(database_url=DATABASE_URL, shared_state=True, clock=clock) for _ in range(2)]
+    for number in range(5):
+        clock.advance(1)
+        workers[number % 2].record_portal_activity(first, f"Shared heartbeat {number}")
+    for worker in workers:
+        worker.database.flush()
+
+    statuses = []
+    for worker in workers:
+        worker.sync_shared_state(force=True)
+        statuses.append(worker.get_portal_status(first))
+        result = worker.search_activities("heartbeat", portal_name=first, limit=None)
+        assert [item["description"] for item in result["results"]] == [
+            f"Shared heartbeat {number}" for number in range(4, -1, -1)
+        ]
+
+    for status in statuses:
+        assert status["activities_count"] == 5
+        assert status["last_activity"]["description"] == "Shared heartbeat 4"
+    assert statuses[0]["evolution_score"] == statuses[1]["evolution_score"]
+
+
+def test_worker_started_later_sees_earlier_activities(systems, portal_names):
+    first, _ = portal_names
+    clock = SimulatedClock()
+    early = systems.start(database_url=DATABASE_URL, shared_state=True, clock=clock)
+    early.record_portal_activity(first, "Early heartbeat")
+    early.database.flush()
+
+    late = systems.start(database_url=DATABASE_URL, shared_state=True, clock=clock)
+    clock.advance(1)
+    late.record_portal_activity(first, "Late heartbeat")
+
+    assert late.get_portal_status(first)["activities_count"] == 2
+    assert late.search_activities("heartbeat")["total"] == 2
@@ -0,0 +1,33 @@
+"""Deterministic simulation harness."""
+
+from pathlib import Path
+
+import lumaura_ai_system.portal_evolution_system as portal_evolution_system
+from lumaura_ai_system.simulation import build_system, run_simulation
+
+
+def test_same_seed_same_final_state():
+    first = run_simulation(portals=5, activities=500, seed=3, status_every=50, recommendation_every=25)
+    second = run_simulation(portals=5, activities=500, seed=3, status_every=50, recommendation_every=25)
+
+    assert first["final_state"] == second["final_state"]
+    assert first["config"]["portals"] == 5
+    assert first["record_portal_activity"]["count"] == 500
+
+
+def test_harness_never_opens_the_default_data_directory(tmp_path, monkeypatch):
+    opened = []
+    for name in ("EvolutionLog", "RecommendationArchive"):
+        original = getattr(portal_evolution_system, name)
+
+        def record(*args, _original=original, **kwargs):
+            opened.append(Path(kwargs.get("data_dir") or args[0]))
+            return _original(*args, **kwargs)
+
+        monkeypatch.setattr(portal_evolution_system, name, record)
+
+    system, names = build_system(4, seed=0, data_dir=str(tmp_path))
+    system.shutdown()
+
+    assert len(names) == 4
+    assert opened and all(tmp_path in (path, *path.parents) for path in opened)
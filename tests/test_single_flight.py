@@ -0,0 +1,148 @@
+"""Sharing of concurrent identical AI requests."""
+
+import asyncio
+import threading
+import time
+import types
+
+import pytest
+
+from services.ai.ai_factory import AIFactory
+from services.ai.single_flight import SingleFlight
+
+CALLERS = 8
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+    results = []
+
+    def fn():
+        calls.append(1)
+        release.wait(5)
+        return "shared"
+
+    threads = [threading.Thread(target=lambda: results.append(flight.do("key", fn))) for _ in range(CALLERS)]
+    for thread in threads:
+        thread.start()
+    assert wait_until(lambda: flight.stats()["coalesced"] == CALLERS - 1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == ["shared"] * CALLERS
+    stats = flight.stats()
+    assert stats["upstream_calls"] == 1
+    assert stats["in_flight"] == 0
+
+
+def test_exception_is_raised_in_every_caller():
+    flight = SingleFlight()
+    release = threading.Event()
+    errors = []
+
+    def fn():
+        release.wait(5)
+        raise RuntimeError("upstream failed")
+
+    def call():
+        try:
+            flight.do("key", fn)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    assert wait_until(lambda: flight.stats()["coalesced"] == 2)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert errors == ["upstream failed"] * 3
+
+
+def test_disabled_coalescer_runs_every_call():
+    flight = SingleFlight(enabled=False)
+    assert [flight.do("key", lambda: 1) for _ in range(3)] == [1, 1, 1]
+    assert flight.stats()["upstream_calls"] == 3
+
+
+def test_coroutines_share_one_call():
+    flight = SingleFlight()
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "shared"
+
+    async def main():
+        return await asyncio.gather(*(flight.ado("key", fn) for _ in range(CALLERS)))
+
+    assert asyncio.run(main()) == ["shared"] * CALLERS
+    assert len(calls) == 1
+
+
+def test_coroutine_joins_a_thread_call_in_flight():
+    flight = SingleFlight()
+    release = threading.Event()
+    leader = threading.Thread(target=lambda: flight.do("key", lambda: release.wait(5) and "from thread"))
+    leader.start()
+    assert wait_until(lambda: flight.stats()["in_flight"] == 1)
+
+    async def join():
+        waiting = asyncio.ensure_future(flight.ado("key", lambda: pytest.fail("joined call must not run")))
+        await asyncio.sleep(0)
+        release.set()
+        return await waiting
+
+    assert asyncio.run(join()) == "from thread"
+    leader.join()
+
+
+class FakeService:
+    """Provider service whose async calls are counted."""
+
+    default_model = "fake-model"
+    cache = None
+
+    def __init__(self):
+        self.prompts = []
+
+    async def agenerate_text(self, prompt, max_tokens=1000, cache=True):
+        self.prompts.append(prompt)
+        await asyncio.sleep(0.01)
+        return f"answer to {prompt}"
+
+
+def test_batch_repeats_share_calls(monkeypatch):
+    service = FakeService()
+    monkeypatch.setattr(AIFactory, "_select_provider", staticmethod(lambda *args, **kwargs: ("fake", service)))
+    releases = []
+    monkeypatch.setattr(AIFactory, "_pool", types.SimpleNamespace(release=releases.append))
+    monkeypatch.setattr(AIFactory, "_coalescer", SingleFlight())
+
+    results = AIFactory.generate_many(["a", "b", "a", "a"])
+
+    assert results == ["answer to a", "answer to b", "answer to a", "answer to a"]
+    assert sorted(service.prompts) == ["a", "b"]
+    # The batch held its provider until every prompt finished
+    assert releases == [service]
+    stats = AIFactory.get_coalescing_stats()
+    assert stats["requests"] == 4
+    assert stats["upstream_calls"] == 2
+    assert stats["coalesced"] == 2
+
+
+def wait_until(condition, timeout=5.0):
+    """Poll until condition() is true or the timeout passes."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.001)
+    return condition()